@@ -0,0 +1,199 @@
+"""
+Incremental per-rep analytics in constant memory.
+
+RepAnalytics follows the exercise's main joint angle (the joints in
+EXERCISE_RULES) and the counter's stage frame by frame. A movement cycle
+starts when the angle leaves the extended "rest" zone and ends on the
+frame the counter's stage returns to its rest stage: the down -> up
+transition that counts a squat, push-up or sit-up, the up -> down after a
+pull-up. The cycle is a rep if the counter went up during it, so reps here
+are exactly the counted ones. Per rep it measures:
+
+    duration       leaving rest -> back at rest
+    eccentric      the lowering half (squat/push-up: down, pull-up/sit-up: back down)
+    concentric     the lifting half
+    rest           time at rest before the rep
+    depth          the most flexed angle reached
+    bad_posture    share of the rep's frames with bad posture
+
+Aggregates are running sums (Welford for the spread) and only the last
+`keep` reps are kept, so an hour-long live session does not grow.
+"""
+import math
+from collections import deque
+
+from types_of_exercise import EXERCISE_RULES
+
+# Whether flexing the joint (angle going down) is the concentric half
+CONCENTRIC_FLEXION = {
+    "push-up": False,
+    "squat": False,
+    "pull-up": True,
+    "sit-up": True,
+}
+METRICS = ("duration", "eccentric", "concentric", "rest", "depth", "bad_posture")
+
+
+class RunningStat:
+    """Count, mean, spread, min and max of a stream (Welford)."""
+
+    __slots__ = ("n", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def summary(self, digits=2):
+        if not self.n:
+            return None
+        return {"mean": round(self.mean, digits), "std": round(self.std, digits),
+                "min": round(self.min, digits), "max": round(self.max, digits)}
+
+
+def primary_angle(smoothed, joints):
+    """Mean of the exercise's joint angles that are currently known, or None."""
+    total = 0.0
+    n = 0
+    for joint in joints:
+        a = smoothed.get(joint)
+        if a is not None and a == a:  # not NaN
+            total += a
+            n += 1
+    return total / n if n else None
+
+
+class RepAnalytics:
+    def __init__(self, exercise_type, rules=None, keep=20):
+        et = exercise_type.lower()
+        rule = (rules or EXERCISE_RULES)[et]
+        self.joints = rule["joints"]
+        # The extended end of the range is "rest", whichever way the rule counts
+        self.rest_above = max(rule["down"], rule["up"])
+        self.rest_stage = "down" if rule["invert"] else "up"
+        self.flexion_concentric = CONCENTRIC_FLEXION.get(et, False)
+
+        self.stats = {m: RunningStat() for m in METRICS}
+        self.recent = deque(maxlen=keep)
+        self.reps = 0
+
+        self._moving = False
+        self._left_rest = None      # last time seen at rest
+        self._last_rest_end = None  # when the previous rep got back to rest
+        self._depth = math.inf
+        self._depth_time = None
+        self._frames = 0
+        self._bad = 0
+        self._counter_at_start = 0
+        self._counter = 0
+        self._stage = None
+        self._last_time = None
+
+    def update(self, t, angle, counter, stage, posture):
+        """
+        Feeds one frame with the counter's reps and stage after it; returns
+        the finished rep's metrics when a rep completes.
+        """
+        counter_before, self._counter = self._counter, counter
+        was, self._stage = self._stage, stage
+        self._last_time = t
+        if angle is None:
+            return None
+
+        if not self._moving:
+            if angle >= self.rest_above:
+                self._left_rest = t
+                return None
+            # Left the rest zone: a new cycle starts
+            self._moving = True
+            if self._left_rest is None:
+                self._left_rest = t
+            self._depth = math.inf
+            self._frames = 0
+            self._bad = 0
+            # Before this frame: a jump (e.g. after lost frames) may count at once
+            self._counter_at_start = counter_before
+
+        self._frames += 1
+        self._bad += not posture
+        if angle < self._depth:
+            self._depth = angle
+            self._depth_time = t
+
+        # Back in the rest stage: the counter's transition, or a partial
+        # movement that came back to rest without ever leaving the stage
+        if stage == self.rest_stage and (was != stage or angle >= self.rest_above):
+            return self._close(t)
+        return None
+
+    def finish(self):
+        """Closes a rep still in progress (e.g. the session stopped at the top of a pull-up)."""
+        if self._moving and self._last_time is not None:
+            return self._close(self._last_time)
+        return None
+
+    def _close(self, t):
+        self._moving = False
+        start = self._left_rest
+        self._left_rest = t
+        if self._counter <= self._counter_at_start:
+            return None  # partial movement, not counted
+
+        flexing = self._depth_time - start
+        extending = t - self._depth_time
+        rep = {
+            "rep": self.reps + 1,
+            "duration": t - start,
+            "eccentric": extending if self.flexion_concentric else flexing,
+            "concentric": flexing if self.flexion_concentric else extending,
+            "rest": start - self._last_rest_end if self._last_rest_end is not None else 0.0,
+            "depth": self._depth,
+            "bad_posture": self._bad / self._frames if self._frames else 0.0,
+        }
+        self._last_rest_end = t
+        self.reps += 1
+        for m in METRICS:
+            if m == "rest" and rep["rep"] == 1:
+                continue  # nothing to rest from before the first rep
+            self.stats[m].add(rep[m])
+        self.recent.append({k: round(v, 3) if isinstance(v, float) else v
+                            for k, v in rep.items()})
+        return rep
+
+    def summary(self):
+        return {
+            "reps": self.reps,
+            **{m: self.stats[m].summary() for m in METRICS},
+            "recent": list(self.recent),
+        }
+
+    def report_lines(self):
+        """(label, value) lines for engine.write_report."""
+        s = self.stats
+        if not s["duration"].n:
+            return []
+        lines = [
+            ("Avg Rep Time", f"{s['duration'].mean:.2f} s "
+                             f"(± {s['duration'].std:.2f})"),
+            ("Ecc / Con", f"{s['eccentric'].mean:.2f} s / "
+                          f"{s['concentric'].mean:.2f} s"),
+            ("Avg Depth", f"{s['depth'].mean:.1f}° (best {s['depth'].min:.1f}°)"),
+            ("Bad Posture/Rep", f"{s['bad_posture'].mean * 100:.1f}%"),
+        ]
+        if s["rest"].n:
+            lines.insert(2, ("Avg Rest", f"{s['rest'].mean:.2f} s"))
+        return lines
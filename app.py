@@ -186,9 +186,16 @@ if __name__ == "__main__":
 import streamlit as st
 import cv2
 import os
+import threading
 import time
 
-from engine import start_engine
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from engine_worker import (get_worker, prewarm, release_worker, start_worker,
+                           stop_worker)
+from ingest import BufferedCapture, UploadSpool, spool_from
+from metrics import serve_from_env
+from recorder import VideoRecorder
 
 # -----------------------------------------------------------
 # FIX 1: USE ABSOLUTE PATHS
@@ -197,6 +204,18 @@ from engine import start_engine
 # -----------------------------------------------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 VIDEO_DIR = os.path.join(BASE_DIR, "Exercise Videos")
+# Streamlit's default server.maxUploadSize. st.file_uploader hands a file
+# over only once the browser has sent all of it, held in memory, so this
+# path is never progressive: large clips belong on service.py's chunked
+# protocol, which analyzes them while they upload.
+MAX_UPLOAD_MB = 200
+REPLAY_DIR = os.path.join(BASE_DIR, "replays")
+
+
+def session_id():
+    """Streamlit's id of this browser session; keys its engine worker."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
 
 
 def main():
@@ -205,6 +224,11 @@ def main():
         layout="wide"
     )
 
+    # Prometheus endpoint when started by launch.py; once per process
+    serve_from_env()
+    # Load the pose model now rather than when the first workout starts
+    prewarm()
+
     if "run" not in st.session_state:
         st.session_state.run = False
 
@@ -221,15 +245,23 @@ def main():
 
     exercise = st.sidebar.selectbox(
         "Select Exercise",
-        ["squat", "push-up", "pull-up", "sit-up"]
+        ["squat", "push-up", "pull-up", "sit-up", "auto"],
+        help="auto: detects the exercise, for switching without touching the kiosk"
     )
 
     source = st.sidebar.radio(
         "Select Video Source",
-        ["Live Webcam", "Pre-recorded Video"]
+        ["Live Webcam", "Pre-recorded Video", "Upload Video"]
     )
 
     video_path = None
+    uploaded = None
+
+    if source == "Upload Video":
+        uploaded = st.sidebar.file_uploader(
+            "Upload a workout video",
+            type=["mp4", "mov", "avi", "mkv", "webm"]
+        )
 
     if source == "Pre-recorded Video":
         video_name = st.sidebar.text_input(
@@ -248,12 +280,19 @@ def main():
             else:
                 st.sidebar.error(f"Video not found in: {VIDEO_DIR}")
 
+    save_replay = st.sidebar.checkbox("Save annotated replay")
+
     if st.sidebar.button("Start / Restart"):
+        stop_worker(session_id())
         st.session_state.run = True
         st.session_state.countdown_done = False
 
     if st.sidebar.button("Stop"):
         st.session_state.run = False
+        # The engine runs in the background: stop it right away, keep its report
+        report = stop_worker(session_id())
+        if report and not report.get("error"):
+            st.session_state.last_report = report
 
     col1, col2, col3, col4 = st.columns(4)
 
@@ -290,6 +329,12 @@ def main():
 
         if source == "Live Webcam":
             video_source = 0
+        elif source == "Upload Video":
+            if not uploaded:
+                st.error("Please upload a video")
+                st.session_state.run = False
+                return
+            video_source = None  # spooled when the engine starts
         else:
             if not video_path:
                 st.error("Please enter a valid video path")
@@ -327,26 +372,56 @@ def main():
             placeholder.empty()
 
         # ----------------- STREAMING ----------------
-        def display_callback(frame, reps, stage, posture, progress, fps):
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # The engine keeps running across reruns; a rerun just re-attaches
+        worker = get_worker(session_id())
+        if worker is None and video_source is None:
+            # The upload is already complete in memory; copy it to disk in the
+            # background and open it on the capture's own thread, so the
+            # script thread doesn't wait for either. The engine releases the
+            # capture when it ends or is stopped, which deletes the copy.
+            spool = UploadSpool(MAX_UPLOAD_MB * 1024 * 1024,
+                                suffix=os.path.splitext(uploaded.name)[1])
+            uploaded.seek(0)
+            threading.Thread(target=spool_from, args=(uploaded, spool),
+                             daemon=True).start()
+            video_source = BufferedCapture(spool, remove_spool=True)
+        if worker is None:
+            recorder = None
+            if save_replay:
+                stamp = time.strftime("%Y-%m-%d_%H-%M-%S")
+                recorder = VideoRecorder(
+                    os.path.join(REPLAY_DIR, f"{exercise}_{stamp}.mp4")
+                )
+            worker = start_worker(
+                session_id(),
+                exercise,
+                video_source,
+                # Live stations idle when nobody is in front of the camera
+                motion_gate=(source == "Live Webcam"),
+                # ...and always work on the newest camera frame
+                low_latency=(source == "Live Webcam"),
+                recorder=recorder
+            )
+
+        seq = 0
+        while not worker.done:
+            seq, r = worker.poll(seq)
+            if r is None:
+                continue
+
+            frame_rgb = cv2.cvtColor(r.frame, cv2.COLOR_BGR2RGB)
 
             stframe.image(frame_rgb, channels="RGB", use_container_width=True)
 
-            kpi_reps.metric("Reps", reps)
-            kpi_stage.metric("Stage", stage)
-            kpi_posture.metric("Posture", "Good" if posture else "Bad")
-            kpi_fps.metric("FPS", fps)
+            kpi_reps.metric("Reps", r.counter)
+            kpi_stage.metric("Stage", r.stage)
+            kpi_posture.metric("Posture", "Good" if r.posture else "Bad")
+            kpi_fps.metric("FPS", r.fps)
+            worker.displayed(r)
 
-        def stop_callback():
-            return st.session_state.run
+        report = worker.result
+        release_worker(session_id())
 
-        report = start_engine(
-            exercise,
-            video_source,
-            display_callback,
-            stop_callback
-        )
-        
         # Check if engine returned an error
         if report.get("error"):
              st.error(report["error"])
@@ -369,6 +444,9 @@ def main():
         st.write(f"**Total Reps:** {r['reps']}")
         st.write(f"**Duration:** {r['duration']} seconds")
         st.write(f"**Accuracy:** {r['accuracy']:.2f}%")
+        if r.get("latency"):
+            st.write(f"**Feedback latency:** {r['latency']['avg_ms']} ms avg, "
+                     f"{r['latency']['p95_ms']} ms p95")
 
         try:
             with open(r["report_path"], "r") as f:
@@ -384,6 +462,9 @@ def main():
         except:
             st.warning("Report file not found.")
 
+        if r.get("recording"):
+            st.write(f"**Replay:** {r['recording']['path']}")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,170 @@
+"""
+Pose inference backends.
+
+Every backend takes an RGB frame and returns a standard (33, 4) float32
+landmark array (x, y, z, visibility, with x/y normalized to the frame) in
+MediaPipe's BlazePose landmark order, or None when nobody is detected.
+The rest of the engine only ever sees that array, so a different model can
+be dropped in without touching engine.py:
+
+    start_engine("squat", 0, backend="onnx",
+                 backend_options={"model_path": "models/pose.onnx"})
+"""
+import cv2
+import numpy as np
+
+NUM_LANDMARKS = 33
+
+
+class PoseBackend:
+    """Base class: subclasses implement process() and, if needed, close()."""
+
+    name = "base"
+
+    def process(self, rgb):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MediaPipeBackend(PoseBackend):
+    name = "mediapipe"
+
+    def __init__(self, model_complexity=1, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5):
+        import mediapipe as mp
+
+        self._pose = mp.solutions.pose.Pose(
+            model_complexity=model_complexity,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+        )
+
+    def process(self, rgb):
+        results = self._pose.process(rgb)
+        if not results.pose_landmarks:
+            return None
+        return np.array([(p.x, p.y, p.z, p.visibility)
+                         for p in results.pose_landmarks.landmark],
+                        dtype=np.float32)
+
+    def close(self):
+        self._pose.close()
+
+
+def _decode_landmarks(output, input_size, min_presence=0.5, presence=None):
+    """
+    Decodes a BlazePose-style landmark tensor: 33 x (x, y, z, visibility,
+    presence) in input pixels, visibility/presence as logits.
+    """
+    if presence is not None and 1 / (1 + np.exp(-float(presence))) < min_presence:
+        return None
+    raw = np.asarray(output, dtype=np.float32).reshape(-1)
+    per = raw.size // NUM_LANDMARKS
+    if per < 4:
+        return None
+    raw = raw[:NUM_LANDMARKS * per].reshape(NUM_LANDMARKS, per)
+    w, h = input_size
+    out = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    out[:, 0] = raw[:, 0] / w
+    out[:, 1] = raw[:, 1] / h
+    out[:, 2] = raw[:, 2] / w
+    out[:, 3] = 1 / (1 + np.exp(-raw[:, 3]))
+    return out
+
+
+class OnnxBackend(PoseBackend):
+    """
+    ONNX Runtime on CPU with a local single-person landmark model (for example
+    a BlazePose full-body landmark export) that takes the whole frame resized
+    to `input_size`.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path, input_size=(256, 256), min_presence=0.5,
+                 threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The 'onnx' backend needs: pip install onnxruntime")
+
+        opts = ort.SessionOptions()
+        if threads:
+            opts.intra_op_num_threads = threads
+        self._session = ort.InferenceSession(
+            model_path, opts, providers=["CPUExecutionProvider"]
+        )
+        inp = self._session.get_inputs()[0]
+        self._input_name = inp.name
+        self._nchw = len(inp.shape) == 4 and inp.shape[1] == 3
+        self.input_size = tuple(input_size)
+        self.min_presence = min_presence
+
+    def process(self, rgb):
+        img = cv2.resize(rgb, self.input_size).astype(np.float32) / 255.0
+        if self._nchw:
+            img = img.transpose(2, 0, 1)
+        outputs = self._session.run(None, {self._input_name: img[None]})
+        presence = outputs[1].reshape(-1)[0] if len(outputs) > 1 else None
+        return _decode_landmarks(outputs[0], self.input_size,
+                                 self.min_presence, presence)
+
+
+class OpenCVDnnBackend(PoseBackend):
+    """Same model contract as OnnxBackend, run through cv2.dnn (no extra dependency)."""
+
+    name = "opencv-dnn"
+
+    def __init__(self, model_path, input_size=(256, 256), min_presence=0.5):
+        self._net = cv2.dnn.readNet(model_path)
+        self._net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self._net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self._outputs = self._net.getUnconnectedOutLayersNames()
+        self.input_size = tuple(input_size)
+        self.min_presence = min_presence
+
+    def process(self, rgb):
+        blob = cv2.dnn.blobFromImage(rgb, 1 / 255.0, self.input_size)
+        self._net.setInput(blob)
+        outputs = self._net.forward(self._outputs)
+        presence = outputs[1].reshape(-1)[0] if len(outputs) > 1 else None
+        return _decode_landmarks(outputs[0], self.input_size,
+                                 self.min_presence, presence)
+
+
+BACKENDS = {
+    "mediapipe": MediaPipeBackend,
+    "onnx": OnnxBackend,
+    "opencv-dnn": OpenCVDnnBackend,
+}
+
+
+def create_backend(name="mediapipe", **options):
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown backend '{name}'. Choose from: {', '.join(BACKENDS)}"
+        )
+    return cls(**options)
+
+
+def available_backends():
+    """Backends whose runtime is installed (model files are checked on creation)."""
+    names = []
+    for name, module in (("mediapipe", "mediapipe"), ("onnx", "onnxruntime")):
+        try:
+            __import__(module)
+            names.append(name)
+        except ImportError:
+            pass
+    names.append("opencv-dnn")
+    return names
@@ -0,0 +1,131 @@
+import numpy as np
+
+from types_of_exercise import EXERCISE_RULES, TypeOfExercise
+
+STAGES = np.array(["down", None, "up"], dtype=object)
+
+
+def _joint_average(angles, joints):
+    cols = [TypeOfExercise.ANGLE_KEYS.index(j) for j in joints]
+    sub = angles[:, cols]
+    n = (~np.isnan(sub)).sum(axis=1)
+    total = np.nansum(sub, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, total / np.maximum(n, 1), np.nan)
+
+
+def _column(angles, key):
+    return angles[:, TypeOfExercise.ANGLE_KEYS.index(key)]
+
+
+def _posture(exercise_type, angles):
+    """Vectorized TypeOfExercise.posture_correct_* (NaN means 'unknown')."""
+    abdomen = _column(angles, "abdomen")
+
+    if exercise_type == "push-up":
+        le = _column(angles, "left_elbow")
+        re = _column(angles, "right_elbow")
+        lopsided = np.abs(le - re) > 30
+        return np.isnan(abdomen) | ((abdomen >= 140) & ~lopsided)
+
+    if exercise_type == "squat":
+        knees = _joint_average(angles, ("left_knee", "right_knee"))
+        return np.isnan(knees) | (knees >= 90)
+
+    # sit-up and pull-up only check the torso
+    return np.isnan(abdomen) | (abdomen >= 100)
+
+
+def _progress(avg, down, up, invert):
+    span = (down - up) if invert else (up - down)
+    p = ((down - avg) if invert else (avg - down)) / span
+    return np.nan_to_num(np.clip(p, 0.0, 1.0), nan=0.0)
+
+
+def count_reps(
+    exercise_type,
+    angles,
+    timestamps,
+    rules=None,
+    min_rep_interval=TypeOfExercise.MIN_REP_INTERVAL,
+    stage=None,
+    counter=0,
+    last_rep_time=0.0
+):
+    """
+    Offline counterpart of TypeOfExercise.calculate_exercise.
+
+    `angles` is a (frames, 6) smoothed-angle series in ANGLE_KEYS order,
+    holding the last smoothed value on frames without a detection (what the
+    streaming tracker sees) and NaN before the first one. `timestamps` are
+    the frame times in seconds. `stage`, `counter` and `last_rep_time` carry
+    the state machine over from a previous chunk.
+
+    Stages come from hysteresis thresholding: each frame above the "up"
+    threshold or below the "down" threshold is an event, and the stage is
+    the latest event so far (a forward fill done with maximum.accumulate).
+    Reps are the down -> up edges; only the MIN_REP_INTERVAL check walks
+    the (few) edges in Python.
+    """
+    et = exercise_type.lower()
+    rule = (rules or EXERCISE_RULES)[et]
+    angles = np.asarray(angles, dtype=float)
+    timestamps = np.asarray(timestamps, dtype=float)
+    n = len(angles)
+
+    down, up, invert = rule["down"], rule["up"], rule["invert"]
+    avg = _joint_average(angles, rule["joints"])
+    valid = ~np.isnan(avg)
+
+    # NaN comparisons are False, so frames without angles carry the stage
+    with np.errstate(invalid="ignore"):
+        up_event = (avg < up) if invert else (avg > up)
+        down_event = (avg > down) if invert else (avg < down)
+    events = up_event.astype(np.int8) - down_event.astype(np.int8)
+
+    initial = {"down": -1, "up": 1}.get(stage, 0)
+    if initial == 0 and valid.any():
+        # Same start rule as the streaming state machine; it never switches
+        # stage again on that first frame.
+        first = int(np.argmax(valid))
+        a = avg[first]
+        starts_up = (a <= down) if invert else (a > up)
+        events[first] = 1 if starts_up else -1
+
+    idx = np.where(events != 0, np.arange(n), -1)
+    np.maximum.accumulate(idx, out=idx)
+    state = np.where(idx >= 0, events[np.maximum(idx, 0)], initial)
+
+    prev = np.concatenate(([initial], state[:-1]))
+    edges = np.flatnonzero((state == 1) & (prev == -1))
+
+    counted = []
+    for i in edges:
+        t = timestamps[i]
+        if t - last_rep_time >= min_rep_interval:
+            counted.append(i)
+            last_rep_time = t
+    rep_frames = np.array(counted, dtype=int)
+
+    steps = np.zeros(n, dtype=int)
+    steps[rep_frames] = 1
+    counters = counter + np.cumsum(steps)
+
+    # Frames with no angle at all are "bad" in the streaming engine too
+    posture = valid & _posture(et, angles)
+    good_frames = int(posture.sum())
+
+    return {
+        "exercise": et,
+        "reps": int(counters[-1]) if n else counter,
+        "rep_frames": rep_frames,
+        "rep_times": timestamps[rep_frames],
+        "counter": counters,
+        "stage": STAGES[state + 1],
+        "posture": posture,
+        "progress": np.where(valid, _progress(avg, down, up, invert), 0.0),
+        "good_frames": good_frames,
+        "bad_frames": n - good_frames,
+        "final_stage": STAGES[state[-1] + 1] if n else stage,
+        "last_rep_time": last_rep_time,
+    }
@@ -0,0 +1,252 @@
+"""
+Ranks the installed pose backends on the sample videos.
+
+Every backend sees exactly the same decoded frames. Latency is measured
+per process() call after a short warm-up. Agreement is measured against
+the reference backend (MediaPipe full): the share of frames where both
+agree on whether someone is there, and the mean landmark distance on
+frames where both see a person (in normalized image units, visible
+landmarks only). Only backends that are accurate enough
+(`min_agreement`, `max_landmark_error`) are ranked by latency; the rest
+are listed as rejected, since a fast backend that misses people is no
+pick at all.
+
+    python benchmark.py
+    python benchmark.py --model models/pose.onnx --max-frames 200
+    python benchmark.py --memory-budget 50 --trace-memory
+    python benchmark.py --min-agreement 0.95 --max-landmark-error 0.03
+
+With --memory-budget, each backend's RSS growth over the measured frames
+(after warm-up) is checked against the budget in MB, and the run exits
+with status 1 if any backend goes over it. --trace-memory also lists the
+top Python allocation sites, at some cost to the latencies measured.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from backends import available_backends, create_backend
+from memprofile import MemoryProfiler
+
+VIDEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "Exercise Videos")
+REPORT_DIR = "reports"
+WARMUP_FRAMES = 5
+REFERENCE = "mediapipe[full]"
+MIN_AGREEMENT = 0.9
+MAX_LANDMARK_ERROR = 0.05  # normalized image units
+
+
+def load_frames(videos, max_frames=300, size=(800, 480)):
+    """Decodes up to `max_frames` RGB frames per video, once, for all backends."""
+    frames = []
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        n = 0
+        while n < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.cvtColor(cv2.resize(frame, size),
+                                       cv2.COLOR_BGR2RGB))
+            n += 1
+        cap.release()
+    return frames
+
+
+def candidate_backends(model_path=None):
+    """name -> (backend, options) for everything that can run here."""
+    installed = available_backends()
+    candidates = {}
+    if "mediapipe" in installed:
+        for label, complexity in (("lite", 0), ("full", 1), ("heavy", 2)):
+            candidates[f"mediapipe[{label}]"] = (
+                "mediapipe", {"model_complexity": complexity}
+            )
+    if model_path:
+        for name in ("onnx", "opencv-dnn"):
+            if name in installed:
+                candidates[f"{name}[{os.path.basename(model_path)}]"] = (
+                    name, {"model_path": model_path}
+                )
+    return candidates
+
+
+def run_backend(backend, options, frames, memory=None):
+    """`memory` (a MemoryProfiler) is started after warm-up and sampled every frame."""
+    with create_backend(backend, **options) as pose:
+        for rgb in frames[:WARMUP_FRAMES]:
+            pose.process(rgb)
+        if memory:
+            memory.start()
+        latencies = np.empty(len(frames))
+        landmarks = []
+        for i, rgb in enumerate(frames):
+            t0 = time.perf_counter()
+            landmarks.append(pose.process(rgb))
+            latencies[i] = time.perf_counter() - t0
+            if memory:
+                memory.sample()
+        if memory:
+            memory.stop()
+    return latencies, landmarks
+
+
+def agreement(landmarks, reference):
+    both = 0
+    same_detection = 0
+    errors = []
+    for lm, ref in zip(landmarks, reference):
+        same_detection += (lm is None) == (ref is None)
+        if lm is None or ref is None:
+            continue
+        both += 1
+        visible = ref[:, 3] >= 0.5
+        if visible.any():
+            d = np.linalg.norm(lm[visible, :2] - ref[visible, :2], axis=1)
+            errors.append(float(d.mean()))
+    return {
+        "detection_agreement": same_detection / max(len(reference), 1),
+        "mean_landmark_error": float(np.mean(errors)) if errors else None,
+        "frames_compared": both,
+    }
+
+
+def accuracy_problem(result, min_agreement=MIN_AGREEMENT,
+                     max_landmark_error=MAX_LANDMARK_ERROR):
+    """Why a backend's results are too far off the reference to rank, or None."""
+    agree = result.get("detection_agreement")
+    if agree is not None and agree < min_agreement:
+        return f"detection agreement {agree * 100:.1f}% < {min_agreement * 100:.0f}%"
+    err = result.get("mean_landmark_error")
+    if err is not None and err > max_landmark_error:
+        return f"landmark error {err:.4f} > {max_landmark_error}"
+    return None
+
+
+def benchmark_backends(videos, candidates, max_frames=300, memory_budget=None,
+                       trace_memory=False, min_agreement=MIN_AGREEMENT,
+                       max_landmark_error=MAX_LANDMARK_ERROR):
+    frames = load_frames(videos, max_frames)
+    if not frames:
+        raise ValueError(f"No frames could be decoded from: {', '.join(videos) or 'no videos'}")
+    results = {}
+    outputs = {}
+    for name, (backend, options) in candidates.items():
+        memory = None
+        if memory_budget is not None or trace_memory:
+            memory = MemoryProfiler(interval=1.0, top=5, trace=trace_memory)
+        try:
+            latencies, landmarks = run_backend(backend, options, frames, memory)
+        except Exception as e:
+            results[name] = {"error": str(e)}
+            continue
+        outputs[name] = landmarks
+        results[name] = {
+            "mean_ms": round(float(latencies.mean()) * 1000, 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+            "fps": round(1.0 / float(latencies.mean()), 1),
+            "detected": sum(lm is not None for lm in landmarks) / len(frames),
+        }
+        if memory:
+            results[name]["memory"] = memory.summary()
+
+    reference = outputs.get(REFERENCE) or next(iter(outputs.values()), None)
+    for name, landmarks in outputs.items():
+        if reference is not None:
+            results[name].update(agreement(landmarks, reference))
+
+    rejected = {}
+    for name in outputs:
+        problem = accuracy_problem(results[name], min_agreement, max_landmark_error)
+        if problem:
+            rejected[name] = problem
+    ranked = sorted(
+        (n for n in outputs if n not in rejected),
+        key=lambda n: results[n]["mean_ms"],
+    )
+    report = {"frames": len(frames), "ranking": ranked, "rejected": rejected,
+              "backends": results}
+    if memory_budget is not None:
+        report["memory_budget_mb"] = memory_budget
+        report["over_budget"] = [
+            n for n in outputs
+            if (results[n]["memory"] or {}).get("rss_growth_mb", 0) > memory_budget
+        ]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pose backend benchmark")
+    parser.add_argument("videos", nargs="*",
+                        help="videos to use (default: Exercise Videos/*.mp4)")
+    parser.add_argument("--model", help="local ONNX model for onnx / opencv-dnn")
+    parser.add_argument("--max-frames", type=int, default=300,
+                        help="frames per video")
+    parser.add_argument("--memory-budget", type=float,
+                        help="fail if a backend's RSS grows by more MB than this")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="report top Python allocation sites (slower)")
+    parser.add_argument("--min-agreement", type=float, default=MIN_AGREEMENT,
+                        help="share of frames a backend must agree with the "
+                             "reference on whether someone is there")
+    parser.add_argument("--max-landmark-error", type=float,
+                        default=MAX_LANDMARK_ERROR,
+                        help="mean landmark distance to the reference allowed")
+    args = parser.parse_args()
+
+    videos = args.videos or sorted(glob.glob(os.path.join(VIDEO_DIR, "*.mp4")))
+    try:
+        report = benchmark_backends(videos, candidate_backends(args.model),
+                                    args.max_frames, args.memory_budget,
+                                    args.trace_memory, args.min_agreement,
+                                    args.max_landmark_error)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"\nBenchmarked {report['frames']} frames\n")
+    for rank, name in enumerate(report["ranking"], 1):
+        r = report["backends"][name]
+        err = r.get("mean_landmark_error")
+        err = f"{err:.4f}" if err is not None else "n/a"
+        print(f"{rank}. {name:<28} {r['mean_ms']:>7.2f} ms  p95 {r['p95_ms']:>7.2f} ms"
+              f"  agree {r.get('detection_agreement', 0) * 100:5.1f}%  err {err}")
+    for name, problem in report["rejected"].items():
+        print(f"-  {name:<28} rejected: {problem}")
+    for name, r in report["backends"].items():
+        if "error" in r:
+            print(f"-  {name:<28} skipped: {r['error']}")
+
+    for name in report["ranking"] + list(report["rejected"]):
+        memory = report["backends"][name].get("memory")
+        if not memory:
+            continue
+        if "rss_growth_mb" in memory:
+            print(f"🧠 {name:<28} RSS {memory['rss_start_mb']} -> "
+                  f"{memory['rss_end_mb']} MB ({memory['rss_growth_mb']:+} MB)")
+        for site in memory["top_sites"]:
+            print(f"     +{site['growth_kb']} KB  {site['site']}")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    path = os.path.join(REPORT_DIR, f"benchmark_{timestamp}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Report: {path}")
+
+    if report.get("over_budget"):
+        print(f"❌ Over the {args.memory_budget} MB memory budget: "
+              f"{', '.join(report['over_budget'])}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -69,3 +69,34 @@ class BodyPartAngle:
         knee_avg = [(r_knee[0] + l_knee[0]) / 2, (r_knee[1] + l_knee[1]) / 2]
 
         return calculate_angle(shoulder_avg, hip_avg, knee_avg)
+
+
+def landmark_angle_series(landmarks):
+    """
+    Vectorized BodyPartAngle over stored landmarks.
+
+    `landmarks` has shape (frames, 33, >=2) with normalized x, y first and
+    NaN rows for frames without a detection. Returns a (frames, 6) array in
+    TypeOfExercise.ANGLE_KEYS order.
+    """
+    lm = np.asarray(landmarks, dtype=float)[..., :2]
+
+    def part(name):
+        return lm[:, mp_pose.PoseLandmark[name].value]
+
+    def mid(left, right):
+        return (part(left) + part(right)) / 2
+
+    shoulder_avg = mid("LEFT_SHOULDER", "RIGHT_SHOULDER")
+    hip_avg = mid("LEFT_HIP", "RIGHT_HIP")
+    knee_avg = mid("LEFT_KNEE", "RIGHT_KNEE")
+    mouth_avg = mid("MOUTH_LEFT", "MOUTH_RIGHT")
+
+    return np.stack([
+        calculate_angles(part("LEFT_SHOULDER"), part("LEFT_ELBOW"), part("LEFT_WRIST")),
+        calculate_angles(part("RIGHT_SHOULDER"), part("RIGHT_ELBOW"), part("RIGHT_WRIST")),
+        calculate_angles(part("LEFT_HIP"), part("LEFT_KNEE"), part("LEFT_ANKLE")),
+        calculate_angles(part("RIGHT_HIP"), part("RIGHT_KNEE"), part("RIGHT_ANKLE")),
+        calculate_angles(shoulder_avg, hip_avg, knee_avg),
+        np.abs(180 - calculate_angles(mouth_avg, shoulder_avg, hip_avg)),
+    ], axis=1)
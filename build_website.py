@@ -0,0 +1,231 @@
+"""
+Offline asset build for the website/ landing pages.
+
+Writes website/dist/, which launch.py serves when it exists:
+
+- images resized to the widths they are shown at (1x and 2x), as WebP with
+  a JPEG fallback, wired up with <picture> / srcset, explicit sizes and
+  lazy loading below the fold
+- a poster frame for the demo video, which loads nothing until played
+  (preload="none") and, when ffmpeg is installed, gets a smaller 480p
+  H.264 variant in front of the original
+- content-hashed file names (hero-image.420.3f9c2e1a7b.webp), so the
+  server can let browsers cache assets for a year; pages stay no-cache
+
+Source images and the video are only read, never modified. The brand
+logo comes from the repository root, where app.py uses it too.
+
+    python build_website.py
+    python build_website.py --video-height 360 --video-crf 32
+"""
+import argparse
+import hashlib
+import html
+import os
+import re
+import shutil
+import subprocess
+
+import cv2
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+WEBSITE_DIR = os.path.join(ROOT_DIR, "website")
+DIST_DIR = os.path.join(WEBSITE_DIR, "dist")
+PAGES = ("home.html", "index.html")
+
+# Source image -> display widths (CSS px), the sizes attribute and how it loads.
+# Both sit above the fold; anything added further down should be "lazy".
+IMAGES = {
+    "hero-image.jpg": {"widths": (420,), "sizes": "(max-width: 480px) 90vw, 420px",
+                       "loading": 'fetchpriority="high"'},
+    "Brand_Icon.jpg": {"widths": (40,), "sizes": "40px", "loading": ""},
+}
+JPEG_QUALITY = 82
+WEBP_QUALITY = 78
+POSTER_WIDTH = 1280
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def emit(out_dir, name, data):
+    """Writes `data` as name.<hash>.ext and returns that file name."""
+    stem, ext = os.path.splitext(name)
+    hashed = f"{stem}.{fingerprint(data)}{ext}"
+    with open(os.path.join(out_dir, hashed), "wb") as f:
+        f.write(data)
+    return hashed
+
+
+def encode(image, ext):
+    params = {".jpg": [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY,
+                       cv2.IMWRITE_JPEG_OPTIMIZE, 1,
+                       cv2.IMWRITE_JPEG_PROGRESSIVE, 1],
+              ".webp": [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY]}[ext]
+    ok, buf = cv2.imencode(ext, image, params)
+    if not ok:
+        raise IOError(f"Could not encode {ext}")
+    return buf.tobytes()
+
+
+# ---------------- IMAGES ----------------
+
+def build_image(path, widths, out_dir):
+    """Variants of one image at 1x and 2x each display width (never upscaled)."""
+    image = cv2.imread(path)
+    if image is None:
+        raise IOError(f"Could not read image: {path}")
+    h, w = image.shape[:2]
+    stem = os.path.splitext(os.path.basename(path))[0]
+
+    pixel_widths = sorted({min(w, width * scale)
+                           for width in widths for scale in (1, 2)})
+    variants = {".webp": [], ".jpg": []}
+    for pw in pixel_widths:
+        resized = image if pw == w else cv2.resize(
+            image, (pw, round(h * pw / w)), interpolation=cv2.INTER_AREA)
+        for ext in variants:
+            name = emit(out_dir, f"{stem}.{pw}{ext}", encode(resized, ext))
+            variants[ext].append((pw, name))
+    return {"width": widths[0], "height": round(h * widths[0] / w),
+            "variants": variants}
+
+
+def picture_tag(asset, sizes, attrs):
+    """<picture> with a WebP srcset and a JPEG <img> fallback."""
+    def srcset(ext):
+        return ", ".join(f"{name} {pw}w" for pw, name in asset["variants"][ext])
+
+    jpgs = asset["variants"][".jpg"]
+    return (f'<picture><source type="image/webp" srcset="{srcset(".webp")}" '
+            f'sizes="{sizes}"><img src="{jpgs[0][1]}" srcset="{srcset(".jpg")}" '
+            f'sizes="{sizes}" width="{asset["width"]}" height="{asset["height"]}" '
+            f'{attrs}></picture>')
+
+
+# ---------------- VIDEO ----------------
+
+def build_poster(path, out_dir):
+    """A frame from a tenth of the way in (the first is often black), as JPEG."""
+    cap = cv2.VideoCapture(path)
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.set(cv2.CAP_PROP_POS_FRAMES, count // 10)
+    ret, frame = cap.read()
+    cap.release()
+    if not ret:
+        return None
+    h, w = frame.shape[:2]
+    if w > POSTER_WIDTH:
+        frame = cv2.resize(frame, (POSTER_WIDTH, round(h * POSTER_WIDTH / w)),
+                           interpolation=cv2.INTER_AREA)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return emit(out_dir, f"{stem}.poster.jpg", encode(frame, ".jpg")), (w, h)
+
+
+def build_video_variant(path, out_dir, height, crf):
+    """A smaller H.264 copy with its index up front, or None without ffmpeg."""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        print("⚠️ ffmpeg not found: keeping only the original video")
+        return None
+    stem = os.path.splitext(os.path.basename(path))[0]
+    tmp = os.path.join(out_dir, f"{stem}.tmp.mp4")
+    subprocess.run(
+        [ffmpeg, "-y", "-loglevel", "error", "-i", path,
+         "-vf", f"scale=-2:{height}", "-c:v", "libx264", "-preset", "slow",
+         "-crf", str(crf), "-pix_fmt", "yuv420p", "-an",
+         "-movflags", "+faststart", tmp],
+        check=True,
+    )
+    with open(tmp, "rb") as f:
+        data = f.read()
+    os.remove(tmp)
+    if len(data) >= os.path.getsize(path):
+        print("⚠️ Re-encoded video is not smaller: keeping only the original")
+        return None
+    return emit(out_dir, f"{stem}.{height}p.mp4", data)
+
+
+def video_tag(sources, poster, size):
+    tags = "".join(f'<source src="{s}" type="video/mp4">' for s in sources)
+    w, h = size
+    poster_attr = f' poster="{poster}"' if poster else ""
+    return (f'<video controls preload="none" playsinline width="{w}" height="{h}"'
+            f'{poster_attr}>{tags}</video>')
+
+
+# ---------------- PAGES ----------------
+
+IMG_TAG = re.compile(r'<img\s+src="([^"]+)"([^>]*?)/?>')
+VIDEO_TAG = re.compile(r'<video[^>]*>\s*<source\s+src="([^"]+)"[^>]*>\s*</video>')
+
+
+def build(out_dir=DIST_DIR, video_height=480, video_crf=30):
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)  # stale fingerprints would pile up otherwise
+    os.makedirs(out_dir)
+
+    def source(name):
+        # One copy of shared brand images: the repository root wins
+        root_copy = os.path.join(ROOT_DIR, name)
+        return root_copy if os.path.exists(root_copy) else os.path.join(WEBSITE_DIR, name)
+
+    images = {}
+    videos = {}
+
+    def rewrite_img(match):
+        name, attrs = match.group(1), match.group(2)
+        config = IMAGES.get(name)
+        if config is None:
+            return match.group(0)
+        if name not in images:
+            images[name] = build_image(source(name), config["widths"], out_dir)
+        # The picture tag sets width/height from the display size
+        attrs = re.sub(r'\s*(width|height)="\d+"', "", attrs).strip()
+        loading = config.get("loading", 'loading="lazy"')
+        extra = f'alt="{html.escape(os.path.splitext(name)[0])}" decoding="async" {loading}'
+        return picture_tag(images[name], config["sizes"],
+                           f"{attrs} {extra}".strip())
+
+    def rewrite_video(match):
+        name = match.group(1)
+        if name not in videos:
+            path = source(name)
+            with open(path, "rb") as f:
+                original = emit(out_dir, name, f.read())
+            poster = build_poster(path, out_dir)
+            small = build_video_variant(path, out_dir, video_height, video_crf)
+            sources = [s for s in (small, original) if s]
+            videos[name] = video_tag(sources, poster[0] if poster else None,
+                                     poster[1] if poster else (1280, 720))
+        return videos[name]
+
+    for page in PAGES:
+        with open(os.path.join(WEBSITE_DIR, page), newline="") as f:
+            text = f.read()
+        text = IMG_TAG.sub(rewrite_img, text)
+        text = VIDEO_TAG.sub(rewrite_video, text)
+        with open(os.path.join(out_dir, page), "w", newline="") as f:
+            f.write(text)
+
+    before = sum(os.path.getsize(source(n)) for n in list(images) + list(videos))
+    after = sum(os.path.getsize(os.path.join(out_dir, f)) for f in os.listdir(out_dir)
+                if not f.endswith(".html"))
+    print(f"✅ Built {out_dir}: {len(os.listdir(out_dir))} files "
+          f"({before / 1024:.0f} KB of sources -> {after / 1024:.0f} KB of variants)")
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build optimized website assets")
+    parser.add_argument("--out", default=DIST_DIR)
+    parser.add_argument("--video-height", type=int, default=480)
+    parser.add_argument("--video-crf", type=int, default=30,
+                        help="H.264 quality, higher is smaller (needs ffmpeg)")
+    args = parser.parse_args()
+    build(args.out, args.video_height, args.video_crf)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Parallel processing of one long recording.
+
+The video is split into time segments that are decoded and run through
+pose inference in separate processes. Each worker seeks to its segment with
+CAP_PROP_POS_FRAMES, starting `overlap_seconds` early so MediaPipe's
+tracker has settled by the first frame that counts. Only the raw angle
+series comes back. The main process joins the segments, smooths them and
+runs batch_counter over the whole series, which carries stage, counter and
+the rep-interval clock across the boundaries exactly like one sequential
+run does. Segments are never shorter than `MIN_SEGMENT_SECONDS`, so a
+short clip isn't cut into pieces that are mostly warm-up.
+
+Auto mode ("auto") needs the streaming exercise classifier, and files
+that don't report a frame count can't be split; both are run
+sequentially with start_engine instead.
+"""
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from batch_counter import count_reps
+from body_part_angle import landmark_angle_series
+from engine import make_backend, open_error, start_engine, write_report
+from filters import filter_series
+from multi_exercise import AUTO
+from types_of_exercise import TypeOfExercise
+
+SEGMENT_SECONDS = 60.0
+OVERLAP_SECONDS = 2.0
+MIN_SEGMENT_SECONDS = 10.0
+
+
+def _process_segment(video_path, start, end, warmup_start,
+                     backend="mediapipe", backend_options=None):
+    """
+    (frame indices, raw angles) of the frames decoded in [start, end);
+    end=None reads to the end of the file. Indices come from the decoder's
+    position, so a seek that landed elsewhere doesn't shift the clock.
+    """
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, warmup_start)
+
+    missing = np.full((33, 2), np.nan)
+    indices = []
+    landmarks = []
+    # The same backend and defaults as start_engine
+    with make_backend(backend, backend_options) as pose:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            idx = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
+            if end is not None and idx >= end:
+                break
+            frame = cv2.resize(frame, (800, 480))
+            points = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if idx >= start:
+                indices.append(idx)
+                landmarks.append(missing if points is None else points[:, :2])
+    cap.release()
+
+    if not landmarks:
+        return np.empty(0, int), np.empty((0, len(TypeOfExercise.ANGLE_KEYS)))
+    return np.array(indices), landmark_angle_series(
+        np.array(landmarks).reshape(-1, 33, 2))
+
+
+def plan_segments(total_frames, fps, workers,
+                  segment_seconds=SEGMENT_SECONDS,
+                  overlap_seconds=OVERLAP_SECONDS,
+                  min_segment_seconds=MIN_SEGMENT_SECONDS):
+    """(start, end, warmup_start) per segment; the last one reads to EOF."""
+    per_segment = int(segment_seconds * fps)
+    n = max(workers, math.ceil(total_frames / max(per_segment, 1)), 1)
+    # Fewer segments than workers rather than segments shorter than the minimum
+    n = max(1, min(n, total_frames // max(int(min_segment_seconds * fps), 1)))
+    size = math.ceil(total_frames / n)
+    overlap = int(overlap_seconds * fps)
+
+    segments = []
+    for start in range(0, total_frames, size):
+        end = start + size
+        segments.append((start, end, max(0, start - overlap)))
+    if segments:
+        start, _, warmup = segments[-1]
+        segments[-1] = (start, None, warmup)
+    return segments
+
+
+def start_engine_chunked(
+    exercise_type,
+    video_path,
+    workers=None,
+    segment_seconds=SEGMENT_SECONDS,
+    overlap_seconds=OVERLAP_SECONDS,
+    smoothing=None,
+    rules=None,
+    backend="mediapipe",
+    backend_options=None
+):
+    """
+    Same result and report as start_engine for a video file, using every core.
+    """
+    if exercise_type == AUTO:
+        print("⚠️ auto detects the exercise while streaming: running sequentially")
+        return start_engine(exercise_type, video_path, smoothing=smoothing,
+                            rules=rules, backend=backend,
+                            backend_options=backend_options, draw=False)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return open_error(exercise_type, video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total_frames <= 0:
+        print("⚠️ Frame count unknown, can't split the video: running sequentially")
+        return start_engine(exercise_type, video_path, smoothing=smoothing,
+                            rules=rules, backend=backend,
+                            backend_options=backend_options, draw=False)
+
+    workers = workers or os.cpu_count() or 1
+    segments = plan_segments(total_frames, fps, workers, segment_seconds,
+                             overlap_seconds)
+
+    start_time = time.time()
+    # spawn: MediaPipe does not survive a fork of a process that imported it
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        parts = list(pool.map(
+            _process_segment,
+            [video_path] * len(segments),
+            *zip(*segments),
+            [backend] * len(segments),
+            [backend_options] * len(segments),
+        ))
+
+    # Timestamps of the frames actually decoded, on the file's own clock
+    # like iter_engine's, so a segment that came up short leaves a gap
+    # instead of pulling every later rep earlier
+    indices = np.concatenate([p[0] for p in parts])
+    raw = np.concatenate([p[1] for p in parts])
+    timestamps = indices / fps
+
+    # Same filter the streaming tracker would pick for this exercise
+    tracker = TypeOfExercise(None, exercise_type, smoothing, rules)
+    name, params = tracker.filter_spec
+    smoothed = filter_series(raw, name, timestamps, **params)
+
+    rule = tracker.rules[exercise_type.lower()]
+    result = count_reps(
+        exercise_type, smoothed, timestamps, rules=tracker.rules,
+        min_rep_interval=rule.get("min_rep_interval", tracker.MIN_REP_INTERVAL)
+    )
+    counter = result["reps"]
+
+    duration = int(time.time() - start_time)
+    report_path, accuracy = write_report(
+        exercise_type, counter, duration, result["good_frames"],
+        result["bad_frames"]
+    )
+
+    return {
+        "exercise": exercise_type,
+        "reps": counter,
+        "duration": duration,
+        "accuracy": accuracy,
+        "report_path": report_path,
+        "segments": len(segments),
+        "rep_times": result["rep_times"].tolist(),
+    }
@@ -1,15 +1,31 @@
+import asyncio
 import cv2
+import math
 import time
 import os
 import csv
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
-import mediapipe as mp
-
+from typing import Optional
+
+import numpy as np
+
+from analytics import RepAnalytics, primary_angle
+from backends import create_backend
+from frame_ring import RingCapture, RingDisplay
+from history import record_session
+from live_capture import LatencyStats, LatestFrameCapture
+from memprofile import MemoryProfiler
+from metrics import ACTIVE_SESSIONS, DROPPED, FPS, FRAMES, INFERENCE, REPS
+from motion import MotionGate
+from multi_exercise import AUTO, AutoExercise
+from quality import QUALITY_LEVELS, DEFAULT_LEVEL, QualityController
+from recorder import VideoRecorder
 from types_of_exercise import TypeOfExercise
-from utils import score_table
-
-mp_drawing = mp.solutions.drawing_utils
-mp_pose = mp.solutions.pose
+from utils import score_table, draw_skeleton
 
 REPORT_DIR = "reports"
 os.makedirs(REPORT_DIR, exist_ok=True)
@@ -19,155 +35,17 @@ def fmt_ang(a):
     return f"{int(a)}°" if a is not None else "N/A"
 
 
-def start_engine(
-    exercise_type,
-    video_source,
-    display_callback=None,
-    stop_callback=None
-):
+def write_report(exercise_type, counter, duration, good_frames, bad_frames,
+                 extra=None, breakdown=None):
     """
-    Core fitness tracking engine.
-    """
-
-    cap = cv2.VideoCapture(video_source)
-    
-    # Safety check for video loading
-    if not cap.isOpened():
-        print(f"❌ Error: Could not open video source: {video_source}")
-        return {
-            "exercise": exercise_type,
-            "reps": 0,
-            "duration": 0,
-            "accuracy": 0,
-            "report_path": "",
-            "error": f"Failed to open video at path: {video_source}"
-        }
-
-    cap.set(3, 800)
-    cap.set(4, 480)
-
-    tracker = TypeOfExercise(None)
-    counter = 0
-    stage = None
-    posture = False
-    progress = 0.0
-
-    start_time = time.time()
-    good_frames = 0
-    bad_frames = 0
-    prev_time = 0
-
-    with mp_pose.Pose(min_detection_confidence=0.5,
-                      min_tracking_confidence=0.5) as pose:
-
-        while cap.isOpened():
-
-            # Stop condition from Streamlit
-            if stop_callback and stop_callback() is False:
-                break
-
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            frame = cv2.resize(frame, (800, 480))
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            rgb.flags.writeable = False
-
-            results = pose.process(rgb)
+    Writes the session text report, appends history.csv and the history
+    rollups (history.py), returns (path, accuracy).
 
-            rgb.flags.writeable = True
-            frame = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
-
-            landmarks = None
-            if results.pose_landmarks:
-                landmarks = results.pose_landmarks.landmark
-
-            if landmarks is not None:
-                tracker.update_landmarks(landmarks)
-
-            # 1. Calculate stats
-            counter, stage, posture, progress = tracker.calculate_exercise(
-                exercise_type, counter, stage
-            )
-
-            if posture:
-                good_frames += 1
-            else:
-                bad_frames += 1
-
-            smoothed = tracker.get_smoothed_angles()
-            debug = []
-
-            # 2. Prepare Debug Text
-            if exercise_type == "squat":
-                debug.append(f"Knee L: {fmt_ang(smoothed.get('left_knee'))}")
-                debug.append(f"Knee R: {fmt_ang(smoothed.get('right_knee'))}")
-
-            elif exercise_type in ("push-up", "pull-up"):
-                debug.append(f"Elbow L: {fmt_ang(smoothed.get('left_elbow'))}")
-                debug.append(f"Elbow R: {fmt_ang(smoothed.get('right_elbow'))}")
-
-            elif exercise_type == "sit-up":
-                debug.append(f"Torso: {fmt_ang(smoothed.get('abdomen'))}")
-
-            posture_text = "Good" if posture else "Bad"
-            
-            # 3. Draw UI Elements
-            frame = score_table(exercise_type, frame, counter, posture_text)
-
-            # Define color for skeleton and text (Green for Good, Red for Bad)
-            fill_color = (0, 255, 0) if posture else (0, 0, 255)
-
-            if results.pose_landmarks:
-                mp_drawing.draw_landmarks(
-                    frame,
-                    results.pose_landmarks,
-                    mp_pose.POSE_CONNECTIONS,
-                    mp_drawing.DrawingSpec(
-                        color=(255, 255, 255),
-                        thickness=2,
-                        circle_radius=2
-                    ),
-                    mp_drawing.DrawingSpec(
-                        color=fill_color,
-                        thickness=3,
-                        circle_radius=3
-                    ),
-                )
-
-            # Draw Debug Text (Angles) - Reverted to x=10
-            for i, txt in enumerate(debug):
-                cv2.putText(frame, txt, (10, 30 + i * 25),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7,
-                            (255, 255, 255), 2)
-
-            cv2.putText(frame, f"Stage: {stage}", (10, 440),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, fill_color, 2)
-
-            cv2.putText(frame, f"Reps: {counter}", (10, 470),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8,
-                        (255, 255, 255), 2)
-
-            curr_time = time.time()
-            fps = int(1 / (curr_time - prev_time)) if prev_time else 0
-            prev_time = curr_time
-
-            if display_callback:
-                display_callback(
-                    frame,
-                    counter,
-                    stage,
-                    posture,
-                    progress,
-                    fps
-                )
-
-    cap.release()
-
-    # ---------------- REPORT ----------------
-    end_time = time.time()
-    duration = int(end_time - start_time)
+    `extra` is a list of (label, value) lines added to the text report.
+    `breakdown`, a list of (exercise, reps, duration, accuracy), replaces
+    the session's one history row, e.g. with each exercise an auto session
+    detected.
+    """
     total_frames = good_frames + bad_frames
     accuracy = (good_frames / total_frames) * 100 if total_frames else 0
 
@@ -183,8 +61,13 @@ def start_engine(
         f.write(f"Good Frames     : {good_frames}\n")
         f.write(f"Bad Frames      : {bad_frames}\n")
         f.write(f"Accuracy        : {accuracy:.2f}%\n")
+        for label, value in extra or []:
+            f.write(f"{label:<16}: {value}\n")
         f.write(f"Date            : {datetime.now()}\n")
 
+    if breakdown is None:
+        breakdown = [(exercise_type, counter, duration, round(accuracy, 2))]
+
     csv_path = os.path.join(REPORT_DIR, "history.csv")
 
     file_exists = os.path.isfile(csv_path)
@@ -196,18 +79,696 @@ def start_engine(
                 ["Date", "Exercise", "Reps", "Duration(s)", "Accuracy(%)"]
             )
 
-        writer.writerow([
-            datetime.now(),
-            exercise_type,
-            counter,
-            duration,
-            round(accuracy, 2)
-        ])
+        for row in breakdown:
+            writer.writerow([datetime.now(), *row])
+
+    # Daily/weekly rollups for the history page; never worth losing the report over
+    try:
+        for row in breakdown:
+            record_session(*row)
+    except sqlite3.Error as e:
+        print(f"⚠️ History not updated: {e}")
+
+    return report_path, accuracy
+
+
+def make_backend(backend="mediapipe", options=None, level=None):
+    """Creates the pose backend; MediaPipe also takes the quality level's model_complexity."""
+    options = dict(options or {})
+    if backend == "mediapipe":
+        level = level or QUALITY_LEVELS[DEFAULT_LEVEL]
+        options.setdefault("model_complexity", level["model_complexity"])
+    return create_backend(backend, **options)
+
+
+def warm_up(backend="mediapipe", backend_options=None):
+    """
+    Loads the pose model and runs one blank frame through it, so the first
+    session doesn't pay for the import, graph setup and first inference.
+    Returns the seconds it took.
+    """
+    t0 = time.perf_counter()
+    with make_backend(backend, backend_options) as pose:
+        pose.process(np.zeros((480, 640, 3), dtype=np.uint8))
+    return time.perf_counter() - t0
 
+
+class SourceOpenError(IOError):
+    """The video source couldn't be opened (raised by iter_engine's first step)."""
+
+
+def open_error(exercise_type, video_source):
+    print(f"❌ Error: Could not open video source: {video_source}")
     return {
         "exercise": exercise_type,
-        "reps": counter,
-        "duration": duration,
-        "accuracy": accuracy,
-        "report_path": report_path
-    }
\ No newline at end of file
+        "reps": 0,
+        "duration": 0,
+        "accuracy": 0,
+        "report_path": "",
+        "error": f"Failed to open video at path: {video_source}"
+    }
+
+
+@dataclass
+class FrameResult:
+    """One processed frame, as yielded by iter_engine."""
+    frame: np.ndarray
+    landmarks: Optional[np.ndarray]
+    counter: int
+    stage: Optional[str]
+    posture: bool
+    progress: float
+    fps: int
+    frame_index: int
+    timestamp: float
+    idle: bool = False
+    dropped: int = 0
+    timings: dict = field(default_factory=dict)
+    captured_at: float = 0.0  # wall time the frame left the camera/decoder
+
+
+class EngineSession:
+    """
+    Counting state of one workout: tracker, counter, stage and frame stats.
+
+    iter_engine drives it frame by frame; finish() writes the report and
+    returns the same summary dict start_engine always returned.
+    With exercise_type "auto", every exercise is counted and the detected
+    one is shown (see multi_exercise.py); `counter` is then the total.
+    """
+
+    def __init__(self, exercise_type, smoothing=None, rules=None,
+                 motion_gate=False, target_fps=None, recorder=None,
+                 profile_memory=False):
+        self.exercise_type = exercise_type
+        self.tracker = TypeOfExercise(None, exercise_type, smoothing, rules)
+        self.gate = motion_gate if isinstance(motion_gate, MotionGate) else (
+            MotionGate() if motion_gate else None
+        )
+        self.quality = QualityController(target_fps) if target_fps else None
+        self.recorder = recorder
+        self.auto = None
+        self.analytics = None
+        self.analytics_by_exercise = {}
+        self.judged_by_exercise = {}  # auto: [good, bad] frames per exercise
+        if exercise_type == AUTO:
+            # Landmarks are normalized to iter_engine's 800x480 frames
+            self.auto = AutoExercise(self.tracker.rules, aspect=800 / 480)
+        else:
+            self.analytics = RepAnalytics(exercise_type, self.tracker.rules)
+        self.latency = None  # LatencyStats, filled in by the display side
+        self.memory = profile_memory if isinstance(profile_memory, MemoryProfiler) else (
+            MemoryProfiler() if profile_memory else None
+        )
+        self.counter = 0
+        self.stage = None
+        self.posture = False
+        self.progress = 0.0
+        self.good_frames = 0
+        self.bad_frames = 0
+        self.dropped_frames = 0
+        self.skipped_frames = 0
+        self.analysis_fps = None
+        self.start_time = time.time()
+
+    @property
+    def exercise(self):
+        """The exercise being counted: in auto mode the detected one, if any yet."""
+        if self.auto:
+            return self.auto.exercise or AUTO
+        return self.exercise_type
+
+    @property
+    def level(self):
+        return self.quality.level if self.quality else QUALITY_LEVELS[DEFAULT_LEVEL]
+
+    # Sessions pickle into checkpoints; the clock keeps only the elapsed
+    # time, so a resumed session doesn't count the downtime as workout time.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["start_time"] = time.time() - self.start_time
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.start_time = time.time() - state["start_time"]
+
+    def step(self, landmarks, frame_time):
+        if landmarks is not None:
+            self.tracker.update_landmarks(landmarks, frame_time)
+
+        if self.auto:
+            reps = self._step_auto(landmarks is not None, frame_time)
+            if reps is None:
+                return  # no exercise detected yet: nothing to judge
+        else:
+            self.counter, self.stage, self.posture, self.progress = \
+                self.tracker.calculate_exercise(
+                    self.exercise_type, self.counter, self.stage, frame_time
+                )
+            reps = self.counter
+
+        if self.posture:
+            self.good_frames += 1
+        else:
+            self.bad_frames += 1
+        if self.auto:
+            judged = self.judged_by_exercise.setdefault(self.auto.exercise, [0, 0])
+            judged[0 if self.posture else 1] += 1
+
+        angle = primary_angle(self.tracker.get_smoothed_angles(),
+                              self.analytics.joints)
+        self.analytics.update(frame_time, angle, reps, self.stage,
+                              self.posture)
+
+    def _step_auto(self, detected, frame_time):
+        """Steps every exercise; returns the detected one's reps, or None."""
+        auto = self.auto
+        auto.update(self.tracker.get_smoothed_vector(),
+                    self.tracker.landmarks if detected else None, frame_time)
+        self.counter = auto.total
+        self.stage, self.posture, self.progress = auto.current()
+        if auto.exercise is None:
+            return None
+        self.analytics = self.analytics_by_exercise.get(auto.exercise)
+        if self.analytics is None:
+            self.analytics = RepAnalytics(auto.exercise, self.tracker.rules)
+            self.analytics_by_exercise[auto.exercise] = self.analytics
+        return auto.reps[auto.exercise]
+
+    def finish(self):
+        duration = int(time.time() - self.start_time)
+
+        breakdown = None
+        if self.auto:
+            # History gets a row per detected exercise rather than one "auto"
+            # row; judged frames split the duration between them
+            judged = sum(map(sum, self.judged_by_exercise.values()))
+            breakdown = [
+                (et, self.auto.reps[et], round(duration * (good + bad) / judged),
+                 round(100 * good / (good + bad), 2))
+                for et, (good, bad) in self.judged_by_exercise.items()
+            ]
+            extra = []
+            for et, analytics in self.analytics_by_exercise.items():
+                analytics.finish()
+                extra.append((f"Reps ({et})", self.auto.reps[et]))
+                extra += [(f"  {label}", value)
+                          for label, value in analytics.report_lines()]
+            if self.auto.switches:
+                extra.append(("Detected", ", ".join(
+                    f"{et} @ {t}s" for t, et in self.auto.switches)))
+        else:
+            self.analytics.finish()
+            extra = self.analytics.report_lines()
+        if self.dropped_frames:
+            extra.append(("Dropped Frames", self.dropped_frames))
+        if self.analysis_fps:
+            extra.append(("Analysis FPS", f"{self.analysis_fps} "
+                                          f"({self.skipped_frames} frames skipped)"))
+        latency = self.latency.summary() if self.latency else None
+        if latency:
+            extra.append(("Latency", f"{latency['avg_ms']} ms avg, "
+                                     f"{latency['p95_ms']} ms p95, "
+                                     f"{latency['max_ms']} ms max"))
+        if self.memory:
+            self.memory.stop()
+            extra += self.memory.report_lines()
+        if self.recorder:
+            recording = self.recorder.close()
+            extra.append(("Recording", f"{recording['path']} "
+                                       f"({recording['written']} frames, "
+                                       f"{recording['dropped']} dropped)"))
+        if self.gate:
+            motion_stats = self.gate.stats()
+            extra += [
+                ("Idle Time", f"{motion_stats['idle_seconds']} seconds"),
+                ("Wake-ups", motion_stats["wakeups"]),
+                ("Wake Latency", f"{motion_stats['wake_latency_ms_avg']} ms avg, "
+                                 f"{motion_stats['wake_latency_ms_max']} ms max"),
+            ]
+        if self.quality:
+            extra.append(("Quality", f"{self.level['name']} "
+                                     f"({len(self.quality.switches)} switches)"))
+            for sw in self.quality.switches:
+                failed = " FAILED" if sw.get("failed") else ""
+                extra.append((f"  @ {sw['time']}s",
+                              f"{sw['from']} -> {sw['to']} "
+                              f"(avg {sw['avg_ms']} ms){failed}"))
+
+        report_path, accuracy = write_report(
+            self.exercise_type, self.counter, duration, self.good_frames,
+            self.bad_frames, extra, breakdown
+        )
+
+        result = {
+            "exercise": self.exercise_type,
+            "reps": self.counter,
+            "duration": duration,
+            "accuracy": accuracy,
+            "report_path": report_path,
+            "analytics": self.analytics.summary() if not self.auto else {
+                et: a.summary() for et, a in self.analytics_by_exercise.items()
+            }
+        }
+        if self.auto:
+            result["exercises"] = dict(self.auto.reps)
+            result["switches"] = self.auto.switches
+        if self.dropped_frames:
+            result["dropped_frames"] = self.dropped_frames
+        if self.recorder:
+            result["recording"] = recording
+        if latency:
+            result["latency"] = latency
+        if self.memory and self.memory.summary():
+            result["memory"] = self.memory.summary()
+        if self.gate:
+            result["motion"] = motion_stats
+        if self.quality:
+            result["quality"] = {"level": self.level["name"],
+                                 "switches": self.quality.switches}
+        return result
+
+
+def draw_overlay(frame, session, landmarks, overlay="full"):
+    exercise_type = session.exercise
+    counter, stage, posture = session.counter, session.stage, session.posture
+    if session.auto:
+        counter = session.auto.reps.get(exercise_type, 0)
+
+    smoothed = session.tracker.get_smoothed_angles()
+    debug = []
+
+    # 2. Prepare Debug Text
+    if overlay != "full":
+        pass
+    elif exercise_type == "squat":
+        debug.append(f"Knee L: {fmt_ang(smoothed.get('left_knee'))}")
+        debug.append(f"Knee R: {fmt_ang(smoothed.get('right_knee'))}")
+
+    elif exercise_type in ("push-up", "pull-up"):
+        debug.append(f"Elbow L: {fmt_ang(smoothed.get('left_elbow'))}")
+        debug.append(f"Elbow R: {fmt_ang(smoothed.get('right_elbow'))}")
+
+    elif exercise_type == "sit-up":
+        debug.append(f"Torso: {fmt_ang(smoothed.get('abdomen'))}")
+
+    posture_text = "Good" if posture else "Bad"
+
+    # 3. Draw UI Elements
+    frame = score_table(exercise_type, frame, counter, posture_text)
+
+    # Define color for skeleton and text (Green for Good, Red for Bad)
+    fill_color = (0, 255, 0) if posture else (0, 0, 255)
+
+    if landmarks is not None and overlay != "minimal":
+        draw_skeleton(frame, landmarks, fill_color)
+
+    # Draw Debug Text (Angles) - Reverted to x=10
+    for i, txt in enumerate(debug):
+        cv2.putText(frame, txt, (10, 30 + i * 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7,
+                    (255, 255, 255), 2)
+
+    cv2.putText(frame, f"Stage: {stage}", (10, 440),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, fill_color, 2)
+
+    cv2.putText(frame, f"Reps: {counter}", (10, 470),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8,
+                (255, 255, 255), 2)
+    return frame
+
+
+def iter_engine(
+    exercise_type,
+    video_source,
+    session=None,
+    stop_callback=None,
+    cancel_event=None,
+    drop_frames=False,
+    draw=True,
+    start_frame=0,
+    analysis_fps=None,
+    backend="mediapipe",
+    backend_options=None,
+    **session_options
+):
+    """
+    Pull-style engine: a generator of FrameResult records.
+
+    Nothing is decoded until the consumer asks for the next frame, so the
+    consumer sets the pace. With `drop_frames`, frames that went by while
+    the last frame was being processed and consumed are skipped with
+    cap.grab() instead of being queued up, so the output keeps up with real
+    time (files are paced at their own frame rate). `cancel_event`
+    (a threading.Event) stops the engine between any two stages of a
+    frame; closing the generator works too. `session` continues an
+    existing EngineSession, otherwise one is created from
+    `session_options` (smoothing, rules, motion_gate, target_fps, recorder,
+    profile_memory).
+    `start_frame` seeks a file before the first frame, e.g. to resume a
+    checkpointed session (see jobs.py). `video_source` may also be an open
+    capture object, such as a still-uploading ingest.GrowingCapture.
+    `analysis_fps` samples files down to that rate: frames in between are
+    only grabbed, never decoded to images. Timestamps stay on the file's
+    own clock, so rep timing doesn't change.
+
+    Raises SourceOpenError (an IOError) if the source can't be opened;
+    any other error comes from processing, not from opening.
+    """
+    # A capture-like object (e.g. ingest.GrowingCapture) is used as is
+    cap = video_source if hasattr(video_source, "read") else \
+        cv2.VideoCapture(video_source)
+    if not cap.isOpened():
+        cap.release()
+        raise SourceOpenError(f"Could not open video source: {video_source}")
+
+    session = session or EngineSession(exercise_type, **session_options)
+    gate, quality = session.gate, session.quality
+    cancel_event = cancel_event or threading.Event()
+
+    # Metric children looked up once, so a frame costs a few locked adds
+    exercise = session.exercise_type
+    frames_total, dropped_total = FRAMES.labels(exercise), DROPPED.labels(exercise)
+    inference, fps_gauge = INFERENCE.labels(exercise), FPS.labels(exercise)
+    reps_total, active = REPS.labels(exercise), ACTIVE_SESSIONS.labels()
+
+    def cancelled():
+        if stop_callback and stop_callback() is False:
+            cancel_event.set()
+        return cancel_event.is_set()
+
+    # Rep timing follows the video clock for files, so a file always counts
+    # the same however fast it is processed (see chunked_engine).
+    is_live = isinstance(video_source, int) or getattr(cap, "live", False)
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_idx = 0
+    # Fraction of frames to analyze; frame i is taken when floor(i * ratio) steps
+    ratio = None
+    if analysis_fps and not is_live and analysis_fps < video_fps:
+        ratio = analysis_fps / video_fps
+        session.analysis_fps = analysis_fps
+    if start_frame and not is_live:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        frame_idx = start_frame
+
+    cap.set(3, 800)
+    cap.set(4, 480)
+
+    level = session.level
+    pose = None
+    prev_time = 0
+    last_read = None
+
+    active.inc()
+    try:
+        pose = make_backend(backend, backend_options, level)
+
+        while cap.isOpened() and not cancelled():
+
+            dropped = 0
+            if drop_frames and last_read is not None:
+                # Skip what went by since the last frame was read
+                behind = int((time.time() - last_read) * video_fps)
+                while dropped < behind - 1 and cap.grab():
+                    dropped += 1
+                frame_idx += dropped
+                session.dropped_frames += dropped
+                if dropped:
+                    dropped_total.inc(dropped)
+
+            t0 = last_read = time.time()
+            if ratio:
+                while (frame_idx and math.floor(frame_idx * ratio) ==
+                       math.floor((frame_idx - 1) * ratio)):
+                    if not cap.grab():
+                        break
+                    frame_idx += 1
+                    session.skipped_frames += 1
+            ret, frame = cap.read()
+            if not ret or cancelled():
+                break
+            # A grabber thread knows when the frame was really captured
+            captured_at = getattr(cap, "last_capture_time", None) or t0
+            frame_time = captured_at if is_live else frame_idx / video_fps
+            frame_idx += 1
+
+            frame = cv2.resize(frame, (800, 480))
+            t_decode = time.time()
+
+            # Idle: nobody in front of the camera, skip inference entirely
+            if gate and not gate.should_infer(frame, captured_at):
+                if draw:
+                    cv2.putText(frame, "Idle - step in front of the camera",
+                                (10, 440), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
+                                (255, 255, 255), 2)
+                prev_time = 0
+                if session.recorder:
+                    session.recorder.write(frame)
+                frames_total.inc()
+                if session.memory:
+                    session.memory.sample()
+                yield FrameResult(
+                    frame, None, session.counter, session.stage,
+                    session.posture, session.progress, 0, frame_idx - 1,
+                    frame_time, idle=True, dropped=dropped,
+                    captured_at=captured_at
+                )
+                if is_live and cancel_event.wait(gate.idle_interval):
+                    break
+                continue
+
+            # Landmarks are normalized, so inference can run at a lower
+            # resolution than the displayed frame.
+            infer = frame
+            if level["size"] != (800, 480):
+                infer = cv2.resize(frame, level["size"],
+                                   interpolation=cv2.INTER_AREA)
+            rgb = cv2.cvtColor(infer, cv2.COLOR_BGR2RGB)
+            rgb.flags.writeable = False
+
+            landmarks = pose.process(rgb)
+            t_infer = time.time()
+            if cancelled():
+                break
+
+            if gate:
+                gate.after_inference(landmarks is not None)
+
+            # 1. Calculate stats
+            reps_before = session.counter
+            session.step(landmarks, frame_time)
+            t_track = time.time()
+            if session.counter > reps_before:
+                reps_total.inc(session.counter - reps_before)
+
+            if draw:
+                frame = draw_overlay(frame, session, landmarks,
+                                     level["overlay"])
+            t_draw = time.time()
+
+            fps = int(1 / (t_draw - prev_time)) if prev_time else 0
+            prev_time = t_draw
+
+            if quality and quality.record(t_draw - t0):
+                new_level = quality.level
+                if (backend == "mediapipe" and
+                        new_level["model_complexity"] != level["model_complexity"]):
+                    try:
+                        new_pose = make_backend(backend, backend_options, new_level)
+                    except Exception as e:
+                        # e.g. the lite/heavy model is not downloaded on an offline kiosk
+                        print(f"⚠️ Quality level '{new_level['name']}' unavailable: {e}")
+                        quality.reject(str(e))
+                        new_level = level
+                    else:
+                        pose.close()
+                        pose = new_pose
+                level = new_level
+
+            if session.recorder:
+                session.recorder.write(frame)
+            frames_total.inc()
+            inference.observe(t_infer - t_decode)
+            fps_gauge.set(fps)
+            if session.memory:
+                session.memory.sample()
+            yield FrameResult(
+                frame, landmarks, session.counter, session.stage,
+                session.posture, session.progress, fps, frame_idx - 1,
+                frame_time, dropped=dropped,
+                timings={
+                    "decode_ms": (t_decode - t0) * 1000,
+                    "inference_ms": (t_infer - t_decode) * 1000,
+                    "tracking_ms": (t_track - t_infer) * 1000,
+                    "draw_ms": (t_draw - t_track) * 1000,
+                    "total_ms": (t_draw - t0) * 1000,
+                    "capture_age_ms": (t_draw - captured_at) * 1000,
+                },
+                captured_at=captured_at,
+            )
+
+    finally:
+        active.dec()
+        if pose is not None:
+            pose.close()
+        cap.release()
+
+
+_DONE = object()
+
+
+async def aiter_engine(exercise_type, video_source, executor=None, ready=None,
+                       **kwargs):
+    """
+    Async iterator over iter_engine. Each frame is produced on a worker
+    thread only when awaited; cancelling the consuming task stops the engine
+    at the next stage boundary instead of after a whole frame.
+
+    `executor` lets many streams share one thread pool (see service.py);
+    by default each stream gets its own thread. `ready`, a coroutine
+    function, is awaited before each step, so a stream whose input hasn't
+    arrived yet waits on the event loop instead of on a pool thread.
+    """
+    cancel_event = threading.Event()
+    gen = iter_engine(exercise_type, video_source, cancel_event=cancel_event,
+                      **kwargs)
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=1)
+    pending = None
+    try:
+        while True:
+            if ready is not None:
+                await ready()
+            pending = executor.submit(next, gen, _DONE)
+            item = await asyncio.wrap_future(pending)
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        cancel_event.set()
+        try:
+            # Steps never overlap: close() runs once the step in flight is
+            # done. Both are awaited, so once this returns the source is
+            # released and the caller may delete it
+            if pending is not None and not pending.done():
+                await asyncio.wait([asyncio.wrap_future(pending)])
+            await asyncio.wrap_future(executor.submit(gen.close))
+        finally:
+            if own_executor:
+                executor.shutdown(wait=False)
+
+
+def start_engine(
+    exercise_type,
+    video_source,
+    display_callback=None,
+    stop_callback=None,
+    smoothing=None,
+    rules=None,
+    motion_gate=False,
+    target_fps=None,
+    backend="mediapipe",
+    backend_options=None,
+    record=None,
+    record_fps=30.0,
+    capture_process=False,
+    low_latency=False,
+    analysis_fps=None,
+    profile_memory=False,
+    draw=True,
+    display_process=False
+):
+    """
+    Core fitness tracking engine.
+
+    `exercise_type` "auto" counts every exercise and detects which one is
+    being done, for members switching exercises (see multi_exercise.py).
+    `smoothing` overrides the exercise's angle filter, as a (name, params)
+    pair for filters.make_filter, e.g. ("one_euro", {"beta": 0.05}).
+    `rules` overrides rep thresholds per exercise (see tuner.load_rules).
+    `motion_gate` (True or a MotionGate) skips inference while nobody is in
+    front of the camera and polls at a low rate until motion wakes it.
+    `target_fps` turns on the adaptive QualityController, which trades model
+    complexity, inference resolution and overlay detail for frame time.
+    `backend` / `backend_options` pick the pose model (see backends.py).
+    `record` saves the annotated video: an .mp4 path (written at
+    `record_fps`) or a recorder.VideoRecorder.
+    `capture_process` decodes the source in a separate process that hands
+    frames over through shared memory (see frame_ring.py).
+    `low_latency` (cameras) always processes the newest frame and reports
+    capture-to-display latency (see live_capture.py).
+    `analysis_fps` analyzes files at a lower frame rate, skipping the
+    decode of the frames in between.
+    `profile_memory` (True or a memprofile.MemoryProfiler) samples RSS and
+    tracemalloc during the session and adds a memory summary to the report.
+    `draw=False` skips the overlay when nobody looks at the frames.
+    `display_process` shows the annotated frames in a separate process fed
+    through shared memory (see frame_ring.py); pressing 'q' there stops.
+    """
+    if isinstance(record, str):
+        record = VideoRecorder(record, fps=record_fps)
+    capture = video_source
+    if low_latency and isinstance(video_source, int):
+        capture = LatestFrameCapture(video_source)
+    elif capture_process:
+        capture = RingCapture(video_source)
+    session = EngineSession(exercise_type, smoothing, rules, motion_gate,
+                            target_fps, record, profile_memory)
+    if low_latency:
+        session.latency = LatencyStats()
+
+    viewer = RingDisplay() if display_process else None
+    if viewer:
+        shown, keep_running = display_callback, stop_callback
+
+        def display_callback(*args):
+            viewer.show(*args)
+            if shown:
+                shown(*args)
+
+        def stop_callback():
+            return viewer.running() and (
+                keep_running is None or keep_running() is not False)
+
+    frames = iter_engine(
+        exercise_type,
+        capture,
+        session=session,
+        stop_callback=stop_callback,
+        analysis_fps=analysis_fps,
+        backend=backend,
+        backend_options=backend_options,
+        draw=draw
+    )
+    try:
+        r = next(frames, None)
+        while r is not None:
+            if display_callback:
+                display_callback(
+                    r.frame,
+                    r.counter,
+                    r.stage,
+                    r.posture,
+                    r.progress,
+                    r.fps
+                )
+            if session.latency and not r.idle:
+                session.latency.add(time.time() - r.captured_at)
+            r = next(frames, None)
+    except SourceOpenError:
+        if record:
+            record.close()
+        return open_error(exercise_type, video_source)
+    except BaseException:
+        # Whatever stopped the session, the reps counted so far are reported
+        frames.close()
+        session.finish()
+        raise
+    finally:
+        if viewer:
+            viewer.close()
+
+    # ---------------- REPORT ----------------
+    return session.finish()
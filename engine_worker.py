@@ -0,0 +1,223 @@
+"""
+Background engine workers for the web app.
+
+Each browser session gets at most one EngineWorker: a thread that runs
+iter_engine and keeps only the newest frame in a lock-protected buffer.
+The page polls that buffer and renders at its own pace, so it stays
+responsive during a workout. stop() sets the engine's cancel event, which
+iter_engine checks between every stage of a frame, so Stop takes effect
+within one frame.
+
+A reaper thread stops workers whose page stopped polling for
+`ORPHAN_TIMEOUT` seconds or whose Streamlit session is gone (tab closed),
+so abandoned kiosk tabs don't keep the camera and CPU busy.
+
+prewarm() loads the pose model in the background when the app starts, and
+flips the metrics server's /ready probe once it has run a frame.
+"""
+import threading
+import time
+
+from engine import (EngineSession, SourceOpenError, iter_engine, open_error,
+                    warm_up)
+from live_capture import LatencyStats, LatestFrameCapture
+from metrics import READY, WARMUP
+
+ORPHAN_TIMEOUT = 15.0
+REAP_INTERVAL = 2.0
+SESSION_OPTIONS = ("smoothing", "rules", "motion_gate", "target_fps",
+                   "recorder", "profile_memory")
+
+
+class EngineWorker:
+    def __init__(self, exercise_type, video_source, owner=None, **options):
+        self.exercise_type = exercise_type
+        self.video_source = video_source
+        self.owner = owner
+        self.session = EngineSession(
+            exercise_type,
+            **{k: options.pop(k) for k in SESSION_OPTIONS if k in options}
+        )
+        if options.pop("low_latency", False) and isinstance(video_source, int):
+            self.video_source = LatestFrameCapture(video_source)
+            self.session.latency = LatencyStats()
+        self._engine_options = options
+        self._cancel = threading.Event()
+        self._cond = threading.Condition()
+        self._latest = None
+        self._seq = 0
+        self.result = None
+        self.last_seen = time.time()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f"engine-{owner}")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def done(self):
+        return self.result is not None
+
+    def _run(self):
+        result = error = None
+        try:
+            for r in iter_engine(self.exercise_type, self.video_source,
+                                 session=self.session,
+                                 cancel_event=self._cancel,
+                                 **self._engine_options):
+                with self._cond:
+                    self._latest = r
+                    self._seq += 1
+                    self._cond.notify_all()
+        except SourceOpenError:
+            result = open_error(self.exercise_type, self.video_source)
+        except Exception as e:
+            print(f"❌ Engine worker failed: {e}")
+            error = f"Engine stopped: {e}"
+        finally:
+            # Whatever stopped the engine, the reps counted so far are
+            # reported and the recording is closed
+            try:
+                if result is None:
+                    result = self.session.finish()
+                elif self.session.recorder:
+                    self.session.recorder.close()
+            except Exception as e:
+                print(f"❌ Engine worker failed to finish: {e}")
+                error = error or f"Engine stopped: {e}"
+                result = open_error(self.exercise_type, self.video_source)
+            if error:
+                result = dict(result, error=error)
+            with self._cond:
+                self.result = result
+                self._cond.notify_all()
+
+    def poll(self, after=0, timeout=0.5):
+        """
+        Waits up to `timeout` for a frame newer than sequence number `after`.
+        Returns (seq, FrameResult or None). Counts as a sign of life.
+        """
+        self.last_seen = time.time()
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after or self.done, timeout)
+            if self._seq > after:
+                return self._seq, self._latest
+            return after, None
+
+    def displayed(self, r):
+        """Tells the worker frame `r` is on screen now (capture-to-display latency)."""
+        if self.session.latency and not r.idle:
+            self.session.latency.add(time.time() - r.captured_at)
+
+    def stop(self, wait=None):
+        """Stops the engine at the next stage boundary; returns the result if it finished in `wait` seconds."""
+        self._cancel.set()
+        if wait:
+            self._thread.join(wait)
+        return self.result
+
+
+# ---------------- REGISTRY ----------------
+
+_workers = {}
+_lock = threading.Lock()
+_reaper = None
+_warmer = None
+
+
+def start_worker(owner, exercise_type, video_source, **options):
+    """Starts the engine for `owner` (a browser session), replacing any previous one."""
+    stop_worker(owner)
+    worker = EngineWorker(exercise_type, video_source, owner, **options)
+    with _lock:
+        _workers[owner] = worker
+    _ensure_reaper()
+    return worker.start()
+
+
+def get_worker(owner):
+    with _lock:
+        return _workers.get(owner)
+
+
+def stop_worker(owner, wait=2.0):
+    """Stops and forgets the owner's worker; returns its result, if any."""
+    with _lock:
+        worker = _workers.pop(owner, None)
+    if worker is None:
+        return None
+    return worker.stop(wait)
+
+
+def release_worker(owner):
+    """Forgets a finished worker once its result has been shown."""
+    with _lock:
+        worker = _workers.get(owner)
+        if worker is not None and worker.done:
+            del _workers[owner]
+
+
+def _session_alive(owner):
+    """False once Streamlit knows the browser session is gone; True if unsure."""
+    try:
+        from streamlit.runtime import exists, get_instance
+        if exists():
+            return get_instance().is_active_session(owner)
+    except Exception:
+        pass
+    return True
+
+
+def reap_orphans(timeout=None):
+    timeout = timeout or ORPHAN_TIMEOUT
+    now = time.time()
+    with _lock:
+        orphans = [owner for owner, w in _workers.items()
+                   if now - w.last_seen > timeout or not _session_alive(owner)]
+        workers = [_workers.pop(owner) for owner in orphans]
+    for worker in workers:
+        if not worker.done:
+            print(f"🧹 Stopping orphaned engine of session {worker.owner}")
+        worker.stop()
+    return len(workers)
+
+
+def _reap_forever():
+    while True:
+        time.sleep(REAP_INTERVAL)
+        try:
+            reap_orphans()
+        except Exception as e:
+            print(f"⚠️ Reaper error: {e}")
+
+
+def _ensure_reaper():
+    global _reaper
+    with _lock:
+        if _reaper is None or not _reaper.is_alive():
+            _reaper = threading.Thread(target=_reap_forever, daemon=True,
+                                       name="engine-reaper")
+            _reaper.start()
+
+
+def _warm_up():
+    try:
+        seconds = warm_up()
+    except Exception as e:
+        print(f"⚠️ Pose model warm-up failed: {e}")
+        return
+    WARMUP.labels().set(round(seconds, 3))
+    READY.labels().set(1)
+    print(f"🔥 Pose model warmed up in {seconds:.2f}s")
+
+
+def prewarm():
+    """Warms the pose model on a background thread; once per process."""
+    global _warmer
+    with _lock:
+        if _warmer is None:
+            _warmer = threading.Thread(target=_warm_up, daemon=True,
+                                       name="engine-warmup")
+            _warmer.start()
+    return _warmer
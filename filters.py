@@ -0,0 +1,194 @@
+import math
+import numpy as np
+
+# How often the moving average recomputes its running sums from the raw
+# buffer, so floating point drift can never build up over long sessions.
+RESYNC_EVERY = 1000
+
+
+class AngleFilter:
+    """
+    Base class for streaming angle filters.
+
+    A filter smooths a fixed-size vector of channels (one per tracked angle)
+    in a single vectorized step. Missing samples are passed as NaN and leave
+    that channel untouched. Channels that never received a sample read NaN.
+    """
+
+    def __init__(self, n_channels):
+        self.n_channels = n_channels
+        self._value = np.full(n_channels, np.nan)
+
+    def update(self, values, timestamp=None):
+        values = np.asarray(values, dtype=float)
+        mask = ~np.isnan(values)
+        if mask.any():
+            self._update(values, mask, timestamp)
+        return self._value.copy()
+
+    def _update(self, values, mask, timestamp):
+        raise NotImplementedError
+
+    @property
+    def value(self):
+        return self._value.copy()
+
+    def reset(self):
+        self._value[:] = np.nan
+
+
+class MovingAverageFilter(AngleFilter):
+    """Simple moving average over the last `window` samples, kept as a running sum."""
+
+    def __init__(self, n_channels, window=3):
+        super().__init__(n_channels)
+        self.window = max(1, int(window))
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self._buf = np.zeros((self.window, self.n_channels))
+        self._head = np.zeros(self.n_channels, dtype=int)
+        self._count = np.zeros(self.n_channels, dtype=int)
+        self._sum = np.zeros(self.n_channels)
+        self._updates = 0
+
+    def _update(self, values, mask, timestamp):
+        cols = np.nonzero(mask)[0]
+        rows = self._head[cols]
+        new = values[cols]
+
+        # Slots that have not been filled yet are still zero, so subtracting
+        # them is a no-op until the window is full.
+        self._sum[cols] += new - self._buf[rows, cols]
+        self._buf[rows, cols] = new
+        self._head[cols] = (rows + 1) % self.window
+        self._count[cols] = np.minimum(self._count[cols] + 1, self.window)
+
+        self._updates += 1
+        if self._updates % RESYNC_EVERY == 0:
+            self._sum = self._buf.sum(axis=0)
+
+        self._value[cols] = self._sum[cols] / self._count[cols]
+
+
+class EMAFilter(AngleFilter):
+    """Exponential moving average. Higher `alpha` follows the signal faster."""
+
+    def __init__(self, n_channels, alpha=0.5):
+        super().__init__(n_channels)
+        self.alpha = float(alpha)
+
+    def _update(self, values, mask, timestamp):
+        prev = self._value[mask]
+        new = values[mask]
+        self._value[mask] = np.where(
+            np.isnan(prev), new, prev + self.alpha * (new - prev)
+        )
+
+
+class OneEuroFilter(AngleFilter):
+    """
+    One Euro filter (Casiez et al.): heavy smoothing when the joint is still,
+    little lag when it moves fast. Uses the frame timestamp when given,
+    otherwise assumes a constant `freq`.
+    """
+
+    def __init__(self, n_channels, min_cutoff=1.0, beta=0.05, d_cutoff=1.0,
+                 freq=30.0):
+        super().__init__(n_channels)
+        self.min_cutoff = float(min_cutoff)
+        self.beta = float(beta)
+        self.d_cutoff = float(d_cutoff)
+        self.freq = float(freq)
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self._dx = np.zeros(self.n_channels)
+        self._last_t = np.full(self.n_channels, np.nan)
+
+    @staticmethod
+    def _alpha(dt, cutoff):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def _update(self, values, mask, timestamp):
+        x = values[mask]
+        prev = self._value[mask]
+        first = np.isnan(prev)
+
+        if timestamp is None:
+            dt = np.full(x.shape, 1.0 / self.freq)
+        else:
+            dt = timestamp - self._last_t[mask]
+            dt = np.where(np.isnan(dt) | (dt <= 0), 1.0 / self.freq, dt)
+            self._last_t[mask] = timestamp
+
+        prev = np.where(first, x, prev)
+        dx = (x - prev) / dt
+        dx_hat = self._dx[mask] + self._alpha(dt, self.d_cutoff) * (dx - self._dx[mask])
+        cutoff = self.min_cutoff + self.beta * np.abs(dx_hat)
+        a = self._alpha(dt, cutoff)
+
+        self._dx[mask] = np.where(first, 0.0, dx_hat)
+        self._value[mask] = prev + a * (x - prev)
+
+
+FILTERS = {
+    "moving_average": MovingAverageFilter,
+    "ema": EMAFilter,
+    "one_euro": OneEuroFilter,
+}
+
+
+def make_filter(name, n_channels, **params):
+    """Builds a filter by name, e.g. make_filter("ema", 6, alpha=0.3)."""
+    try:
+        cls = FILTERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown filter '{name}'. Choose from: {', '.join(FILTERS)}"
+        )
+    return cls(n_channels, **params)
+
+
+def moving_average_series(values, window=3):
+    """
+    Whole-series MovingAverageFilter: row i equals what the streaming filter
+    returns after the first i + 1 rows, NaN gaps included (the previous
+    value is held). Built from cumulative sums, no per-frame loop.
+    """
+    values = np.asarray(values, dtype=float)
+    window = max(1, int(window))
+    out = np.full(values.shape, np.nan)
+
+    for j in range(values.shape[1]):
+        valid = ~np.isnan(values[:, j])
+        v = values[valid, j]
+        if not len(v):
+            continue
+        csum = np.concatenate(([0.0], np.cumsum(v)))
+        k = np.arange(1, len(v) + 1)
+        lo = np.maximum(k - window, 0)
+        means = (csum[k] - csum[lo]) / (k - lo)
+
+        # position of each frame's latest valid sample, -1 before the first
+        idx = np.where(valid, np.cumsum(valid) - 1, -1)
+        np.maximum.accumulate(idx, out=idx)
+        out[:, j] = np.where(idx >= 0, means[np.maximum(idx, 0)], np.nan)
+
+    return out
+
+
+def filter_series(values, name="moving_average", timestamps=None, **params):
+    """Runs a filter over a (frames, channels) series, one output row per frame."""
+    if name == "moving_average":
+        return moving_average_series(values, **params)
+
+    values = np.asarray(values, dtype=float)
+    f = make_filter(name, values.shape[1], **params)
+    out = np.empty(values.shape)
+    for i, row in enumerate(values):
+        out[i] = f.update(row, None if timestamps is None else timestamps[i])
+    return out
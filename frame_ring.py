@@ -0,0 +1,303 @@
+"""
+Zero-copy frame transport between processes.
+
+FrameRing is a fixed ring of frame slots in multiprocessing.shared_memory.
+The writer copies each frame straight into its slot and publishes it with
+a sequence number; readers get a numpy view of the slot, with no pickling.
+A slot's sequence number is re-checked after the reader copied it out
+(seqlock style), so a frame the writer lapped mid-copy is never used.
+
+RingCapture puts decoding in its own process: a capture process fills a
+ring and RingCapture reads it with the cv2.VideoCapture calls iter_engine
+uses, so capture runs in parallel with inference without sharing the GIL:
+
+    start_engine("squat", "class.mp4", capture_process=True)
+
+Files are read without loss (the capture process waits for free slots);
+cameras always hand over the newest frame. RingDisplay does the same for
+the display side: the engine writes annotated frames into a ring that a
+show_ring() process renders, so imshow never runs on the engine's thread:
+
+    start_engine("squat", 0, display_process=True)
+"""
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+# Header fields (int64)
+WRITE_SEQ, READ_SEQ, STATE, SLOTS, HEIGHT, WIDTH, CHANNELS, FPS_MILLI, \
+    FRAME_COUNT = range(9)
+HEADER_FIELDS = 16
+
+# STATE values
+STARTING, RUNNING, FINISHED, FAILED, STOP = range(5)
+
+POLL_SECONDS = 0.001
+
+
+class FrameRing:
+    def __init__(self, name=None, slots=8, shape=(480, 800, 3), create=True):
+        if create:
+            frame_bytes = int(np.prod(shape))
+            size = 8 * HEADER_FIELDS + 16 * slots + frame_bytes * slots
+            self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                  size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        buf = self.shm.buf
+        self.header = np.ndarray((HEADER_FIELDS,), np.int64, buf)
+        if create:
+            self.header[:] = 0
+            self.header[WRITE_SEQ] = self.header[READ_SEQ] = -1
+            self.header[SLOTS] = slots
+            self.header[HEIGHT:CHANNELS + 1] = shape
+        slots = int(self.header[SLOTS])
+        shape = tuple(int(v) for v in self.header[HEIGHT:CHANNELS + 1])
+
+        offset = 8 * HEADER_FIELDS
+        self.slot_seq = np.ndarray((slots,), np.int64, buf, offset)
+        offset += 8 * slots
+        self.slot_time = np.ndarray((slots,), np.float64, buf, offset)
+        offset += 8 * slots
+        self.frames = np.ndarray((slots,) + shape, np.uint8, buf, offset)
+        if create:
+            self.slot_seq[:] = -1
+
+        self.name = self.shm.name
+        self.slots = slots
+        self.shape = shape
+        self.owner = create
+
+    # ---------------- WRITER ----------------
+
+    def write(self, frame, timestamp=None):
+        """Copies `frame` into the next slot and publishes it; returns its sequence number."""
+        seq = int(self.header[WRITE_SEQ]) + 1
+        slot = seq % self.slots
+        self.slot_seq[slot] = -1  # being written
+        self.frames[slot] = frame
+        self.slot_time[slot] = time.time() if timestamp is None else timestamp
+        self.slot_seq[slot] = seq
+        self.header[WRITE_SEQ] = seq
+        return seq
+
+    def free_slots(self):
+        """Slots the writer can fill without overwriting unread frames."""
+        # One slot stays reserved for the frame a reader may still be holding
+        return self.slots - 1 - (int(self.header[WRITE_SEQ]) -
+                                 int(self.header[READ_SEQ]))
+
+    # ---------------- READERS ----------------
+
+    @property
+    def latest(self):
+        return int(self.header[WRITE_SEQ])
+
+    def get(self, seq):
+        """(view, timestamp) of frame `seq`, or None if it is not (or no longer) there."""
+        slot = seq % self.slots
+        if self.slot_seq[slot] != seq:
+            return None
+        return self.frames[slot], float(self.slot_time[slot])
+
+    def valid(self, seq):
+        """True while the view returned by get(seq) has not been overwritten."""
+        return self.slot_seq[seq % self.slots] == seq
+
+    def mark_read(self, seq):
+        self.header[READ_SEQ] = seq
+
+    @property
+    def state(self):
+        return int(self.header[STATE])
+
+    def set_state(self, state):
+        self.header[STATE] = state
+
+    def close(self):
+        # Views must go before the mapping can be closed
+        self.header = self.slot_seq = self.slot_time = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a caller still holds a frame view; freed with it
+        if self.owner:
+            self.shm.unlink()
+
+
+# ---------------- CAPTURE PROCESS ----------------
+
+def _capture_main(source, ring_name, live):
+    ring = FrameRing(ring_name, create=False)
+    cap = cv2.VideoCapture(source)
+    try:
+        if not cap.isOpened():
+            ring.set_state(FAILED)
+            return
+        height, width = ring.shape[:2]
+        cap.set(3, width)
+        cap.set(4, height)
+        ring.header[FPS_MILLI] = int((cap.get(cv2.CAP_PROP_FPS) or 30.0) * 1000)
+        ring.header[FRAME_COUNT] = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        ring.set_state(RUNNING)
+
+        while ring.state == RUNNING:
+            if not live:
+                while ring.free_slots() <= 0 and ring.state == RUNNING:
+                    time.sleep(POLL_SECONDS)
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame.shape[:2] != (height, width):
+                frame = cv2.resize(frame, (width, height))
+            ring.write(frame)
+        if ring.state == RUNNING:
+            ring.set_state(FINISHED)
+    finally:
+        cap.release()
+        ring.close()
+
+
+class RingCapture:
+    """
+    cv2.VideoCapture look-alike backed by a capture process and a FrameRing.
+
+    read() copies the slot into a buffer that is reused by the next read(),
+    then checks the slot wasn't overwritten meanwhile; a lapped frame is
+    skipped (cameras) or ends the stream (files, which can't be lapped).
+    """
+
+    def __init__(self, source, slots=8, size=(800, 480), timeout=10.0):
+        self.source = source
+        self.live = isinstance(source, int)
+        self.ring = FrameRing(slots=slots, shape=(size[1], size[0], 3))
+        self._seq = -1
+        self._frame = np.empty(self.ring.shape, np.uint8)
+        # spawn: MediaPipe does not survive a fork of a process that imported it
+        ctx = multiprocessing.get_context("spawn")
+        self._process = ctx.Process(target=_capture_main, daemon=True,
+                                    args=(source, self.ring.name, self.live))
+        self._process.start()
+
+        deadline = time.time() + timeout
+        while self.ring.state == STARTING and time.time() < deadline:
+            if not self._process.is_alive():
+                break
+            time.sleep(0.01)
+
+    def isOpened(self):
+        return self.ring is not None and self.ring.state in (RUNNING, FINISHED)
+
+    def read(self):
+        ring = self.ring
+        while True:
+            latest = ring.latest
+            if latest > self._seq:
+                # Cameras: skip to the newest frame; files: take the next one
+                seq = latest if self.live else self._seq + 1
+                item = ring.get(seq)
+                if item is not None:
+                    np.copyto(self._frame, item[0])
+                if item is not None and ring.valid(seq):
+                    self._seq = seq
+                    ring.mark_read(seq)
+                    return True, self._frame
+                if self.live:
+                    continue
+                return False, None  # lapped: cannot happen with file backpressure
+            if ring.state != RUNNING or not self._process.is_alive():
+                if ring.latest > self._seq:
+                    continue
+                return False, None
+            time.sleep(POLL_SECONDS)
+
+    def grab(self):
+        return self.read()[0]
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return int(self.ring.header[FPS_MILLI]) / 1000.0
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.ring.header[FRAME_COUNT])
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self._seq + 1)
+        return 0.0
+
+    def set(self, prop, value):
+        return False  # size is fixed by the ring; seeking is not supported
+
+    def release(self):
+        if self.ring is None:
+            return
+        if self.ring.state == RUNNING:
+            self.ring.set_state(STOP)
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+        self.ring.close()
+        self.ring = None
+
+
+# ---------------- DISPLAY SIDE ----------------
+
+def publish_to(ring):
+    """A start_engine display_callback that writes annotated frames into `ring`."""
+    def display_callback(frame, counter, stage, posture, progress, fps):
+        ring.write(frame)
+    return display_callback
+
+
+def show_ring(ring_name, window="PostuRight"):
+    """Renders the newest frames of a ring (run in its own process); 'q' sets STOP."""
+    ring = FrameRing(ring_name, create=False)
+    frame = np.empty(ring.shape, np.uint8)
+    last = -1
+    try:
+        while ring.state != STOP:
+            seq = ring.latest
+            item = ring.get(seq) if seq > last else None
+            if item is not None:
+                np.copyto(frame, item[0])
+                if ring.valid(seq):  # else lapped mid-copy: take the newer one
+                    cv2.imshow(window, frame)
+                    last = seq
+            if cv2.waitKey(5) & 0xFF == ord("q"):
+                ring.set_state(STOP)
+                break
+    finally:
+        cv2.destroyWindow(window)
+        ring.close()
+
+
+class RingDisplay:
+    """
+    A show_ring() process fed by the engine through a FrameRing.
+
+    show() has start_engine's display_callback signature and only copies
+    the frame into shared memory; running() turns False once the window
+    was closed with 'q'.
+    """
+
+    def __init__(self, slots=4, size=(800, 480), window="PostuRight"):
+        self.ring = FrameRing(slots=slots, shape=(size[1], size[0], 3))
+        self.ring.set_state(RUNNING)
+        self.show = publish_to(self.ring)
+        ctx = multiprocessing.get_context("spawn")
+        self._process = ctx.Process(target=show_ring, daemon=True,
+                                    args=(self.ring.name, window))
+        self._process.start()
+
+    def running(self):
+        # Only 'q' stops the engine; a viewer that crashed just shows nothing
+        return self.ring.state == RUNNING
+
+    def close(self):
+        self.ring.set_state(STOP)
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+        self.ring.close()
@@ -0,0 +1,229 @@
+"""
+Workout history with materialized daily and weekly rollups (SQLite).
+
+Every finished session is appended to `sessions` and, in the same
+transaction, added to its day and week rows in `rollups` (per exercise
+and station). The history page only reads rollups, so a trend chart is a
+single indexed query over a few hundred rows, however many sessions
+there are.
+
+    python history.py backfill reports/history.csv   # import older sessions
+    python history.py rebuild                        # recompute rollups from sessions
+    python history.py trend --period week --exercise squat
+"""
+import argparse
+import csv
+import os
+import socket
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+DB_PATH = os.path.join("reports", "history.db")
+PERIODS = ("day", "week")
+STATION = os.environ.get("POSTURIGHT_STATION") or socket.gethostname()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ended REAL NOT NULL,
+    station TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    reps INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    accuracy REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    station TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    reps INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    accuracy_sum REAL NOT NULL,
+    PRIMARY KEY (period, bucket, exercise, station)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollups_exercise ON rollups (period, exercise, bucket);
+CREATE INDEX IF NOT EXISTS sessions_ended ON sessions (ended);
+"""
+
+UPSERT = """
+INSERT INTO rollups (period, bucket, exercise, station, sessions, reps,
+                     duration, accuracy_sum)
+VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+ON CONFLICT (period, bucket, exercise, station) DO UPDATE SET
+    sessions = sessions + 1,
+    reps = reps + excluded.reps,
+    duration = duration + excluded.duration,
+    accuracy_sum = accuracy_sum + excluded.accuracy_sum
+"""
+
+
+def bucket(period, day):
+    """Row key of a date: the day itself, or the Monday of its ISO week."""
+    if period == "week":
+        day = day - timedelta(days=day.weekday())
+    return day.isoformat()
+
+
+def connect(path=DB_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _add(conn, ended, station, exercise, reps, duration, accuracy):
+    conn.execute(
+        "INSERT INTO sessions (ended, station, exercise, reps, duration, accuracy)"
+        " VALUES (?, ?, ?, ?, ?, ?)",
+        (ended, station, exercise, reps, duration, accuracy),
+    )
+    day = date.fromtimestamp(ended)
+    for period in PERIODS:
+        conn.execute(UPSERT, (period, bucket(period, day), exercise, station,
+                              reps, duration, accuracy))
+
+
+def record_session(exercise, reps, duration, accuracy, ended=None,
+                   station=STATION, path=DB_PATH):
+    """Adds one finished session to the history and its rollups, atomically."""
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _add(conn, ended or time.time(), station, exercise, reps,
+                 duration, accuracy)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+def trend(period="day", exercise=None, station=None, since=None, path=DB_PATH):
+    """
+    Rollup rows from `since` (a date) on, oldest first, as dicts:
+    bucket, exercise, sessions, reps, duration (s), accuracy (session average).
+    Stations are summed unless one is given.
+    """
+    query = ("SELECT bucket, exercise, SUM(sessions), SUM(reps), SUM(duration),"
+             " SUM(accuracy_sum) FROM rollups WHERE period=?")
+    args = [period]
+    if exercise:
+        query += " AND exercise=?"
+        args.append(exercise)
+    if station:
+        query += " AND station=?"
+        args.append(station)
+    if since:
+        query += " AND bucket>=?"
+        args.append(bucket(period, since))
+    query += " GROUP BY bucket, exercise ORDER BY bucket, exercise"
+    conn = connect(path)
+    try:
+        rows = conn.execute(query, args).fetchall()
+    finally:
+        conn.close()
+    return [{"bucket": b, "exercise": ex, "sessions": n, "reps": reps,
+             "duration": dur, "accuracy": round(acc / n, 2)}
+            for b, ex, n, reps, dur, acc in rows]
+
+
+def stations(path=DB_PATH):
+    conn = connect(path)
+    try:
+        return [r[0] for r in conn.execute(
+            "SELECT DISTINCT station FROM rollups ORDER BY station")]
+    finally:
+        conn.close()
+
+
+def rebuild(path=DB_PATH):
+    """Recomputes all rollups from the sessions table (e.g. after a manual fix)."""
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM rollups")
+        rows = conn.execute(
+            "SELECT ended, station, exercise, reps, duration, accuracy FROM sessions"
+        ).fetchall()
+        for ended, station, exercise, reps, duration, accuracy in rows:
+            day = date.fromtimestamp(ended)
+            for period in PERIODS:
+                conn.execute(UPSERT, (period, bucket(period, day), exercise,
+                                      station, reps, duration, accuracy))
+        conn.execute("COMMIT")
+        return len(rows)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def backfill(csv_path, station=STATION, path=DB_PATH):
+    """
+    Imports a reports/history.csv written before the rollups existed. The
+    engine writes every session to both, so rows already in the history
+    (same exercise and reps, ended within a second) are skipped; running it
+    twice imports nothing twice.
+    """
+    conn = connect(path)
+    n = 0
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        with open(csv_path, newline="") as f:
+            for row in csv.DictReader(f):
+                ended = datetime.fromisoformat(row["Date"]).timestamp()
+                reps = int(row["Reps"])
+                if conn.execute(
+                        "SELECT 1 FROM sessions WHERE ended BETWEEN ? AND ?"
+                        " AND exercise=? AND reps=?",
+                        (ended - 1, ended + 1, row["Exercise"], reps)).fetchone():
+                    continue
+                _add(conn, ended, station, row["Exercise"], reps,
+                     float(row["Duration(s)"]), float(row["Accuracy(%)"]))
+                n += 1
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workout history rollups")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    fill = sub.add_parser("backfill", help="import a history.csv")
+    fill.add_argument("csv")
+    fill.add_argument("--station", default=STATION)
+
+    sub.add_parser("rebuild", help="recompute rollups from sessions")
+
+    show = sub.add_parser("trend", help="print a trend")
+    show.add_argument("--period", choices=PERIODS, default="day")
+    show.add_argument("--exercise")
+    show.add_argument("--station")
+
+    args = parser.parse_args()
+    if args.command == "backfill":
+        print(f"➕ Imported {backfill(args.csv, args.station, args.db)} sessions")
+    elif args.command == "rebuild":
+        print(f"🔁 Rolled up {rebuild(args.db)} sessions")
+    else:
+        for r in trend(args.period, args.exercise, args.station, path=args.db):
+            print(f"{r['bucket']}  {r['exercise']:<8} {r['sessions']:>4} sessions "
+                  f"{r['reps']:>6} reps  {r['accuracy']:6.2f}%  "
+                  f"{r['duration'] / 60:7.1f} min")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Streaming ingestion of uploaded videos.
+
+An upload is written chunk by chunk into an UploadSpool (a growing temp
+file; only one chunk is ever held in memory, and the file is capped at
+`max_bytes`). GrowingCapture reads that file while it is still being
+written and looks like a cv2.VideoCapture to iter_engine, so analysis
+starts as soon as the first frames have arrived:
+
+    spool = UploadSpool(max_bytes=500 * 1024 * 1024)
+    ...                                   # uploader thread: spool.write(chunk) ... spool.finish()
+    for r in iter_engine("squat", GrowingCapture(spool)):
+        ...
+
+Whether a file can be decoded before it is complete depends on its
+container. MP4/MOV files need their index ("moov" box) in front of the
+media data (ffmpeg's -movflags +faststart, or fragmented MP4). Many
+phones write it at the end, and then nothing can be decoded until the
+last byte is in. GrowingCapture detects that from the first boxes and
+simply waits for the upload to finish in that case. Other containers
+(WebM/MKV, MPEG-TS) are decoded progressively.
+
+Both of those waits block the calling thread. Servers that share a worker
+pool between uploads use BufferedCapture instead: each upload opens and
+decodes on a reader thread of its own, and the pool only gets frames that
+are already there:
+
+    cap = BufferedCapture(spool, notify=wake_up)   # called on every new frame
+    ...                                             # await cap.ready() turning True
+"""
+import os
+import queue
+import struct
+import tempfile
+import threading
+
+import cv2
+
+CHUNK_SIZE = 256 * 1024
+REOPEN_BYTES = 1024 * 1024
+WAIT_TIMEOUT = 60.0
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadSpool:
+    """A temp file that one thread appends to while others read it."""
+
+    def __init__(self, max_bytes=None, suffix=".mp4", directory=None):
+        fd, self.path = tempfile.mkstemp(suffix=suffix, dir=directory)
+        self._file = os.fdopen(fd, "wb")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.complete = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    def write(self, chunk):
+        if self.max_bytes and self.size + len(chunk) > self.max_bytes:
+            self.abort("upload too large")
+            raise UploadError("upload too large")
+        self._file.write(chunk)
+        # Readers open the file by path, so every chunk must reach the OS
+        self._file.flush()
+        with self._cond:
+            self.size += len(chunk)
+            self._cond.notify_all()
+
+    def finish(self):
+        with self._cond:
+            if not self._file.closed:
+                self._file.close()
+            self.complete = True
+            self._cond.notify_all()
+
+    def abort(self, error="upload aborted"):
+        self.error = error
+        self.finish()
+
+    def wait_for(self, size, timeout=WAIT_TIMEOUT):
+        """Blocks until `size` bytes are written or the upload ended; returns the current size."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.size >= size or self.complete,
+                                timeout)
+            return self.size
+
+    def head(self, n=64 * 1024):
+        with open(self.path, "rb") as f:
+            return f.read(n)
+
+    def remove(self):
+        self.finish()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def spool_from(stream, spool, chunk_size=CHUNK_SIZE):
+    """Copies a file-like object into `spool`, then marks it complete."""
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            spool.write(chunk)
+    except UploadError:
+        return
+    except Exception as e:
+        spool.abort(str(e))
+        return
+    spool.finish()
+
+
+def streamable(head):
+    """
+    True if a file starting with `head` can be decoded before it is complete,
+    False if not, None if more bytes are needed to tell.
+    """
+    if head[4:8] != b"ftyp":
+        return True  # not MP4/MOV: leave it to the decoder
+    pos = 0
+    while pos + 8 <= len(head):
+        size, kind = struct.unpack(">I4s", head[pos:pos + 8])
+        if kind in (b"moov", b"moof"):
+            return True
+        if kind == b"mdat":
+            return False
+        if size == 1:
+            if pos + 16 > len(head):
+                return None
+            size = struct.unpack(">Q", head[pos + 8:pos + 16])[0]
+        if size < 8:
+            return False
+        pos += size
+    return None
+
+
+class GrowingCapture:
+    """
+    cv2.VideoCapture over an UploadSpool that may still be growing.
+
+    When the decoder runs out of data it waits for `reopen_bytes` more (or
+    the end of the upload), reopens the file and seeks back to the next
+    frame. Only the read/grab/get/set/isOpened/release calls iter_engine
+    uses are provided.
+    """
+
+    def __init__(self, spool, reopen_bytes=REOPEN_BYTES, timeout=WAIT_TIMEOUT):
+        self.spool = spool
+        self.reopen_bytes = reopen_bytes
+        self.timeout = timeout
+        self.reopens = 0
+        self._index = 0
+        self._cap = None
+        self._opened_at = 0
+        self._wait_until_decodable()
+        self._open()
+
+    def _wait_until_decodable(self):
+        spool = self.spool
+        need = min(self.reopen_bytes, 64 * 1024)
+        while not spool.complete:
+            spool.wait_for(need, self.timeout)
+            verdict = streamable(spool.head())
+            if verdict is False:
+                spool.wait_for(float("inf"), None)  # index is at the end
+                break
+            if verdict and spool.size >= self.reopen_bytes:
+                break
+            need = spool.size + self.reopen_bytes
+
+    def _open(self):
+        if self._cap is not None:
+            self._cap.release()
+            self.reopens += 1
+        self._opened_at = self.spool.size
+        self._cap = cv2.VideoCapture(self.spool.path)
+        if self._index:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, self._index)
+
+    def isOpened(self):
+        return self._cap is not None and self._cap.isOpened() and not self.spool.error
+
+    def read(self):
+        while True:
+            ret, frame = self._cap.read()
+            if ret:
+                self._index += 1
+                return ret, frame
+            if self.spool.error:
+                return False, None
+            if self.spool.complete and self._opened_at >= self.spool.size:
+                return False, None  # really the end
+            size = self.spool.wait_for(self._opened_at + self.reopen_bytes,
+                                       self.timeout)
+            if size == self._opened_at and not self.spool.complete:
+                return False, None  # the upload stalled
+            self._open()
+
+    def grab(self):
+        return self.read()[0]
+
+    def get(self, prop):
+        return self._cap.get(prop)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self._index = int(value)
+        return self._cap.set(prop, value)
+
+    def release(self):
+        if self._cap is not None:
+            self._cap.release()
+
+
+class BufferedCapture:
+    """
+    A GrowingCapture opened and read on a thread of its own, up to `buffer`
+    frames ahead, so waiting for upload bytes never ties up a shared pool.
+
+    `notify` is called from the reader thread whenever ready() may have
+    turned True: the capture opened (or failed to), a frame was buffered or
+    the upload ended. read() only blocks when called while not ready().
+    Like GrowingCapture, only what iter_engine uses on a file is provided;
+    seeking is not. With `remove_spool`, release() also deletes the spool's
+    file, for callers that hand the capture to an engine and forget it.
+    """
+
+    def __init__(self, spool, buffer=8, notify=None, remove_spool=False,
+                 **options):
+        self.spool = spool
+        self.notify = notify or (lambda: None)
+        self.remove_spool = remove_spool
+        self.fps = 0.0
+        self._frames = queue.Queue(buffer)
+        self._opened = False
+        self._started = threading.Event()
+        self._ended = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(options,),
+                                        name="upload-reader", daemon=True)
+        self._thread.start()
+
+    def _run(self, options):
+        try:
+            cap = GrowingCapture(self.spool, **options)
+            self._opened = cap.isOpened()
+            self.fps = cap.get(cv2.CAP_PROP_FPS)
+        except OSError:
+            return  # the spool was removed while waiting: never opened
+        finally:
+            self._started.set()
+            self.notify()
+        try:
+            while self._opened and not self._stop.is_set():
+                ret, frame = cap.read()
+                if not self._put(frame if ret else None) or not ret:
+                    break
+        finally:
+            cap.release()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._frames.put(item, timeout=0.5)
+            except queue.Full:
+                continue
+            self.notify()
+            return True
+        return False
+
+    def ready(self):
+        """True once read() returns without waiting."""
+        if not self._started.is_set():
+            return False
+        return not self._opened or self._ended or not self._frames.empty()
+
+    def isOpened(self):
+        self._started.wait()
+        return self._opened and not self.spool.error
+
+    def read(self):
+        if self._ended or not self.isOpened():
+            return False, None
+        frame = self._frames.get()
+        if frame is None:
+            self._ended = True
+            return False, None
+        return True, frame
+
+    def grab(self):
+        return self.read()[0]
+
+    def get(self, prop):
+        return self.fps if prop == cv2.CAP_PROP_FPS else 0.0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        # The reader leaves once its pending wait on the spool returns
+        self._stop.set()
+        if self.remove_spool:
+            self.spool.remove()
@@ -0,0 +1,360 @@
+"""
+Durable local job queue for video analysis (SQLite).
+
+Jobs survive crashes and reboots. A worker checkpoints the frame position
+and the pickled EngineSession (counter, stage, smoothing filter state, rep
+clock) every `checkpoint_every` frames, and renews its lease every
+`lease_seconds` / 4 in between, however slowly the video goes. A job whose
+worker stopped heartbeating for `lease_seconds` is picked up again from its
+last checkpoint, so at most one checkpoint interval of video is analyzed
+twice.
+Every claim counts as an attempt; a job that keeps failing (or keeps
+killing its worker) ends up "failed" after `max_attempts`.
+
+    python jobs.py submit uploads/*.mp4 --exercise squat
+    python jobs.py work --workers 4
+    python jobs.py status
+    python jobs.py status 17
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import socket
+import sqlite3
+import time
+
+from engine import EngineSession, iter_engine
+
+DB_PATH = "jobs.db"
+LEASE_SECONDS = 120
+CHECKPOINT_EVERY = 300
+STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    exercise TEXT NOT NULL,
+    video_path TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    worker TEXT,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    frame INTEGER NOT NULL DEFAULT 0,
+    checkpoint BLOB,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+# Columns returned by status queries (the checkpoint blob stays in the db)
+COLUMNS = ("id", "exercise", "video_path", "options", "status", "attempts",
+           "max_attempts", "worker", "heartbeat", "created", "updated",
+           "frame", "result", "error")
+
+
+class JobQueue:
+    def __init__(self, path=DB_PATH, lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _row(self, row):
+        job = dict(zip(COLUMNS, row))
+        job["options"] = json.loads(job["options"])
+        if job["result"]:
+            job["result"] = json.loads(job["result"])
+        return job
+
+    # ---------------- PRODUCERS ----------------
+
+    def submit(self, exercise, video_path, max_attempts=3, **options):
+        """Queues one video; `options`: smoothing, rules, analysis_fps."""
+        now = time.time()
+        cur = self.conn.execute(
+            "INSERT INTO jobs (exercise, video_path, options, max_attempts,"
+            " created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+            (exercise, os.path.abspath(video_path), json.dumps(options),
+             max_attempts, now, now),
+        )
+        return cur.lastrowid
+
+    def cancel(self, job_id):
+        """Cancels a queued or running job; a running worker stops at its next checkpoint."""
+        cur = self.conn.execute(
+            "UPDATE jobs SET status='cancelled', updated=? "
+            "WHERE id=? AND status IN ('queued', 'running')",
+            (time.time(), job_id),
+        )
+        return cur.rowcount == 1
+
+    def retry(self, job_id):
+        """Puts a failed or cancelled job back in the queue with fresh attempts."""
+        cur = self.conn.execute(
+            "UPDATE jobs SET status='queued', attempts=0, error=NULL, updated=? "
+            "WHERE id=? AND status IN ('failed', 'cancelled')",
+            (time.time(), job_id),
+        )
+        return cur.rowcount == 1
+
+    # ---------------- STATUS ----------------
+
+    def status(self, job_id):
+        row = self.conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id=?", (job_id,)
+        ).fetchone()
+        return self._row(row) if row else None
+
+    def list_jobs(self, status=None, limit=100):
+        query = f"SELECT {', '.join(COLUMNS)} FROM jobs"
+        args = ()
+        if status:
+            query += " WHERE status=?"
+            args = (status,)
+        query += " ORDER BY id LIMIT ?"
+        return [self._row(r) for r in self.conn.execute(query, args + (limit,))]
+
+    def counts(self):
+        counts = dict.fromkeys(STATUSES, 0)
+        for status, n in self.conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = n
+        return counts
+
+    # ---------------- WORKERS ----------------
+
+    def claim(self, worker):
+        """
+        Atomically takes the next runnable job: a queued one or one whose
+        worker's lease expired. Returns (job, checkpoint) or None.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs that already used up their attempts fail instead of running again
+            self.conn.execute(
+                "UPDATE jobs SET status='failed', updated=?, "
+                "error=COALESCE(error, 'worker died too many times') "
+                "WHERE status='running' AND attempts >= max_attempts "
+                "AND heartbeat < ?",
+                (now, now - self.lease_seconds),
+            )
+            row = self.conn.execute(
+                "SELECT id FROM jobs WHERE status='queued' OR (status='running'"
+                " AND heartbeat < ?) ORDER BY id LIMIT 1",
+                (now - self.lease_seconds,),
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status='running', attempts=attempts+1, "
+                "worker=?, heartbeat=?, updated=? WHERE id=?",
+                (worker, now, now, row[0]),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        blob = self.conn.execute(
+            "SELECT checkpoint FROM jobs WHERE id=?", (row[0],)
+        ).fetchone()[0]
+        return self.status(row[0]), blob
+
+    def checkpoint(self, job_id, worker, frame, blob):
+        """Saves progress; False if the job was cancelled or taken over meanwhile."""
+        now = time.time()
+        cur = self.conn.execute(
+            "UPDATE jobs SET frame=?, checkpoint=?, heartbeat=?, updated=? "
+            "WHERE id=? AND worker=? AND status='running'",
+            (frame, blob, now, now, job_id, worker),
+        )
+        return cur.rowcount == 1
+
+    def heartbeat(self, job_id, worker):
+        """Renews the lease; False if the job was cancelled or taken over meanwhile."""
+        now = time.time()
+        cur = self.conn.execute(
+            "UPDATE jobs SET heartbeat=?, updated=? "
+            "WHERE id=? AND worker=? AND status='running'",
+            (now, now, job_id, worker),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, job_id, worker, result):
+        self.conn.execute(
+            "UPDATE jobs SET status='done', result=?, checkpoint=NULL, "
+            "error=NULL, updated=? WHERE id=? AND worker=? AND status='running'",
+            (json.dumps(result), time.time(), job_id, worker),
+        )
+
+    def fail(self, job_id, worker, error):
+        """Requeues the job (from its checkpoint) unless it is out of attempts."""
+        self.conn.execute(
+            "UPDATE jobs SET error=?, updated=?, status=CASE "
+            "WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END "
+            "WHERE id=? AND worker=? AND status='running'",
+            (error, time.time(), job_id, worker),
+        )
+
+
+class JobStopped(Exception):
+    """The job was cancelled or taken over by another worker."""
+
+
+def run_job(queue, worker, job, blob, checkpoint_every=CHECKPOINT_EVERY):
+    """Analyzes one job from its last checkpoint; returns the engine result."""
+    if blob:
+        session = pickle.loads(blob)
+        start_frame = job["frame"]
+        print(f"↩️ Job {job['id']}: resuming at frame {start_frame}")
+    else:
+        options = job["options"]
+        session = EngineSession(job["exercise"], options.get("smoothing"),
+                                options.get("rules"))
+        start_frame = 0
+
+    frames = iter_engine(job["exercise"], job["video_path"], session=session,
+                         draw=False, start_frame=start_frame,
+                         analysis_fps=job["options"].get("analysis_fps"))
+    # Checkpoints are counted in frames, the lease in seconds: a worker
+    # slower than checkpoint_every / lease_seconds fps keeps its job too
+    beat_every = queue.lease_seconds / 4
+    last_beat = time.monotonic()
+    try:
+        # Counted in analyzed frames: with analysis_fps, frame_index skips ahead
+        for n, r in enumerate(frames, 1):
+            if n % checkpoint_every == 0:
+                if not queue.checkpoint(job["id"], worker, r.frame_index + 1,
+                                        pickle.dumps(session)):
+                    raise JobStopped()
+                last_beat = time.monotonic()
+            elif time.monotonic() - last_beat >= beat_every:
+                if not queue.heartbeat(job["id"], worker):
+                    raise JobStopped()
+                last_beat = time.monotonic()
+    finally:
+        frames.close()
+
+    result = session.finish()
+    result["frames"] = session.good_frames + session.bad_frames
+    return result
+
+
+def run_worker(path=DB_PATH, worker=None, poll=2.0, once=False,
+               checkpoint_every=CHECKPOINT_EVERY):
+    """Pulls and runs jobs until the queue is empty (`once`) or forever."""
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    queue = JobQueue(path)
+    try:
+        while True:
+            claimed = queue.claim(worker)
+            if claimed is None:
+                if once:
+                    return
+                time.sleep(poll)
+                continue
+
+            job, blob = claimed
+            print(f"▶️ Job {job['id']}: {job['exercise']} {job['video_path']} "
+                  f"(attempt {job['attempts']}/{job['max_attempts']})")
+            try:
+                result = run_job(queue, worker, job, blob, checkpoint_every)
+            except JobStopped:
+                print(f"⏹️ Job {job['id']}: stopped")
+                continue
+            except Exception as e:
+                print(f"❌ Job {job['id']}: {e}")
+                queue.fail(job["id"], worker, f"{type(e).__name__}: {e}")
+                continue
+            if "error" in result:
+                queue.fail(job["id"], worker, result["error"])
+            else:
+                queue.complete(job["id"], worker, result)
+                print(f"✅ Job {job['id']}: {result['reps']} reps")
+    finally:
+        queue.close()
+
+
+def _worker_main(path, index, once):
+    # Unique per process: two `work` commands on one host share slot numbers,
+    # and the same id would let both claim each other's running jobs. A
+    # restarted worker's jobs are picked up once their lease expires.
+    run_worker(path, f"{socket.gethostname()}:{os.getpid()}:{index}", once=once)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Video analysis job queue")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    submit = sub.add_parser("submit", help="queue videos")
+    submit.add_argument("videos", nargs="+")
+    submit.add_argument("--exercise", required=True)
+    submit.add_argument("--max-attempts", type=int, default=3)
+    submit.add_argument("--analysis-fps", type=float,
+                        help="analyze at most this many frames per second")
+
+    work = sub.add_parser("work", help="run workers")
+    work.add_argument("--workers", type=int, default=1)
+    work.add_argument("--once", action="store_true",
+                      help="exit when the queue is empty")
+
+    status = sub.add_parser("status", help="show queue or one job")
+    status.add_argument("job_id", nargs="?", type=int)
+
+    for name in ("cancel", "retry"):
+        p = sub.add_parser(name)
+        p.add_argument("job_id", type=int)
+
+    args = parser.parse_args()
+
+    if args.command == "work":
+        if args.workers == 1:
+            _worker_main(args.db, 0, args.once)
+            return
+        # spawn: MediaPipe does not survive a fork of a process that imported it
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=_worker_main, args=(args.db, i, args.once))
+                 for i in range(args.workers)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        return
+
+    queue = JobQueue(args.db)
+    if args.command == "submit":
+        for video in args.videos:
+            options = {"analysis_fps": args.analysis_fps} if args.analysis_fps else {}
+            job_id = queue.submit(args.exercise, video, args.max_attempts,
+                                  **options)
+            print(f"➕ Job {job_id}: {video}")
+    elif args.command == "status" and args.job_id:
+        print(json.dumps(queue.status(args.job_id), indent=2))
+    elif args.command == "status":
+        print(queue.counts())
+        for job in queue.list_jobs():
+            print(f"{job['id']:>5}  {job['status']:<9} {job['exercise']:<8} "
+                  f"frame {job['frame']:>6}  {os.path.basename(job['video_path'])}"
+                  f"  {job['error'] or ''}")
+    elif args.command == "cancel":
+        print("cancelled" if queue.cancel(args.job_id) else "not cancellable")
+    elif args.command == "retry":
+        print("requeued" if queue.retry(args.job_id) else "not retryable")
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
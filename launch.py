@@ -1,78 +1,238 @@
 import os
+import re
 import time
 import sys
 import subprocess
+import urllib.request
 import webbrowser
 import threading
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 
 # --- CONFIGURATION ---
 STREAMLIT_PORT = 8501
 HTML_PORT = 8000
+METRICS_PORT = 9100  # Prometheus /metrics of the Streamlit app (see metrics.py)
 HTML_FILENAME = "home.html"
 WEBSITE_FOLDER = "website"  # The folder where home.html lives
+READY_TIMEOUT = 60   # seconds to wait for Streamlit before opening the browser anyway
+WARMUP_TIMEOUT = 120  # seconds to wait for the pose model after that
+RESTART_BACKOFF = (1.0, 30.0)  # first and longest delay between restarts
+STABLE_AFTER = 60  # a child that ran this long gets the short delay again
+
+# Streamlit >= 1.18 answers on /_stcore/health, older versions on /healthz
+STREAMLIT_HEALTH = [f"http://localhost:{STREAMLIT_PORT}/_stcore/health",
+                    f"http://localhost:{STREAMLIT_PORT}/healthz"]
+WARMUP_READY = f"http://localhost:{METRICS_PORT}/ready"
 
 # Get absolute paths to ensure code works regardless of where we launch it
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 STREAMLIT_SCRIPT = os.path.join(ROOT_DIR, "app.py")
 WEBSITE_DIR = os.path.join(ROOT_DIR, WEBSITE_FOLDER)
+# Optimized copy written by build_website.py; served instead when present
+DIST_DIR = os.path.join(WEBSITE_DIR, "dist")
+# name.<10 hex>.ext, as build_website.fingerprint names them
+FINGERPRINTED = re.compile(r"\.[0-9a-f]{10}\.[a-z0-9]+$")
+
+# Runs the Streamlit CLI with the pose model loading alongside it, in the
+# same process: Streamlit only runs app.py (which would start the warm-up)
+# once a browser connects, and this way the warm-up overlaps with the
+# server starting and the browser opening. app.py's own calls find the
+# metrics server and the warm-up already running.
+STREAMLIT_BOOTSTRAP = f"""
+import sys, threading
+sys.path.insert(0, {ROOT_DIR!r})
+
+def warm_up():
+    from metrics import serve_from_env
+    from engine_worker import prewarm
+    serve_from_env()
+    prewarm()
+
+threading.Thread(target=warm_up, daemon=True).start()
+from streamlit.web.cli import main
+sys.exit(main(prog_name="streamlit"))
+"""
+
+class CachingHandler(SimpleHTTPRequestHandler):
+    """Fingerprinted assets never change under their name, so browsers keep them a year."""
+
+    def end_headers(self):
+        path = self.path.split("?")[0]
+        if FINGERPRINTED.search(path):
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        else:
+            self.send_header("Cache-Control", "no-cache")
+        super().end_headers()
+
+class Supervisor:
+    """Runs a child process and restarts it with exponential backoff when it exits."""
+
+    def __init__(self, name, cmd, env=None):
+        self.name = name
+        self.cmd = cmd
+        self.env = env
+        self.proc = None
+        self.restarts = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f"supervise-{name}")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        delay, longest = RESTART_BACKOFF
+        while not self._stopping.is_set():
+            started = time.time()
+            try:
+                self.proc = subprocess.Popen(self.cmd, env=self.env)
+                code = self.proc.wait()
+            except OSError as e:
+                code = e
+            if self._stopping.is_set():
+                return
+            if time.time() - started > STABLE_AFTER:
+                delay = RESTART_BACKOFF[0]
+            self.restarts += 1
+            print(f"💥 {self.name} exited ({code}); restart #{self.restarts} in {delay:.0f}s...")
+            if self._stopping.wait(delay):
+                return
+            delay = min(delay * 2, longest)
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        proc = self.proc
+        if proc and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
 
-def run_streamlit():
-    """Runs the Streamlit app using the absolute path."""
+def probe(urls, timeout=1.0):
+    """True if any of the URLs answers 200."""
+    for url in urls:
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as r:
+                if r.status == 200:
+                    return True
+        except OSError:
+            pass
+    return False
+
+
+def wait_until_ready(urls, timeout, interval=0.2):
+    """Polls until a URL answers 200; returns the seconds waited, or None on timeout."""
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        if probe(urls):
+            return time.time() - t0
+        time.sleep(interval)
+    return None
+
+
+def warmup_seconds():
+    """The app's own pose model warm-up time, from its metrics."""
+    try:
+        with urllib.request.urlopen(f"http://localhost:{METRICS_PORT}/metrics",
+                                    timeout=1.0) as r:
+            for line in r.read().decode().splitlines():
+                if line.startswith("posturight_warmup_seconds "):
+                    return float(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def start_streamlit():
+    """Starts the Streamlit app (by absolute path) under a Supervisor."""
     print(f"🚀 Starting Streamlit App on port {STREAMLIT_PORT}...")
     
     # We use the absolute path to app.py so it doesn't get lost when we change dirs later
     if not os.path.exists(STREAMLIT_SCRIPT):
         print(f"❌ Error: Could not find {STREAMLIT_SCRIPT}")
-        return
+        return None
 
     cmd = [
-        sys.executable, "-m", "streamlit", "run", 
+        sys.executable, "-c", STREAMLIT_BOOTSTRAP, "run", 
         STREAMLIT_SCRIPT, 
         "--server.port", str(STREAMLIT_PORT), 
         "--server.headless", "true"
     ]
-    subprocess.run(cmd)
+    # The engine runs inside the Streamlit process, so that's where metrics are served
+    env = dict(os.environ, POSTURIGHT_METRICS_PORT=str(METRICS_PORT))
+    return Supervisor("Streamlit", cmd, env).start()
 
-def run_html_server():
-    """Serves the 'website' folder over HTTP."""
-    print(f"🌍 Serving HTML from folder: {WEBSITE_FOLDER}...")
-    
+def start_html_server():
+    """Serves the 'website' folder (or its built 'dist' copy) over HTTP."""
     if not os.path.exists(WEBSITE_DIR):
         print(f"❌ Error: '{WEBSITE_FOLDER}' folder not found!")
-        return
+        return None
 
-    # Change directory to 'website' so images inside home.html load correctly
-    os.chdir(WEBSITE_DIR)
-    
-    server_address = ('', HTML_PORT)
-    httpd = HTTPServer(server_address, SimpleHTTPRequestHandler)
+    if os.path.exists(os.path.join(DIST_DIR, HTML_FILENAME)):
+        site_dir = DIST_DIR
+    else:
+        site_dir = WEBSITE_DIR
+        print("💡 Run 'python build_website.py' for resized, cacheable assets")
+    print(f"🌍 Serving HTML from folder: {os.path.relpath(site_dir, ROOT_DIR)}...")
+
+    # Bound (and so ready) once constructed; serve from the site folder
+    httpd = ThreadingHTTPServer(('', HTML_PORT),
+                                partial(CachingHandler, directory=site_dir))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True,
+                     name="html-server").start()
     print(f"✅ Website running at: http://localhost:{HTML_PORT}/{HTML_FILENAME}")
-    httpd.serve_forever()
+    return httpd
 
 if __name__ == "__main__":
-    # 1. Start Streamlit in a background thread
-    streamlit_thread = threading.Thread(target=run_streamlit)
-    streamlit_thread.daemon = True
-    streamlit_thread.start()
+    launched = time.time()
 
-    # 2. Start HTML Server in a background thread
-    html_thread = threading.Thread(target=run_html_server)
-    html_thread.daemon = True
-    html_thread.start()
+    # 1. Start Streamlit and the HTML server side by side
+    streamlit = start_streamlit()
+    try:
+        httpd = start_html_server()
+    except OSError as e:
+        print(f"❌ Error: Could not serve the website on port {HTML_PORT}: {e}")
+        httpd = None
 
-    # 3. Wait for servers to initialize
+    # 2. Wait until Streamlit actually answers its health check
     print("⏳ Waiting for services to spin up...")
-    time.sleep(3)
+    if streamlit and wait_until_ready(STREAMLIT_HEALTH, READY_TIMEOUT) is not None:
+        print(f"✅ Streamlit ready after {time.time() - launched:.1f}s")
+    else:
+        print(f"⚠️ Streamlit not ready after {READY_TIMEOUT}s, opening the browser anyway")
 
-    # 4. Open the Browser
+    # 3. Open the Browser
     url = f"http://localhost:{HTML_PORT}/{HTML_FILENAME}"
     print(f"🔗 Opening {url}...")
     webbrowser.open(url)
 
-    # 5. Keep script running
+    # 4. The Streamlit process started warming the pose model up at launch
+    if streamlit and wait_until_ready([WARMUP_READY], WARMUP_TIMEOUT) is not None:
+        warm = warmup_seconds()
+        warm = f" (model warm-up {warm:.1f}s)" if warm is not None else ""
+        print(f"🏁 Ready to analyze {time.time() - launched:.1f}s after launch{warm}")
+    elif streamlit:
+        print(f"💡 Pose model not warmed up after {WARMUP_TIMEOUT}s; "
+              f"it is still loading in the Streamlit process")
+
+    # 5. Keep script running; check Streamlit comes back after a restart
     try:
+        restarts = streamlit.restarts if streamlit else 0
         while True:
             time.sleep(1)
+            if streamlit and streamlit.restarts != restarts:
+                restarts = streamlit.restarts
+                since = time.time()
+                if wait_until_ready(STREAMLIT_HEALTH, READY_TIMEOUT) is not None:
+                    print(f"✅ Streamlit back up in {time.time() - since:.1f}s")
     except KeyboardInterrupt:
-        print("\n🛑 Shutting down PostuRight...")
\ No newline at end of file
+        print("\n🛑 Shutting down PostuRight...")
+        if streamlit:
+            streamlit.stop()
+        if httpd:
+            httpd.shutdown()
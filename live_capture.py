@@ -0,0 +1,129 @@
+"""
+Low-latency webcam capture.
+
+cv2.VideoCapture hands out camera frames in order, so when the engine is
+slower than the camera the driver queue fills up and the athlete sees
+feedback for a movement made hundreds of milliseconds ago.
+LatestFrameCapture drains the camera on its own thread and read() always
+returns the newest frame; frames the engine had no time for are dropped
+(counted as `stale`). CAP_PROP_BUFFERSIZE is set to 1 where the backend
+supports it.
+
+Latency is measured from the moment the grabber got a frame to the moment
+it was shown (capture-to-display). Exposure and screen scan-out are not
+visible to software, so true glass-to-glass latency is a little higher.
+
+    start_engine("squat", 0, low_latency=True)
+"""
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class LatestFrameCapture:
+    """cv2.VideoCapture look-alike that always returns the newest camera frame."""
+
+    live = True
+
+    def __init__(self, source=0, width=800, height=480, buffer_size=1):
+        self._cap = cv2.VideoCapture(source)
+        # Not every backend honours this; the grabber thread drains it anyway
+        self._cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        self._cap.set(3, width)
+        self._cap.set(4, height)
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._captured_at = None
+        self._seq = 0
+        self._read_seq = 0
+        self._running = self._cap.isOpened()
+        self._failed = not self._running
+
+        self.last_capture_time = None
+        self.grabbed = 0
+        self.stale = 0
+
+        self._thread = threading.Thread(target=self._grab_loop, daemon=True,
+                                        name="camera-grabber")
+        if self._running:
+            self._thread.start()
+
+    def _grab_loop(self):
+        while self._running:
+            ret, frame = self._cap.read()
+            now = time.time()
+            with self._cond:
+                if not ret:
+                    self._failed = True
+                    self._cond.notify_all()
+                    return
+                if self._seq > self._read_seq:
+                    self.stale += 1  # never picked up by the engine
+                self._frame = frame
+                self._captured_at = now
+                self._seq += 1
+                self.grabbed += 1
+                self._cond.notify_all()
+
+    def isOpened(self):
+        return not self._failed
+
+    def read(self, timeout=2.0):
+        """Waits for a frame newer than the last one read."""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._seq > self._read_seq or self._failed, timeout
+            )
+            if self._seq <= self._read_seq:
+                return False, None
+            self._read_seq = self._seq
+            self.last_capture_time = self._captured_at
+            return True, self._frame
+
+    def grab(self):
+        return self.read()[0]
+
+    def get(self, prop):
+        return self._cap.get(prop)
+
+    def set(self, prop, value):
+        return False  # the grabber thread owns the device; size is set at construction
+
+    def release(self):
+        self._running = False
+        if self._thread.is_alive():
+            self._thread.join(timeout=2)
+        self._cap.release()
+
+    def stats(self):
+        return {"grabbed": self.grabbed, "stale": self.stale}
+
+
+class LatencyStats:
+    """Capture-to-display latency: running mean and max, p95 over the last `window` frames."""
+
+    def __init__(self, window=600):
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.n += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    def summary(self):
+        if not self.n:
+            return None
+        return {
+            "frames": self.n,
+            "avg_ms": round(1000 * self.total / self.n, 1),
+            "p95_ms": round(1000 * float(np.percentile(self._recent, 95)), 1),
+            "max_ms": round(1000 * self.max, 1),
+        }
@@ -1,262 +1,137 @@
-import cv2
+"""
+Command-line fitness tracker, on the same engine as the web app.
+
+    python main.py --input squat1.mp4                  # looked up in "Exercise Videos" too
+    python main.py --exercise push-up --camera 0 --low-latency
+    python main.py --input class.mp4 --analysis-fps 15 --sink none
+    python main.py --input squat1.mp4 --sink window --sink file --output replays/squat1.mp4
+
+The exercise defaults to "auto" (detected from the movement). Frames go
+to one or more sinks (see sinks.py); the window only refreshes when a
+display frame is due, so files are analyzed as fast as the engine can go.
+Press 'q' in the window to stop early.
+"""
 import argparse
 import os
-from utils import *
-import mediapipe as mp
-from body_part_angle import BodyPartAngle
-from types_of_exercise import TypeOfExercise
+import sys
+
+import cv2
+
+from engine import start_engine
+from metrics import start_server
+from multi_exercise import AUTO
+from sinks import SINKS, make_sink
+from types_of_exercise import EXERCISE_RULES
 
 # -----------------------------
 # Video folder
 # -----------------------------
 VIDEO_DIR = "Exercise Videos"
 
-mp_drawing = mp.solutions.drawing_utils
-mp_pose = mp.solutions.pose
-
-
-# ------------------------------------------------
-# Formatting helper for angles
-# ------------------------------------------------
-def fmt_ang(a):
-    return f"{int(a)}°" if a is not None else "N/A"
-
-
-# ------------------------------------------------
-# INTERACTIVE MENU
-# ------------------------------------------------
-print("\n====================================")
-print("         FITNESS TRACKER MENU        ")
-print("====================================\n")
-
-print("Select Exercise:")
-print("1. Squat")
-print("2. Push-up")
-print("3. Pull-up")
-print("4. Sit-up")
-
-choice = input("\nEnter option (1-4): ").strip()
-
-exercise_map = {
-    "1": "squat",
-    "2": "push-up",
-    "3": "pull-up",
-    "4": "sit-up"
-}
-
-if choice not in exercise_map:
-    print("\n❌ Invalid option.")
-    exit()
-
-exercise_type = exercise_map[choice]
-print(f"\n✔ Selected: {exercise_type.upper()}")
-
-print("\nSelect Video Source:")
-print("1. Live Webcam")
-print("2. Pre-recorded Video")
-
-source_choice = input("\nChoose (1-2): ").strip()
-
-if source_choice == "1":
-    video_source = 0
-    print("\n✔ Using Live Webcam")
-
-elif source_choice == "2":
-    video_name = input("\nEnter video file name (example: squat_7.mp4): ").strip()
-
-    if video_name == "":
-        print("❌ No file name entered.")
-        exit()
-
-    video_path = os.path.join(VIDEO_DIR, video_name)
-
-    if not os.path.exists(video_path):
-        print(f"❌ Video not found in '{VIDEO_DIR}' folder.")
-        exit()
-
-    video_source = video_path
-    print(f"✔ Using Video: {video_source}")
-
-else:
-    print("❌ Invalid choice.")
-    exit()
-
-
-# ------------------------------------------------
-# CAPTURE
-# ------------------------------------------------
-cap = cv2.VideoCapture(video_source)
-cap.set(3, 800)
-cap.set(4, 480)
-
-
-# create persistent tracker object
-tracker = TypeOfExercise(None)
-
-counter = 0
-stage = None
-posture = False
-progress = 0.0
-
-
-# ------------------------------------------------
-# MEDIAPIPE + MAIN LOOP
-# ------------------------------------------------
-with mp_pose.Pose(min_detection_confidence=0.5,
-                  min_tracking_confidence=0.5) as pose:
-
-    while cap.isOpened():
-
-        ret, frame = cap.read()
-        if not ret:
-            print("✅ Video finished.")
-            break
-
-        frame = cv2.resize(frame, (800, 480))
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        rgb.flags.writeable = False
 
-        results = pose.process(rgb)
-
-        rgb.flags.writeable = True
-        frame = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
-
-        landmarks = None
-        if results.pose_landmarks:
-            landmarks = results.pose_landmarks.landmark
-
-        # update tracker
-        #tracker.update_landmarks(landmarks)
-        if landmarks is not None:
-            tracker.update_landmarks(landmarks)
-
-
-        # calculate exercise
-        counter, stage, posture, progress = tracker.calculate_exercise(
-            exercise_type, counter, stage
+def resolve_input(name):
+    """A path as given, or a file name inside VIDEO_DIR; None if neither exists."""
+    for path in (name, os.path.join(VIDEO_DIR, name)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="PostuRight fitness tracker")
+    parser.add_argument("-e", "--exercise", default=AUTO,
+                        choices=list(EXERCISE_RULES) + [AUTO])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("-i", "--input", help="video file")
+    source.add_argument("-c", "--camera", type=int, default=None,
+                        help="camera index (default 0 without --input)")
+
+    parser.add_argument("--sink", action="append", choices=SINKS,
+                        help="where frames go; repeat for several (default: window)")
+    parser.add_argument("--output", help="video path for --sink file")
+    parser.add_argument("--display-fps", type=float, default=None,
+                        help="refresh rate of the window/streamlit sinks")
+
+    parser.add_argument("--analysis-fps", type=float, default=None,
+                        help="analyze files at this frame rate, skipping the rest")
+    parser.add_argument("--low-latency", action="store_true",
+                        help="cameras: always process the newest frame")
+    parser.add_argument("--target-fps", type=float, default=None,
+                        help="adapt model and resolution to hold this frame rate")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="skip inference while nobody is in front of the camera")
+    parser.add_argument("--backend", default="mediapipe")
+    parser.add_argument("--model", help="model path for the onnx/opencv-dnn backends")
+    parser.add_argument("--profile-memory", action="store_true")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics on this port")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.input:
+        video_source = resolve_input(args.input)
+        if video_source is None:
+            print(f"❌ Video not found: {args.input} (also looked in '{VIDEO_DIR}')")
+            return 1
+    else:
+        video_source = args.camera or 0
+
+    fps = 30.0
+    if isinstance(video_source, str):
+        cap = cv2.VideoCapture(video_source)
+        fps = cap.get(cv2.CAP_PROP_FPS) or fps
+        cap.release()
+    try:
+        sinks = [make_sink(name, args.output, args.display_fps,
+                           args.analysis_fps or fps)
+                 for name in args.sink or ["window"]]
+    except (ValueError, IOError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.metrics_port:
+        start_server(args.metrics_port)
+
+    print(f"✔ Exercise: {args.exercise.upper()}")
+    print(f"✔ Source: {'camera ' + str(video_source) if isinstance(video_source, int) else video_source}")
+
+    def display(*frame_state):
+        for sink in sinks:
+            sink.show(*frame_state)
+
+    try:
+        result = start_engine(
+            args.exercise,
+            video_source,
+            display_callback=display,
+            stop_callback=lambda: all(sink.running() for sink in sinks),
+            target_fps=args.target_fps,
+            motion_gate=args.motion_gate,
+            backend=args.backend,
+            backend_options={"model_path": args.model} if args.model else None,
+            low_latency=args.low_latency,
+            analysis_fps=args.analysis_fps,
+            profile_memory=args.profile_memory,
+            draw=any(sink.draw for sink in sinks),
         )
-
-        # get angles for debug display
-        smoothed = tracker.get_smoothed_angles()
-        debug = []
-        et = exercise_type.lower()
-
-        if et == "squat":
-            debug.append(f"Knee L: {fmt_ang(smoothed.get('left_knee'))}")
-            debug.append(f"Knee R: {fmt_ang(smoothed.get('right_knee'))}")
-
-        elif et in ("push-up", "pull-up"):
-            debug.append(f"Elbow L: {fmt_ang(smoothed.get('left_elbow'))}")
-            debug.append(f"Elbow R: {fmt_ang(smoothed.get('right_elbow'))}")
-
-        elif et == "sit-up":
-            debug.append(f"Torso: {fmt_ang(smoothed.get('abdomen'))}")
-
-
-        # -------------------------------------
-        # Score Table (exercise, counter, posture)
-        # -------------------------------------
-        posture_text = "Good" if posture else "Bad"
-        frame = score_table(exercise_type, frame, counter, posture_text)
-
-
-        # -------------------------------------
-        # Skeleton color: green=good, red=bad
-        # -------------------------------------
-        color = (0, 255, 0) if posture else (0, 0, 255)
-
-        if results.pose_landmarks:
-            mp_drawing.draw_landmarks(
-                frame,
-                results.pose_landmarks,
-                mp_pose.POSE_CONNECTIONS,
-                mp_drawing.DrawingSpec(color=(255, 255, 255),
-                                       thickness=2,
-                                       circle_radius=2),
-                mp_drawing.DrawingSpec(color=color,
-                                       thickness=3,
-                                       circle_radius=3),
-            )
-
-
-        # -------------------------------------
-        # Angle Debug Text (top-left)
-        # -------------------------------------
-        y0 = 30
-        for i, txt in enumerate(debug):
-            cv2.putText(frame, txt,
-                        (10, y0 + i * 25),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.7,
-                        (255, 255, 255),
-                        2)
-
-
-        # -------------------------------------
-        # SHOW STAGE AND REPS
-        # -------------------------------------
-        cv2.putText(frame, f"Stage: {stage}",
-                    (10, 440),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.7,
-                    color,
-                    2)
-
-        cv2.putText(frame, f"Reps: {counter}",
-                    (10, 470),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.8,
-                    (255, 255, 255),
-                    2)
-
-
-        # -------------------------------------
-        # VERTICAL PROGRESS BAR (LEFT SIDE)
-        # -------------------------------------
-        bar_w = 24
-        bar_h = 220
-        margin = 12
-
-        x0 = margin
-        y0_bar = int((frame.shape[0] - bar_h) / 2)
-        x1 = x0 + bar_w
-        y1 = y0_bar + bar_h
-
-        cv2.rectangle(frame,
-                      (x0, y0_bar),
-                      (x1, y1),
-                      (200, 200, 200),
-                      2)
-
-        fill_h = int(bar_h * progress)
-        fill_y0 = y1 - fill_h
-
-        fill_color = (0, 255, 0) if posture else (0, 0, 255)
-
-        if fill_h > 0:
-            cv2.rectangle(frame,
-                          (x0 + 2, fill_y0),
-                          (x1 - 2, y1 - 2),
-                          fill_color,
-                          -1)
-
-        cv2.putText(frame,
-                    f"{int(progress * 100)}%",
-                    (x1 + 8, y1 - 4),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.55,
-                    (255, 255, 255),
-                    1)
-
-
-        # -------------------------------------
-        # DISPLAY WINDOW
-        # -------------------------------------
-        cv2.imshow('Fitness Tracker', frame)
-
-        if cv2.waitKey(10) & 0xFF == ord('q'):
-            break
-
-
-cap.release()
-cv2.destroyAllWindows()
+    finally:
+        for sink in sinks:
+            sink.close()
+
+    if result.get("error"):
+        print(f"❌ {result['error']}")
+        return 1
+    print(f"✅ {result['reps']} reps, {result['accuracy']:.2f}% good posture, "
+          f"{result['duration']} s")
+    for exercise, reps in result.get("exercises", {}).items():
+        if reps:
+            print(f"   {exercise}: {reps}")
+    print(f"📄 Report: {result['report_path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
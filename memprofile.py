@@ -0,0 +1,200 @@
+"""
+Memory profiling for long sessions.
+
+MemoryProfiler samples the process RSS and, optionally, tracemalloc every
+`interval` seconds while a session runs. It keeps constant memory itself:
+running RSS figures and a least-squares growth rate instead of a sample
+list, and only the latest snapshot. The report lists the allocation sites
+that grew most since the first sample:
+
+    start_engine("squat", 0, profile_memory=True)
+    start_engine("squat", 0, profile_memory=MemoryProfiler(interval=300, top=5))
+
+RSS includes native memory (MediaPipe's graph, OpenCV buffers);
+tracemalloc only sees Python allocations, including NumPy arrays, but it
+roughly doubles the cost of allocating, so it can be switched off
+(`trace=False`) to watch RSS alone. Tracing is process-wide: sessions
+running side by side share it, and the top sites cover all of them.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+MB = 1024 * 1024
+RATE_MIN_SECONDS = 600  # a growth rate from a shorter run is mostly noise
+
+_trace_lock = threading.Lock()
+_trace_users = 0
+
+
+def rss_bytes():
+    """Resident set size of this process, or None where it can't be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current RSS, the best macOS offers without psutil
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _site(frame):
+    # "package/engine.py:418", "python/solution_base.py:595"
+    parts = frame.filename.replace("\\", "/").split("/")
+    return f"{'/'.join(parts[-2:])}:{frame.lineno}"
+
+
+def _start_tracing(frames):
+    global _trace_users
+    with _trace_lock:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _trace_users = 1
+        elif _trace_users:
+            _trace_users += 1
+        else:
+            return False  # someone else is tracing; leave it to them
+    return True
+
+
+def _stop_tracing():
+    global _trace_users
+    with _trace_lock:
+        _trace_users -= 1
+        if _trace_users == 0:
+            tracemalloc.stop()
+
+
+class MemoryProfiler:
+    def __init__(self, interval=60.0, top=10, trace=True, trace_frames=1):
+        self.interval = interval
+        self.top = top
+        self.trace = trace
+        self.trace_frames = trace_frames
+
+        self.samples = 0
+        self.rss_start = self.rss_last = self.rss_peak = None
+        self.traced_peak = 0
+        self.top_sites = []
+        self._owns_trace = False
+        self._baseline = None
+        self._t0 = None
+        self._last = None
+        self._next = 0.0
+        # Least-squares fit of RSS over time (hours, MB), in running sums
+        self._fit = [0, 0.0, 0.0, 0.0, 0.0]
+
+    def start(self):
+        if self.trace and not self._owns_trace:
+            self._owns_trace = _start_tracing(self.trace_frames)
+        self._t0 = time.time()
+        self._next = 0.0
+        self.sample(force=True)
+        if tracemalloc.is_tracing():
+            self._baseline = self._snapshot()
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+
+    def sample(self, force=False):
+        """Takes a sample if `interval` has passed; cheap to call every frame."""
+        now = time.time()
+        if self._t0 is None:
+            self.start()
+            return
+        if not force and now < self._next:
+            return
+        self._next = now + self.interval
+        self._last = now
+
+        rss = rss_bytes()
+        if rss is not None:
+            if self.rss_start is None:
+                self.rss_start = rss
+            self.rss_last = rss
+            self.rss_peak = max(self.rss_peak or 0, rss)
+            x, y = (now - self._t0) / 3600, rss / MB
+            fit = self._fit
+            fit[0] += 1
+            fit[1] += x
+            fit[2] += y
+            fit[3] += x * x
+            fit[4] += x * y
+        self.samples += 1
+
+        if self._baseline is not None:
+            self.traced_peak = max(self.traced_peak,
+                                   tracemalloc.get_traced_memory()[1])
+            stats = self._snapshot().compare_to(self._baseline, "lineno")
+            self.top_sites = [
+                {"site": _site(s.traceback[0]),
+                 "growth_kb": round(s.size_diff / 1024, 1),
+                 "size_kb": round(s.size / 1024, 1),
+                 "blocks": s.count}
+                for s in stats[:self.top] if s.size_diff > 0
+            ]
+
+    def stop(self):
+        if self._t0 is None:
+            return
+        self.sample(force=True)
+        self._baseline = None
+        if self._owns_trace:
+            _stop_tracing()
+            self._owns_trace = False
+
+    @property
+    def growth_mb_per_hour(self):
+        """Slope of RSS over the session, or None if it ran under RATE_MIN_SECONDS."""
+        if self._t0 is None or self._last - self._t0 < RATE_MIN_SECONDS:
+            return None
+        n, sx, sy, sxx, sxy = self._fit
+        denom = n * sxx - sx * sx
+        return (n * sxy - sx * sy) / denom if n > 1 and denom > 0 else None
+
+    def summary(self):
+        if self.rss_start is None and not self.top_sites:
+            return None
+        summary = {"samples": self.samples, "top_sites": self.top_sites}
+        if self.rss_start is not None:
+            rate = self.growth_mb_per_hour
+            summary.update({
+                "rss_start_mb": round(self.rss_start / MB, 1),
+                "rss_end_mb": round(self.rss_last / MB, 1),
+                "rss_peak_mb": round(self.rss_peak / MB, 1),
+                "rss_growth_mb": round((self.rss_last - self.rss_start) / MB, 1),
+                "growth_mb_per_hour": round(rate, 1) if rate is not None else None,
+            })
+        if self.traced_peak:
+            summary["traced_peak_mb"] = round(self.traced_peak / MB, 1)
+        return summary
+
+    def report_lines(self):
+        """(label, value) lines for engine.write_report."""
+        s = self.summary()
+        if not s:
+            return []
+        lines = []
+        if "rss_start_mb" in s:
+            rate = s["growth_mb_per_hour"]
+            rate = f", {rate:+} MB/h" if rate is not None else ""
+            lines.append(("Memory (RSS)", f"{s['rss_start_mb']} -> {s['rss_end_mb']} MB "
+                                          f"(peak {s['rss_peak_mb']} MB{rate})"))
+        if "traced_peak_mb" in s:
+            lines.append(("Python Heap Peak", f"{s['traced_peak_mb']} MB"))
+        for site in s["top_sites"]:
+            lines.append((f"  +{site['growth_kb']} KB",
+                          f"{site['site']} ({site['blocks']} blocks)"))
+        return lines
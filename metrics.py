@@ -0,0 +1,269 @@
+"""
+Live engine metrics in Prometheus text format.
+
+A small in-process registry of counters, gauges and histograms that
+iter_engine updates as it goes (a lock and an add per update, cheap
+enough to leave on), served over HTTP for a fleet Prometheus to scrape:
+
+    POSTURIGHT_METRICS_PORT=9100 streamlit run app.py   (launch.py does this)
+    curl http://localhost:9100/metrics
+
+    posturight_frames_processed_total{exercise="squat"} 5120
+    posturight_frames_dropped_total{exercise="squat"} 31
+    posturight_inference_seconds_bucket{exercise="squat",le="0.05"} 4870
+    posturight_fps{exercise="squat"} 24
+    posturight_active_sessions 1
+    posturight_reps_total{exercise="squat"} 64
+
+/ready answers 200 once the pose model is warmed up (503 until then), for
+launch.py and load balancers to probe.
+"""
+import bisect
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PORT_ENV = "POSTURIGHT_METRICS_PORT"
+HOST_ENV = "POSTURIGHT_METRICS_HOST"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Child:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+
+class CounterChild(_Child):
+    __slots__ = ()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class GaugeChild(_Child):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class HistogramChild:
+    __slots__ = ("_lock", "bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self._lock = threading.Lock()
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Metric:
+    """A named family; `labels(...)` returns (and keeps) the child for one label set."""
+
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield self.name, _labels(self.labelnames, values), child.value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_number(value)}"
+                  for name, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return CounterChild()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return GaugeChild()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, total, n = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield (f"{self.name}_bucket",
+                       _labels(self.labelnames, values, le), cumulative)
+            labels = _labels(self.labelnames, values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, n
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """The whole registry in Prometheus text exposition format."""
+        return "\n".join(m.render() for m in list(self._metrics.values())) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---------------- ENGINE METRICS ----------------
+
+FRAMES = REGISTRY.register(Counter(
+    "posturight_frames_processed_total", "Frames analyzed (idle frames included)",
+    ["exercise"]))
+DROPPED = REGISTRY.register(Counter(
+    "posturight_frames_dropped_total", "Frames skipped to keep up with real time",
+    ["exercise"]))
+INFERENCE = REGISTRY.register(Histogram(
+    "posturight_inference_seconds", "Pose inference time per frame",
+    ["exercise"]))
+FPS = REGISTRY.register(Gauge(
+    "posturight_fps", "Frames per second of the latest analyzed frame",
+    ["exercise"]))
+ACTIVE_SESSIONS = REGISTRY.register(Gauge(
+    "posturight_active_sessions", "Engines currently running"))
+REPS = REGISTRY.register(Counter(
+    "posturight_reps_total", "Reps counted", ["exercise"]))
+READY = REGISTRY.register(Gauge(
+    "posturight_ready", "1 once the pose model is loaded and warmed up"))
+WARMUP = REGISTRY.register(Gauge(
+    "posturight_warmup_seconds", "Time the pose model warm-up took"))
+
+# ---------------- HTTP ----------------
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/ready":
+            ready = READY.labels().value
+            body = b"ready\n" if ready else b"warming up\n"
+            self.send_response(200 if ready else 503)
+        elif path in ("/", "/metrics"):
+            body = self.registry.render().encode()
+            self.send_response(200)
+        else:
+            self.send_error(404)
+            return
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per scrape would flood the console
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_server(port, host=""):
+    """Serves /metrics on a daemon thread; one server per process, later calls return it."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True,
+                             name="metrics-http").start()
+            print(f"📈 Metrics at http://localhost:{_server.server_port}/metrics")
+    return _server
+
+
+def serve_from_env():
+    """Starts the server if POSTURIGHT_METRICS_PORT is set (launch.py sets it)."""
+    port = os.environ.get(PORT_ENV)
+    if not port:
+        return None
+    try:
+        return start_server(int(port), os.environ.get(HOST_ENV, ""))
+    except OSError as e:
+        print(f"⚠️ Metrics server not started on port {port}: {e}")
+        return None
@@ -0,0 +1,96 @@
+import time
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap motion detector in front of pose inference.
+
+    Frames are shrunk to a tiny grayscale thumbnail and compared with the
+    previous one. After `idle_after` frames with neither motion nor
+    landmarks the gate goes idle: the engine skips inference and polls every
+    `idle_interval` seconds until motion shows up again.
+
+    Wake latency runs from the capture of the frame that woke the gate to
+    the end of its inference, so it includes the time that frame spent
+    being decoded, resized and queued, not just the model. Motion that
+    starts between two idle polls adds up to `idle_interval` on top.
+    """
+
+    def __init__(self, threshold=4.0, idle_after=30, idle_interval=0.5,
+                 size=(64, 36)):
+        self.threshold = threshold
+        self.idle_after = idle_after
+        self.idle_interval = idle_interval
+        self.size = size
+
+        self.idle = False
+        self._prev = None
+        self._moving = True
+        self._quiet_frames = 0
+        self._idle_since = None
+        self._wake_time = None
+
+        self.idle_seconds = 0.0
+        self.skipped_frames = 0
+        self.wakeups = 0
+        self._wake_latency_sum = 0.0
+        self._wake_latency_max = 0.0
+
+    def motion(self, frame):
+        """True if this frame differs enough from the previous one."""
+        small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), self.size,
+                           interpolation=cv2.INTER_AREA)
+        prev, self._prev = self._prev, small
+        if prev is None:
+            return True
+        return float(np.mean(cv2.absdiff(small, prev))) > self.threshold
+
+    def should_infer(self, frame, captured_at=None):
+        """
+        Runs the motion check and wakes the gate up if needed. `captured_at`
+        is the wall time the frame was captured (default: now).
+        """
+        moving = self.motion(frame)
+        if self.idle:
+            if not moving:
+                self.skipped_frames += 1
+                return False
+            now = time.time()
+            self.idle = False
+            self.idle_seconds += now - self._idle_since
+            self.wakeups += 1
+            self._wake_time = captured_at or now
+        self._moving = moving
+        return True
+
+    def after_inference(self, has_landmarks):
+        """Feeds back the inference result; may send the gate idle."""
+        if self._wake_time is not None:
+            latency = time.time() - self._wake_time
+            self._wake_latency_sum += latency
+            self._wake_latency_max = max(self._wake_latency_max, latency)
+            self._wake_time = None
+
+        if self._moving or has_landmarks:
+            self._quiet_frames = 0
+            return
+        self._quiet_frames += 1
+        if self._quiet_frames >= self.idle_after:
+            self.idle = True
+            self._idle_since = time.time()
+            self._quiet_frames = 0
+
+    def stats(self):
+        idle_seconds = self.idle_seconds
+        if self.idle:
+            idle_seconds += time.time() - self._idle_since
+        avg = self._wake_latency_sum / self.wakeups if self.wakeups else 0.0
+        return {
+            "idle_seconds": round(idle_seconds, 2),
+            "skipped_frames": self.skipped_frames,
+            "wakeups": self.wakeups,
+            "wake_latency_ms_avg": round(1000 * avg, 1),
+            "wake_latency_ms_max": round(1000 * self._wake_latency_max, 1),
+        }
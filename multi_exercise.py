@@ -0,0 +1,286 @@
+"""
+Every exercise at once, and which one is being done.
+
+MultiExerciseCounter runs the rep state machine of every exercise in
+EXERCISE_RULES on the same smoothed angle vector in one step, counting
+exactly what TypeOfExercise.calculate_exercise would for each of them.
+
+ExerciseClassifier looks at the last few seconds of those joint angles:
+how much of its down..up band each exercise's angle swept, and whether the
+torso is upright (squat, pull-up) or lying (push-up, sit-up). It runs every
+few frames over a small ring buffer.
+
+AutoExercise puts them together for the engine. Reps of an exercise are
+credited once it is detected, including the ones it did while the
+classifier was still making up its mind, so a member can switch from
+squats to push-ups without touching the kiosk:
+
+    start_engine("auto", 0)
+"""
+import math
+from collections import deque
+
+import numpy as np
+
+from types_of_exercise import EXERCISE_RULES, TypeOfExercise
+
+AUTO = "auto"
+UPRIGHT = ("squat", "pull-up")
+LYING = ("push-up", "sit-up")
+
+STAGES = ("down", None, "up")
+_KEYS = TypeOfExercise.ANGLE_KEYS
+_ABDOMEN = _KEYS.index("abdomen")
+_LEFT_ELBOW = _KEYS.index("left_elbow")
+_RIGHT_ELBOW = _KEYS.index("right_elbow")
+
+# BlazePose landmarks of the torso: shoulders, then hips
+_TORSO = [11, 12, 23, 24]
+
+
+# Posture heuristics of TypeOfExercise.posture_correct_*, on the angle
+# vector and the exercise's joint average (unknown counts as good)
+def _torso_ok(angles, avg):
+    abdomen = angles[_ABDOMEN]
+    return abdomen != abdomen or abdomen >= 100
+
+
+def _push_ok(angles, avg):
+    abdomen = angles[_ABDOMEN]
+    if abdomen != abdomen:
+        return True
+    return abdomen >= 140 and not abs(angles[_LEFT_ELBOW] - angles[_RIGHT_ELBOW]) > 30
+
+
+def _squat_ok(angles, avg):
+    return avg >= 90
+
+
+_POSTURE = {"push-up": _push_ok, "squat": _squat_ok}
+
+
+def torso_inclination(landmarks, aspect=1.0):
+    """
+    Degrees between the shoulders-to-hips line and the vertical (0 upright,
+    90 lying), or NaN without landmarks. `aspect` is the frame's
+    width / height, since landmarks are normalized per axis.
+    """
+    if landmarks is None:
+        return math.nan
+    (ls, rs, lh, rh) = landmarks[_TORSO, :2].tolist()
+    dx = (lh[0] + rh[0] - ls[0] - rs[0]) * aspect
+    dy = lh[1] + rh[1] - ls[1] - rs[1]
+    return math.degrees(math.atan2(abs(dx), abs(dy)))
+
+
+class MultiExerciseCounter:
+    """
+    Rep counters of all exercises, stepped together on one angle vector.
+
+    Same thresholds, start rule, MIN_REP_INTERVAL and posture heuristics
+    as TypeOfExercise.calculate_exercise. The rules are flattened into
+    tuples up front, so a step is one pass over four small records; NumPy
+    costs more than that on vectors this short.
+    """
+
+    def __init__(self, rules=None):
+        rules = rules or EXERCISE_RULES
+        self.exercises = tuple(rules)
+        n = len(self.exercises)
+
+        # Flipping inverted rules' signs makes every rule count upwards:
+        # (joint columns, sign, signed down, signed up, min rep interval,
+        #  posture check)
+        self._rules = []
+        for et in self.exercises:
+            rule = rules[et]
+            sign = -1.0 if rule["invert"] else 1.0
+            self._rules.append((
+                tuple(_KEYS.index(j) for j in rule["joints"]),
+                sign, sign * rule["down"], sign * rule["up"],
+                rule.get("min_rep_interval", TypeOfExercise.MIN_REP_INTERVAL),
+                _POSTURE.get(et, _torso_ok),
+            ))
+        self.down = np.array([rules[et]["down"] for et in self.exercises])
+        self.up = np.array([rules[et]["up"] for et in self.exercises])
+
+        self.state = [0] * n  # -1 down, 0 not started, 1 up
+        self.counters = [0] * n
+        self.last_rep_time = [0.0] * n
+        self.avg = [math.nan] * n
+        self.posture = [False] * n
+        self.progress = [0.0] * n
+
+    def update(self, angles, timestamp):
+        """Steps every counter on one smoothed angle vector; returns the indices that counted a rep."""
+        angles = angles.tolist() if hasattr(angles, "tolist") else list(angles)
+        reps = []
+        for i, (cols, sign, down, up, interval, posture_ok) in enumerate(self._rules):
+            total, n = 0.0, 0
+            for c in cols:
+                a = angles[c]
+                if a == a:  # not NaN
+                    total += a
+                    n += 1
+            if not n:
+                # No angle: the stage holds, like the streaming state machine
+                self.avg[i] = math.nan
+                self.posture[i] = False
+                self.progress[i] = 0.0
+                continue
+            avg = total / n
+            self.avg[i] = avg
+            s = sign * avg
+
+            state = self.state[i]
+            if state == 0:
+                # Same start rule as TypeOfExercise: up only beyond the "up" threshold
+                # (or, inverted, anywhere short of "down")
+                state = 1 if (s > up if sign > 0 else s >= down) else -1
+            elif state == 1:
+                if s < down:
+                    state = -1
+            elif s > up:
+                state = 1
+                if timestamp - self.last_rep_time[i] >= interval:
+                    self.last_rep_time[i] = timestamp
+                    self.counters[i] += 1
+                    reps.append(i)
+            self.state[i] = state
+
+            self.posture[i] = posture_ok(angles, avg)
+            p = (s - down) / (up - down)
+            self.progress[i] = 0.0 if p < 0.0 else (1.0 if p > 1.0 else p)
+        return reps
+
+    def stage(self, i):
+        return STAGES[self.state[i] + 1]
+
+
+class ExerciseClassifier:
+    """
+    Which exercise the last `window` seconds of joint angles look like, or
+    None while nobody sweeps any rep band far enough (`min_coverage`).
+    """
+
+    def __init__(self, counter, window=3.0, min_coverage=0.6, aspect=1.0,
+                 capacity=512):
+        self.exercises = counter.exercises
+        self.window = window
+        self.min_coverage = min_coverage
+        self.aspect = aspect
+        self._band_lo = np.minimum(counter.down, counter.up)
+        self._band_hi = np.maximum(counter.down, counter.up)
+        self._upright = np.array([et in UPRIGHT for et in self.exercises])
+        self._lying = np.array([et in LYING for et in self.exercises])
+        # Ring buffer of [time, inclination, joint average per exercise]
+        self._rows = np.full((capacity, 2 + len(self.exercises)), np.nan)
+        self._next = 0
+
+    def add(self, timestamp, avg, landmarks):
+        row = self._rows[self._next % len(self._rows)]
+        row[0] = timestamp
+        row[1] = torso_inclination(landmarks, self.aspect)
+        row[2:] = avg
+        self._next += 1
+
+    def coverage(self, now):
+        """Share of each exercise's rep band its angle swept in the window, and the mean inclination."""
+        rows = self._rows[self._rows[:, 0] >= now - self.window]
+        if not len(rows):
+            return np.zeros(len(self.exercises)), math.nan
+        lo = np.fmin.reduce(rows[:, 2:], axis=0)
+        hi = np.fmax.reduce(rows[:, 2:], axis=0)
+        overlap = np.minimum(hi, self._band_hi) - np.maximum(lo, self._band_lo)
+        coverage = np.nan_to_num(
+            np.clip(overlap / (self._band_hi - self._band_lo), 0.0, 1.0), nan=0.0)
+        inclination = rows[:, 1][~np.isnan(rows[:, 1])]
+        return coverage, inclination.mean() if len(inclination) else math.nan
+
+    def classify(self, now, recent_reps=None):
+        """Index of the detected exercise, or None; `recent_reps` breaks ties."""
+        coverage, inclination = self.coverage(now)
+        if not math.isnan(inclination):
+            coverage = coverage * (self._upright if inclination < 45 else self._lying)
+        if recent_reps is not None:
+            coverage = coverage + 0.01 * np.minimum(recent_reps, 10)
+        best = int(np.argmax(coverage))
+        return best if coverage[best] >= self.min_coverage else None
+
+
+class AutoExercise:
+    """
+    Counts every exercise and credits reps to the detected one.
+
+    The classifier runs every `classify_every` frames; a new exercise takes
+    over after it has been detected for `confirm` seconds in a row, and
+    stays while nobody moves (rest between sets).
+    """
+
+    def __init__(self, rules=None, window=3.0, confirm=1.0, classify_every=5,
+                 aspect=1.0):
+        self.counter = MultiExerciseCounter(rules)
+        self.classifier = ExerciseClassifier(self.counter, window, aspect=aspect)
+        self.exercises = self.counter.exercises
+        self.window = window
+        self.confirm = confirm
+        self.classify_every = classify_every
+
+        self.exercise = None
+        self.reps = {et: 0 for et in self.exercises}
+        self.switches = []  # (time, exercise)
+        self._index = None
+        self._pending = deque()  # (time, index) of reps not credited yet
+        self._candidate = None
+        self._candidate_since = None
+        self._frames = 0
+
+    def update(self, angles, landmarks, timestamp):
+        counted = self.counter.update(angles, timestamp)
+        self.classifier.add(timestamp, self.counter.avg, landmarks)
+
+        for i in counted:
+            if i == self._index:
+                self.reps[self.exercise] += 1
+            else:
+                self._pending.append((timestamp, i))
+        while self._pending and self._pending[0][0] < timestamp - self.window:
+            self._pending.popleft()
+
+        self._frames += 1
+        if self._frames % self.classify_every == 0:
+            recent = np.zeros(len(self.exercises))
+            for _, i in self._pending:
+                recent[i] += 1
+            self._decide(self.classifier.classify(timestamp, recent), timestamp)
+
+    def _decide(self, guess, timestamp):
+        if guess is None or guess == self._index:
+            self._candidate = None
+            return
+        if guess != self._candidate:
+            self._candidate, self._candidate_since = guess, timestamp
+        if timestamp - self._candidate_since < self.confirm:
+            return
+
+        self._index = guess
+        self.exercise = self.exercises[guess]
+        self._candidate = None
+        # The reps that made the classifier notice count too
+        credited = [p for p in self._pending if p[1] == guess]
+        self.reps[self.exercise] += len(credited)
+        self._pending = deque(p for p in self._pending if p[1] != guess)
+        self.switches.append((round(timestamp, 2), self.exercise))
+        print(f"🔀 Detected {self.exercise} at {timestamp:.1f}s")
+
+    def current(self):
+        """(stage, posture, progress) of the detected exercise."""
+        i = self._index
+        if i is None:
+            return None, False, 0.0
+        c = self.counter
+        return c.stage(i), bool(c.posture[i]), float(c.progress[i])
+
+    @property
+    def total(self):
+        return sum(self.reps.values())
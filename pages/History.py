@@ -0,0 +1,58 @@
+import streamlit as st
+import pandas as pd
+from datetime import date, timedelta
+
+from history import stations, trend
+
+# Reads only the daily/weekly rollups (see history.py), never the raw sessions
+RANGES = {"Daily": ("day", 90), "Weekly": ("week", 104)}
+
+st.set_page_config(page_title="PostuRight – History", layout="wide")
+st.title("📈 Workout History")
+
+col1, col2, col3 = st.columns(3)
+view = col1.radio("View", list(RANGES), horizontal=True)
+exercise = col2.selectbox("Exercise", ["All", "squat", "push-up", "pull-up", "sit-up"])
+station = col3.selectbox("Station", ["All"] + stations())
+
+period, buckets = RANGES[view]
+days = buckets * (7 if period == "week" else 1)
+rows = trend(period,
+             exercise=None if exercise == "All" else exercise,
+             station=None if station == "All" else station,
+             since=date.today() - timedelta(days=days))
+
+if not rows:
+    st.info("No sessions yet. Finished workouts show up here.")
+    st.stop()
+
+df = pd.DataFrame(rows)
+df["minutes"] = df["duration"] / 60
+df["bucket"] = pd.to_datetime(df["bucket"])
+
+totals = df[["sessions", "reps", "minutes"]].sum()
+kpi1, kpi2, kpi3, kpi4 = st.columns(4)
+kpi1.metric("Sessions", int(totals["sessions"]))
+kpi2.metric("Reps", int(totals["reps"]))
+kpi3.metric("Minutes", f"{totals['minutes']:.0f}")
+kpi4.metric("Avg Accuracy",
+            f"{(df['accuracy'] * df['sessions']).sum() / totals['sessions']:.1f}%")
+
+st.subheader("Reps")
+st.bar_chart(df.pivot_table(index="bucket", columns="exercise", values="reps",
+                            aggfunc="sum"))
+
+st.subheader("Average accuracy (%)")
+st.line_chart(df.pivot_table(index="bucket", columns="exercise", values="accuracy",
+                             aggfunc="mean"))
+
+st.subheader("Sessions")
+st.bar_chart(df.pivot_table(index="bucket", columns="exercise", values="sessions",
+                            aggfunc="sum"))
+
+st.dataframe(
+    df.sort_values("bucket", ascending=False)[
+        ["bucket", "exercise", "sessions", "reps", "accuracy", "minutes"]
+    ],
+    hide_index=True, use_container_width=True,
+)
@@ -0,0 +1,212 @@
+"""
+Parity check of the three rep counters.
+
+batch_counter.count_reps (tuner, chunked_engine) and
+multi_exercise.MultiExerciseCounter (auto mode) both claim to count
+exactly what the streaming TypeOfExercise.calculate_exercise counts:
+same thresholds, start rule, inverted pull-up rule and MIN_REP_INTERVAL
+clock. This replays smoothed angle series through all three and compares
+them frame by frame (counter, stage, posture) and the times reps were
+counted at:
+
+    python parity.py                      # synthetic series, every exercise
+    python parity.py sessions/*.npz       # stored tuner sessions as well
+
+Synthetic series mix full, partial and too-fast reps, angles exactly on
+a threshold, lost detections and one-sided joints, with the default rules
+and a tuned override. Exits 1 on any mismatch.
+"""
+import argparse
+import random
+import sys
+
+import numpy as np
+
+from batch_counter import count_reps
+from filters import moving_average_series
+from multi_exercise import MultiExerciseCounter
+from types_of_exercise import EXERCISE_RULES, TypeOfExercise
+
+KEYS = TypeOfExercise.ANGLE_KEYS
+FPS = 30.0
+
+# A tuned override with a slow rep clock, so the interval check decides often
+TUNED_RULES = {
+    "push-up": {"down": 95.0, "up": 155.0, "min_rep_interval": 0.6},
+    "pull-up": {"down": 150.0, "up": 90.0, "min_rep_interval": 0.6},
+    "squat": {"down": 105.0, "up": 145.0, "min_rep_interval": 0.6},
+    "sit-up": {"down": 75.0, "up": 105.0, "min_rep_interval": 0.6},
+}
+
+
+# ---------------- SERIES ----------------
+
+def synthetic_series(exercise, rules=None, seconds=60.0, seed=0):
+    """
+    (angles, timestamps) of a made-up session: the exercise's joints move
+    between random targets around its thresholds at random speeds, other
+    angles wander. Some frames lose the detection (the last row is held,
+    as the streaming tracker sees it) and two-joint exercises sometimes
+    see one side only.
+    """
+    rng = random.Random(seed)
+    rule = dict(EXERCISE_RULES[exercise], **(rules or {}).get(exercise, {}))
+    lo, hi = sorted((rule["down"], rule["up"]))
+    cols = [KEYS.index(j) for j in rule["joints"]]
+
+    n = int(seconds * FPS)
+    timestamps = np.arange(n) / FPS
+    angles = np.full((n, len(KEYS)), np.nan)
+    start = rng.randrange(1, 30)  # nobody in view at first
+    # The first angle decides the starting stage: seeds take turns at every
+    # side of both thresholds, and right on them
+    angle = (lo - 10, rule["down"], rule["up"], (lo + hi) / 2, hi + 10)[seed % 5]
+    target, speed = angle, 0.0
+    row = np.full(len(KEYS), np.nan)
+    for i in range(start, n):
+        if i > start and abs(target - angle) <= speed:
+            angle = target
+        elif i > start:
+            angle += speed if target > angle else -speed
+        if angle == target:
+            # Next target: mostly past the far threshold (a half rep),
+            # otherwise short of one or right on one
+            if rng.random() < 0.6:
+                target = (rng.uniform(lo - 25, lo) if angle > (lo + hi) / 2
+                          else rng.uniform(hi, hi + 25))
+            else:
+                target = rng.choice([rng.uniform(lo, hi), rule["down"],
+                                     rule["up"], angle])
+            # Half reps of 0.05-0.3 s are too fast for a slow rep clock
+            seconds_to = rng.choice([rng.uniform(0.05, 0.3), rng.uniform(0.3, 1.5)])
+            speed = max(abs(target - angle) / max(1.0, seconds_to * FPS), 1e-3)
+        if rng.random() < 0.05 and i > start:
+            angles[i] = row  # lost detection: held
+            continue
+        row = np.array([rng.uniform(60, 180) for _ in KEYS])
+        # Exactly on a threshold now and then, otherwise a little noise
+        on_threshold = angle in (rule["down"], rule["up"])
+        for c in cols:
+            row[c] = angle if on_threshold else angle + rng.uniform(-3, 3)
+        if len(cols) > 1 and rng.random() < 0.1:
+            row[rng.choice(cols)] = np.nan
+        angles[i] = row
+    return angles, timestamps
+
+
+def stored_series(path):
+    """(exercise, angles, timestamps) of a tuner session, smoothed like the tracker."""
+    from tuner import load_session
+
+    session = load_session(path)
+    window = TypeOfExercise.EXERCISE_FILTERS.get(
+        session["exercise"], TypeOfExercise.DEFAULT_FILTER)[1]["window"]
+    return (session["exercise"],
+            moving_average_series(session["angles"], window),
+            session["timestamps"])
+
+
+# ---------------- REPLAY ----------------
+
+def replay_streaming(exercise, angles, timestamps, rules=None):
+    """Frame by frame through TypeOfExercise.calculate_exercise."""
+    tracker = TypeOfExercise(None, exercise, rules=rules)
+    counter, stage = 0, None
+    out = {"counter": [], "stage": [], "posture": [], "rep_times": []}
+    for row, t in zip(angles, timestamps):
+        # What update_landmarks leaves behind for these smoothed angles
+        tracker._smoothed = {k: None if v != v else float(v)
+                             for k, v in zip(KEYS, row)}
+        before = counter
+        counter, stage, posture, _ = tracker.calculate_exercise(
+            exercise, counter, stage, t)
+        out["counter"].append(counter)
+        out["stage"].append(stage)
+        out["posture"].append(bool(posture))
+        if counter != before:
+            out["rep_times"].append(float(t))
+    return out
+
+
+def replay_batch(exercise, angles, timestamps, rules=None):
+    tracker_rules = TypeOfExercise(None, exercise, rules=rules).rules
+    rule = tracker_rules[exercise]
+    r = count_reps(exercise, angles, timestamps, rules=tracker_rules,
+                   min_rep_interval=rule.get("min_rep_interval",
+                                             TypeOfExercise.MIN_REP_INTERVAL))
+    return {"counter": r["counter"].tolist(), "stage": list(r["stage"]),
+            "posture": r["posture"].tolist(),
+            "rep_times": r["rep_times"].tolist()}
+
+
+def replay_multi(exercise, angles, timestamps, rules=None):
+    counter = MultiExerciseCounter(TypeOfExercise(None, exercise, rules=rules).rules)
+    i = counter.exercises.index(exercise)
+    out = {"counter": [], "stage": [], "posture": [], "rep_times": []}
+    for row, t in zip(angles, timestamps):
+        if i in counter.update(row, t):
+            out["rep_times"].append(float(t))
+        out["counter"].append(counter.counters[i])
+        out["stage"].append(counter.stage(i))
+        out["posture"].append(bool(counter.posture[i]))
+    return out
+
+
+def compare(exercise, angles, timestamps, rules=None):
+    """(reps, mismatches): reps counted by the streaming counter, and what disagreed."""
+    expected = replay_streaming(exercise, angles, timestamps, rules)
+    mismatches = []
+    for name, replay in (("batch", replay_batch), ("multi", replay_multi)):
+        got = replay(exercise, angles, timestamps, rules)
+        for key in ("counter", "stage", "posture"):
+            diff = [j for j, (a, b) in enumerate(zip(expected[key], got[key]))
+                    if a != b]
+            if diff:
+                j = diff[0]
+                mismatches.append(
+                    f"{name} {key} differs on {len(diff)} frames, first at "
+                    f"frame {j} (t={timestamps[j]:.3f}s): "
+                    f"{got[key][j]!r} != {expected[key][j]!r}")
+        if got["rep_times"] != expected["rep_times"]:
+            mismatches.append(f"{name} rep times {got['rep_times']} != "
+                              f"{expected['rep_times']}")
+    return len(expected["rep_times"]), mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rep counter parity check")
+    parser.add_argument("sessions", nargs="*", help="tuner sessions (.npz)")
+    parser.add_argument("--seeds", type=int, default=10,
+                        help="synthetic series per exercise and rule set")
+    args = parser.parse_args()
+
+    cases = []
+    for exercise in EXERCISE_RULES:
+        for label, rules in (("default", None), ("tuned", TUNED_RULES)):
+            for seed in range(args.seeds):
+                angles, timestamps = synthetic_series(exercise, rules, seed=seed)
+                cases.append((f"{exercise} {label} seed {seed}", exercise,
+                              angles, timestamps, rules))
+    for path in args.sessions:
+        exercise, angles, timestamps = stored_series(path)
+        cases.append((path, exercise, angles, timestamps, None))
+
+    failed = 0
+    for label, exercise, angles, timestamps, rules in cases:
+        reps, mismatches = compare(exercise, angles, timestamps, rules)
+        if mismatches:
+            failed += 1
+            print(f"❌ {label}: {reps} reps")
+            for m in mismatches:
+                print(f"     {m}")
+        else:
+            print(f"✅ {label}: {reps} reps over {len(angles)} frames")
+
+    if failed:
+        print(f"\n❌ {failed} of {len(cases)} series disagree")
+        sys.exit(1)
+    print(f"\n✅ All {len(cases)} series agree")
+
+
+if __name__ == "__main__":
+    main()
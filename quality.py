@@ -0,0 +1,107 @@
+import time
+from collections import deque
+
+# Ordered from cheapest to most expensive. "size" is the pose inference
+# resolution; the displayed frame always stays 800x480.
+# overlay: "full" = skeleton + angle text, "reduced" = no angle text,
+# "minimal" = counters only.
+QUALITY_LEVELS = [
+    {"name": "low", "model_complexity": 0, "size": (480, 288), "overlay": "minimal"},
+    {"name": "medium", "model_complexity": 0, "size": (640, 384), "overlay": "reduced"},
+    {"name": "high", "model_complexity": 1, "size": (800, 480), "overlay": "full"},
+    {"name": "ultra", "model_complexity": 2, "size": (800, 480), "overlay": "full"},
+]
+DEFAULT_LEVEL = 2  # what start_engine always used before
+
+
+class QualityController:
+    """
+    Keeps per-frame processing time inside the budget of `target_fps`.
+
+    Steps down a level as soon as the average over the last `window` frames
+    exceeds the budget, and steps up only when it stays under
+    `up_margin` x budget. Both need `cooldown` frames since the last switch.
+    A level that has to be abandoned shortly after stepping up to it doubles
+    the cooldown before the next step up, so the controller can't flap
+    between two levels.
+    """
+
+    def __init__(self, target_fps, levels=QUALITY_LEVELS, start_level=DEFAULT_LEVEL,
+                 window=30, up_margin=0.7, cooldown=60):
+        self.budget = 1.0 / target_fps
+        self.levels = levels
+        self.index = min(start_level, len(levels) - 1)
+        self.window = window
+        self.up_margin = up_margin
+        self.cooldown = cooldown
+
+        self._samples = deque(maxlen=window)
+        self._total = 0.0
+        self._frames = 0
+        self._last_switch = 0
+        self._last_up = None
+        self._up_cooldown = cooldown
+        self._start = time.time()
+        self._blocked = set()
+        self._previous = self.index
+        self.switches = []
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    def record(self, frame_seconds):
+        """Adds one frame's processing time; returns True if the level changed."""
+        if len(self._samples) == self.window:
+            self._total -= self._samples[0]
+        self._samples.append(frame_seconds)
+        self._total += frame_seconds
+        self._frames += 1
+
+        since = self._frames - self._last_switch
+        if len(self._samples) < self.window or since < self.cooldown:
+            return False
+
+        avg = self._total / len(self._samples)
+        lower = self._next(-1)
+        if avg > self.budget and lower is not None:
+            if self._last_up is not None and self._frames - self._last_up < 2 * self.cooldown:
+                self._up_cooldown *= 2
+            self._switch(lower, avg)
+            return True
+
+        higher = self._next(1)
+        if (avg < self.budget * self.up_margin and since >= self._up_cooldown
+                and higher is not None):
+            self._switch(higher, avg)
+            self._last_up = self._frames
+            return True
+        return False
+
+    def reject(self, reason=""):
+        """The new level could not be applied (e.g. model missing): go back and never retry it."""
+        self._blocked.add(self.index)
+        self.switches[-1]["failed"] = reason or True
+        self.index = self._previous
+
+    def _next(self, step):
+        i = self.index + step
+        while 0 <= i < len(self.levels):
+            if i not in self._blocked:
+                return i
+            i += step
+        return None
+
+    def _switch(self, index, avg):
+        self.switches.append({
+            "time": round(time.time() - self._start, 2),
+            "frame": self._frames,
+            "from": self.level["name"],
+            "to": self.levels[index]["name"],
+            "avg_ms": round(avg * 1000, 1),
+        })
+        self._previous = self.index
+        self.index = index
+        self._last_switch = self._frames
+        self._samples.clear()
+        self._total = 0.0
@@ -0,0 +1,111 @@
+"""
+Annotated-video export off the analysis thread.
+
+VideoRecorder.write() only copies the frame into a bounded queue; a
+dedicated encoder thread resizes and feeds cv2.VideoWriter (which releases
+the GIL while encoding). When the encoder falls behind, frames are dropped
+instead of blocking the engine: "newest" drops the incoming frame,
+"oldest" evicts the oldest queued one.
+
+    start_engine("squat", 0, record="replays/session.mp4")
+"""
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+DROP_POLICIES = ("newest", "oldest")
+
+
+class VideoRecorder:
+    def __init__(self, path, fps=30.0, size=(800, 480), codec="mp4v",
+                 queue_size=64, drop="newest"):
+        if drop not in DROP_POLICIES:
+            raise ValueError(f"drop must be one of {DROP_POLICIES}")
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self.fps = fps
+        self.size = tuple(size)
+        self.drop = drop
+        self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec),
+                                       fps, self.size)
+        if not self._writer.isOpened():
+            raise IOError(f"Could not open video writer: {path}")
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+        self.max_queued = 0
+        self._encode_seconds = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._encode, daemon=True,
+                                        name="recorder")
+        self._thread.start()
+
+    def write(self, frame):
+        """Queues a frame for encoding; never blocks. Returns False if a frame was dropped."""
+        if self._closed:
+            return False
+        self.received += 1
+        item = frame.copy()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            if self.drop == "newest":
+                return False
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                pass  # refilled meanwhile; counted once already
+            return False
+        self.max_queued = max(self.max_queued, self._queue.qsize())
+        return True
+
+    def _encode(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            t0 = time.perf_counter()
+            if (frame.shape[1], frame.shape[0]) != self.size:
+                frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+            self._writer.write(frame)
+            self._encode_seconds += time.perf_counter() - t0
+            self.written += 1
+
+    def close(self):
+        """Encodes what is still queued, finalizes the file and returns stats()."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+            self._writer.release()
+        return self.stats()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "received": self.received,
+            "written": self.written,
+            "dropped": self.dropped,
+            "max_queued": self.max_queued,
+            "encode_ms_avg": round(1000 * self._encode_seconds / self.written, 2)
+            if self.written else 0.0,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
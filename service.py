@@ -0,0 +1,458 @@
+"""
+Asyncio session service: many remote clients on one process.
+
+Each TCP connection is one workout session. Messages are one JSON object
+per line; "chunk" and "frame" messages are followed by `size` raw bytes.
+
+    client -> {"op": "start", "exercise": "squat", "mode": "clip"}
+    client -> {"op": "chunk", "size": N} + N bytes of the video file
+    client -> {"op": "end"}
+    server -> {"event": "rep", "reps": 1, "t": 2.4}, ... {"event": "summary", ...}
+
+In "frames" mode every {"op": "frame", "size": N, "t": seconds} carries one
+JPEG frame, which is analyzed as soon as it arrives. Clips are analyzed
+while they upload (see ingest.py). Pose inference runs on
+a shared thread pool; the event loop only moves bytes and events. A client
+that sends faster than it is served simply blocks on TCP.
+
+    python service.py serve --port 8765 --workers 4
+    python service.py client "Exercise Videos/squat1.mp4" --exercise squat
+    python service.py client "Exercise Videos/squat1.mp4" --exercise squat --frames --copies 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from engine import EngineSession, SourceOpenError, aiter_engine, make_backend
+from ingest import BufferedCapture, UploadError, UploadSpool
+from types_of_exercise import EXERCISE_RULES
+
+MODES = ("clip", "frames")
+
+
+class SessionError(Exception):
+    """Protocol or limit violation; reported to the client as an error event."""
+
+
+class Session:
+    """Bookkeeping for one connection, as listed by SessionService.stats()."""
+
+    def __init__(self, exercise, mode):
+        self.id = uuid.uuid4().hex[:12]
+        self.exercise = exercise
+        self.mode = mode
+        self.state = "receiving"
+        self.created = time.time()
+        self.bytes_received = 0
+        self.frames = 0
+        self.events_sent = 0
+
+    def info(self):
+        return {
+            "id": self.id,
+            "exercise": self.exercise,
+            "mode": self.mode,
+            "state": self.state,
+            "age": round(time.time() - self.created, 1),
+            "bytes_received": self.bytes_received,
+            "frames": self.frames,
+            "events_sent": self.events_sent,
+        }
+
+
+def frame_events(prev, counter, stage, posture, t):
+    """Events for whatever changed since `prev` = (counter, stage, posture)."""
+    events = []
+    if counter != prev[0]:
+        events.append({"event": "rep", "reps": counter, "t": round(t, 3)})
+    if stage != prev[1]:
+        events.append({"event": "stage", "stage": stage, "t": round(t, 3)})
+    if posture != prev[2]:
+        events.append({"event": "posture", "good": bool(posture), "t": round(t, 3)})
+    return events
+
+
+async def _next(frames):
+    """The next item of an async iterator, None at its end (anext() needs 3.10)."""
+    try:
+        return await frames.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def _analyze_frame(session, pose, data, timestamp):
+    """Runs on the pool: decode one JPEG frame and advance the session."""
+    frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise SessionError("could not decode frame")
+    rgb = cv2.cvtColor(cv2.resize(frame, (800, 480)), cv2.COLOR_BGR2RGB)
+    session.step(pose.process(rgb), timestamp)
+
+
+class SessionService:
+    """
+    Limits: `max_sessions` concurrent connections (extra ones get an error
+    and are closed), `max_upload_mb` per clip, `idle_timeout` seconds
+    without a message, `max_session_seconds` per connection overall.
+    """
+
+    def __init__(self, workers=4, max_sessions=32, max_upload_mb=200,
+                 idle_timeout=30, max_session_seconds=1800,
+                 backend="mediapipe", backend_options=None, upload_dir=None):
+        self.pool = ThreadPoolExecutor(max_workers=workers,
+                                       thread_name_prefix="inference")
+        self.max_sessions = max_sessions
+        self.max_upload = max_upload_mb * 1024 * 1024
+        self.idle_timeout = idle_timeout
+        self.max_session_seconds = max_session_seconds
+        self.backend = backend
+        self.backend_options = backend_options
+        self.upload_dir = upload_dir or tempfile.gettempdir()
+        self.sessions = {}
+        self.completed = 0
+        self.rejected = 0
+        self._tasks = set()
+        self._server = None
+
+    # ---------------- LIFECYCLE ----------------
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.pool.shutdown(wait=True)
+
+    def stats(self):
+        return {
+            "active": len(self.sessions),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "sessions": [s.info() for s in self.sessions.values()],
+        }
+
+    # ---------------- CONNECTION ----------------
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        session = None
+        try:
+            if len(self._tasks) > self.max_sessions:
+                self.rejected += 1
+                raise SessionError("server busy, try again later")
+
+            msg = await self._read_message(reader)
+            session = self._open(msg)
+            self.sessions[session.id] = session
+            await self._send(writer, session, {
+                "event": "started", "session": session.id,
+                "limits": {"max_upload_mb": self.max_upload // (1024 * 1024),
+                           "idle_timeout": self.idle_timeout},
+            })
+
+            run = self._run_clip if session.mode == "clip" else self._run_frames
+            summary = await asyncio.wait_for(
+                run(session, reader, writer), self.max_session_seconds
+            )
+            session.state = "done"
+            self.completed += 1
+            await self._send(writer, session, dict(summary, event="summary"))
+
+        except asyncio.TimeoutError:
+            await self._fail(writer, session, "session time limit reached")
+        except SessionError as e:
+            await self._fail(writer, session, str(e))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # client went away; cleanup below
+        finally:
+            if session:
+                self.sessions.pop(session.id, None)
+            self._tasks.discard(task)
+            writer.close()
+
+    def _open(self, msg):
+        if msg.get("op") != "start":
+            raise SessionError("first message must be {'op': 'start', ...}")
+        exercise = msg.get("exercise")
+        if exercise not in EXERCISE_RULES:
+            raise SessionError(f"unknown exercise: {exercise}")
+        mode = msg.get("mode", "clip")
+        if mode not in MODES:
+            raise SessionError(f"unknown mode: {mode}")
+        return Session(exercise, mode)
+
+    async def _read_message(self, reader):
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            raise SessionError("idle timeout")
+        if not line:
+            raise ConnectionError("client disconnected")
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            raise SessionError("malformed message")
+        if not isinstance(msg, dict):
+            raise SessionError("a message must be a JSON object")
+        if "size" in msg:
+            size = msg["size"]
+            # bool is an int too, but never a size
+            if not isinstance(size, int) or isinstance(size, bool):
+                raise SessionError("size must be an integer")
+            if not 0 <= size <= self.max_upload:
+                raise SessionError("message too large")
+            msg["data"] = await reader.readexactly(size)
+        return msg
+
+    async def _send(self, writer, session, event):
+        writer.write(json.dumps(event).encode() + b"\n")
+        await writer.drain()
+        if session:
+            session.events_sent += 1
+
+    async def _fail(self, writer, session, message):
+        if session:
+            session.state = "failed"
+        try:
+            await self._send(writer, session, {"event": "error", "message": message})
+        except ConnectionError:
+            pass
+
+    # ---------------- MODES ----------------
+
+    async def _receive_clip(self, session, reader, spool):
+        try:
+            while True:
+                msg = await self._read_message(reader)
+                if msg.get("op") == "end":
+                    break
+                if msg.get("op") != "chunk":
+                    raise SessionError(f"unexpected op: {msg.get('op')}")
+                session.bytes_received += len(msg["data"])
+                try:
+                    spool.write(msg["data"])
+                except UploadError as e:
+                    raise SessionError(str(e))
+        except BaseException:
+            spool.abort()
+            raise
+        spool.finish()
+
+    async def _run_clip(self, session, reader, writer):
+        """
+        Analyze a video file while it is still being uploaded (see ingest.py).
+        Events start flowing as soon as the first frames are decodable.
+
+        The upload is decoded on a reader thread of its own; a step goes to
+        the shared pool only once its frame is buffered, so a slow upload
+        (or an MP4 with its index at the end) never holds a pool thread.
+        """
+        loop = asyncio.get_running_loop()
+        spool = UploadSpool(self.max_upload, directory=self.upload_dir)
+        receiver = asyncio.create_task(self._receive_clip(session, reader, spool))
+        changed = asyncio.Event()
+
+        def notify():
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(changed.set)
+
+        async def ready():
+            while not cap.ready():
+                changed.clear()
+                await changed.wait()
+
+        cap = BufferedCapture(spool, notify=notify)
+        try:
+            await ready()
+            session.state = "processing"
+            engine = EngineSession(session.exercise)
+            prev = (0, None, False)
+            frames = aiter_engine(
+                session.exercise, cap, executor=self.pool, ready=ready,
+                session=engine, draw=False, backend=self.backend,
+                backend_options=self.backend_options,
+            )
+            try:
+                # The upload is opened by the first step
+                try:
+                    r = await _next(frames)
+                except SourceOpenError:
+                    if spool.error:
+                        await receiver  # the upload failed first
+                    raise SessionError("could not open the uploaded video")
+                while r is not None:
+                    session.frames += 1
+                    for event in frame_events(prev, r.counter, r.stage,
+                                              r.posture, r.timestamp):
+                        await self._send(writer, session, event)
+                    prev = (r.counter, r.stage, r.posture)
+                    r = await _next(frames)
+            finally:
+                await frames.aclose()
+
+            await receiver  # surfaces upload errors
+            return await loop.run_in_executor(self.pool, engine.finish)
+        finally:
+            receiver.cancel()
+            cap.release()
+            spool.remove()
+
+    async def _run_frames(self, session, reader, writer):
+        """Analyze JPEG frames as they arrive, one at a time per session."""
+        loop = asyncio.get_running_loop()
+        engine = EngineSession(session.exercise)
+        pose = await loop.run_in_executor(
+            self.pool, make_backend, self.backend, self.backend_options
+        )
+        prev = (0, None, False)
+        try:
+            while True:
+                msg = await self._read_message(reader)
+                if msg.get("op") == "end":
+                    break
+                if msg.get("op") != "frame":
+                    raise SessionError(f"unexpected op: {msg.get('op')}")
+                session.state = "processing"
+                session.bytes_received += len(msg["data"])
+                session.frames += 1
+                t = float(msg.get("t", time.time()))
+                await loop.run_in_executor(
+                    self.pool, _analyze_frame, engine, pose, msg["data"], t
+                )
+                for event in frame_events(prev, engine.counter, engine.stage,
+                                          engine.posture, t):
+                    await self._send(writer, session, event)
+                prev = (engine.counter, engine.stage, engine.posture)
+        finally:
+            # Not while a frame of this session may still be on the pool
+            await loop.run_in_executor(self.pool, pose.close)
+
+        return await loop.run_in_executor(self.pool, engine.finish)
+
+
+# ---------------- STAND-IN CLIENT ----------------
+
+async def run_client(video_path, exercise, host="127.0.0.1", port=8765,
+                     frames=False, chunk_size=64 * 1024, quiet=False):
+    """Plays one video to the service and returns the events it got back."""
+    reader, writer = await asyncio.open_connection(host, port)
+    mode = "frames" if frames else "clip"
+    events = []
+
+    async def send(msg, data=b""):
+        if data:
+            msg["size"] = len(data)
+        writer.write(json.dumps(msg).encode() + b"\n" + data)
+        await writer.drain()
+
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            event = json.loads(line)
+            events.append(event)
+            if not quiet:
+                print(f"[{exercise}] {event}")
+            if event["event"] in ("summary", "error"):
+                return
+
+    receiver = asyncio.create_task(receive())
+    try:
+        await send({"op": "start", "exercise": exercise, "mode": mode})
+        if frames:
+            cap = cv2.VideoCapture(video_path)
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            idx = 0
+            while not receiver.done():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                ok, jpeg = cv2.imencode(".jpg", frame)
+                await send({"op": "frame", "t": idx / fps}, jpeg.tobytes())
+                idx += 1
+            cap.release()
+        else:
+            with open(video_path, "rb") as f:
+                while not receiver.done():
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    await send({"op": "chunk"}, chunk)
+        if not receiver.done():
+            await send({"op": "end"})
+        await receiver
+    finally:
+        writer.close()
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fitness session service")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="run the service")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    serve.add_argument("--max-sessions", type=int, default=32)
+
+    client = sub.add_parser("client", help="send a video as a stand-in client")
+    client.add_argument("video")
+    client.add_argument("--exercise", required=True, choices=list(EXERCISE_RULES))
+    client.add_argument("--host", default="127.0.0.1")
+    client.add_argument("--port", type=int, default=8765)
+    client.add_argument("--frames", action="store_true",
+                        help="send JPEG frames instead of the file")
+    client.add_argument("--copies", type=int, default=1,
+                        help="concurrent clients sending the same video")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        async def serve_forever():
+            service = SessionService(workers=args.workers,
+                                     max_sessions=args.max_sessions)
+            server = await service.start(args.host, args.port)
+            print(f"✅ Session service on {args.host}:{args.port} "
+                  f"({args.workers} inference workers)")
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                await service.close()
+
+        try:
+            asyncio.run(serve_forever())
+        except KeyboardInterrupt:
+            pass
+    else:
+        async def clients():
+            return await asyncio.gather(*(
+                run_client(args.video, args.exercise, args.host, args.port,
+                           args.frames, quiet=args.copies > 1)
+                for _ in range(args.copies)
+            ))
+
+        for events in asyncio.run(clients()):
+            last = events[-1] if events else {}
+            print(f"➡️ {last.get('event')}: reps={last.get('reps')} "
+                  f"accuracy={last.get('accuracy')} {last.get('message', '')}")
+
+
+if __name__ == "__main__":
+    main()
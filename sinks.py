@@ -0,0 +1,141 @@
+"""
+Where the command line's annotated frames go.
+
+A sink receives every processed frame through show(), which has
+start_engine's display_callback signature, and asks the engine to stop by
+returning False from running() (start_engine's stop_callback). Display
+sinks only do work when a display frame is due, so the engine never waits
+on a screen refresh it doesn't need:
+
+    python main.py --input squat1.mp4 --sink window --display-fps 30
+    python main.py --input squat1.mp4 --sink file --output replays/squat1.mp4
+    python main.py --input squat1.mp4 --sink none
+    streamlit run main.py -- --input squat1.mp4 --sink streamlit
+"""
+import time
+
+import cv2
+
+from recorder import VideoRecorder
+from utils import draw_progress_bar
+
+
+class Sink:
+    """Base class: a sink that shows nothing and never stops the engine."""
+
+    # Whether frames need the overlay drawn at all
+    draw = True
+
+    def show(self, frame, counter, stage, posture, progress, fps):
+        pass
+
+    def running(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class _Paced(Sink):
+    """Shows at most `display_fps` frames a second; the frames in between are skipped."""
+
+    def __init__(self, display_fps=30.0):
+        self.interval = 1.0 / display_fps if display_fps else 0.0
+        self._next = 0.0
+        self.shown = 0
+
+    def due(self):
+        now = time.perf_counter()
+        if now < self._next:
+            return False
+        # From now, not from the missed due time, so a slow frame can't cause a burst
+        self._next = now + self.interval
+        self.shown += 1
+        return True
+
+
+class NullSink(Sink):
+    """Headless: no overlay, just a line per rep."""
+
+    draw = False
+
+    def __init__(self):
+        self._reps = 0
+
+    def show(self, frame, counter, stage, posture, progress, fps):
+        if counter != self._reps:
+            self._reps = counter
+            print(f"🏋️ Rep {counter}")
+
+
+class WindowSink(_Paced):
+    """OpenCV window; 'q' or closing the window stops the engine."""
+
+    def __init__(self, title="Fitness Tracker", display_fps=30.0):
+        super().__init__(display_fps)
+        self.title = title
+        self._stopped = False
+
+    def show(self, frame, counter, stage, posture, progress, fps):
+        if not self.due():
+            return
+        # On a copy: the same frame goes on to the other sinks (e.g. a file)
+        cv2.imshow(self.title, draw_progress_bar(frame.copy(), progress, posture))
+        # 1 ms is what HighGUI needs to paint and read keys; no fixed delay
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            self._stopped = True
+        elif cv2.getWindowProperty(self.title, cv2.WND_PROP_VISIBLE) < 1:
+            self._stopped = True
+
+    def running(self):
+        return not self._stopped
+
+    def close(self):
+        if self.shown:
+            cv2.destroyWindow(self.title)
+
+
+class StreamlitSink(_Paced):
+    """Updates an st.empty() placeholder; Streamlit re-encodes every image, so keep the rate low."""
+
+    def __init__(self, placeholder=None, display_fps=15.0):
+        super().__init__(display_fps)
+        import streamlit as st
+
+        self.placeholder = placeholder or st.empty()
+
+    def show(self, frame, counter, stage, posture, progress, fps):
+        if self.due():
+            self.placeholder.image(frame, channels="BGR")
+
+
+class FileSink(Sink):
+    """Annotated video file, encoded off the engine's thread (recorder.VideoRecorder)."""
+
+    def __init__(self, path, fps=30.0):
+        self.recorder = VideoRecorder(path, fps=fps)
+
+    def show(self, frame, counter, stage, posture, progress, fps):
+        self.recorder.write(frame)
+
+    def close(self):
+        stats = self.recorder.close()
+        print(f"🎞️ Saved {stats['path']} ({stats['written']} frames, "
+              f"{stats['dropped']} dropped)")
+
+
+SINKS = ("window", "file", "streamlit", "none")
+
+
+def make_sink(name, output=None, display_fps=None, fps=30.0):
+    if name == "window":
+        return WindowSink(display_fps=display_fps or 30.0)
+    if name == "streamlit":
+        return StreamlitSink(display_fps=display_fps or 15.0)
+    if name == "file":
+        if not output:
+            raise ValueError("The file sink needs an output path")
+        return FileSink(output, fps)
+    if name == "none":
+        return NullSink()
+    raise ValueError(f"Unknown sink '{name}'. Choose from: {', '.join(SINKS)}")
@@ -0,0 +1,321 @@
+"""
+Threshold tuner for the rep counter.
+
+Pose inference runs once per labeled video (`extract`); every candidate
+config is then scored offline with batch_counter.count_reps across a
+process pool (`tune`).
+
+    python tuner.py extract "Exercise Videos/squat1.mp4" --exercise squat --reps 3
+    python tuner.py tune sessions --random 10000 --workers 8
+"""
+import argparse
+import glob
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from batch_counter import count_reps
+from body_part_angle import landmark_angle_series
+from filters import moving_average_series
+from types_of_exercise import EXERCISE_RULES
+
+SESSION_DIR = "sessions"
+REPORT_DIR = "reports"
+
+DEFAULT_WINDOWS = (1, 3, 5, 7, 9)
+DEFAULT_INTERVALS = (0.1, 0.15, 0.25, 0.4)
+THRESH_SPAN = 20.0
+THRESH_STEP = 5.0
+CHUNK_SIZE = 200
+
+
+# ------------------------------------------------
+# Stored sessions
+# ------------------------------------------------
+def save_session(path, exercise, angles, timestamps, reps=None):
+    """Stores raw (unsmoothed) angles, NaN on frames without a detection."""
+    np.savez_compressed(
+        path,
+        exercise=exercise,
+        angles=np.asarray(angles, dtype=np.float32),
+        timestamps=np.asarray(timestamps, dtype=np.float64),
+        reps=-1 if reps is None else int(reps),
+    )
+
+
+def load_session(path):
+    data = np.load(path)
+    if "angles" in data:
+        angles = data["angles"].astype(float)
+    else:
+        angles = landmark_angle_series(data["landmarks"])
+    reps = int(data["reps"])
+    return {
+        "path": path,
+        "exercise": str(data["exercise"]),
+        "angles": angles,
+        "timestamps": data["timestamps"].astype(float),
+        "reps": None if reps < 0 else reps,
+    }
+
+
+def extract_session(video_path, exercise, reps=None, out_dir=SESSION_DIR):
+    """Runs pose inference once over a video and stores its angle series."""
+    import cv2
+    import mediapipe as mp
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video source: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    missing = np.full((33, 2), np.nan)
+    landmarks = []
+    with mp.solutions.pose.Pose(min_detection_confidence=0.5,
+                                min_tracking_confidence=0.5) as pose:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame = cv2.resize(frame, (800, 480))
+            results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+            if results.pose_landmarks:
+                landmarks.append([(p.x, p.y) for p in
+                                  results.pose_landmarks.landmark])
+            else:
+                landmarks.append(missing)
+    cap.release()
+
+    os.makedirs(out_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    out_path = os.path.join(out_dir, f"{name}.npz")
+    save_session(out_path, exercise,
+                 landmark_angle_series(np.array(landmarks).reshape(-1, 33, 2)),
+                 np.arange(len(landmarks)) / fps, reps)
+    return out_path
+
+
+# ------------------------------------------------
+# Search space
+# ------------------------------------------------
+def _steps(center, span=THRESH_SPAN, step=THRESH_STEP):
+    return list(np.arange(center - span, center + span + step / 2, step))
+
+
+def build_configs(exercise, windows=DEFAULT_WINDOWS,
+                  intervals=DEFAULT_INTERVALS, n_random=None, seed=0):
+    """
+    Grid around the current thresholds, or `n_random` samples of the same
+    ranges: thresholds (0.1°) and intervals (10 ms) drawn continuously,
+    windows from `windows`.
+    """
+    rule = EXERCISE_RULES[exercise]
+    space = [_steps(rule["down"]), _steps(rule["up"]), list(intervals),
+             list(windows)]
+
+    def ok(down, up):
+        return down > up if rule["invert"] else down < up
+
+    if n_random:
+        rng = random.Random(seed)
+        configs = set()
+        tries = 0
+        while len(configs) < n_random and tries < n_random * 20:
+            c = (round(rng.uniform(space[0][0], space[0][-1]), 1),
+                 round(rng.uniform(space[1][0], space[1][-1]), 1),
+                 round(rng.uniform(min(intervals), max(intervals)), 2),
+                 rng.choice(space[3]))
+            if ok(c[0], c[1]):
+                configs.add(c)
+            tries += 1
+        if len(configs) < n_random:
+            print(f"⚠️ {exercise}: only {len(configs)} distinct configs "
+                  f"for --random {n_random}")
+        combos = sorted(configs)
+    else:
+        combos = [c for c in itertools.product(*space) if ok(c[0], c[1])]
+
+    return [
+        {"down": float(d), "up": float(u), "min_rep_interval": float(i),
+         "window": int(w)}
+        for d, u, i, w in combos
+    ]
+
+
+# ------------------------------------------------
+# Evaluation (runs inside the pool workers)
+# ------------------------------------------------
+_SESSIONS = []
+_SMOOTHED = {}
+
+
+def _init_worker(paths):
+    global _SESSIONS
+    _SESSIONS = [load_session(p) for p in paths]
+    _SMOOTHED.clear()
+
+
+def _smoothed(i, window):
+    # Configs arrive sorted by window, so only one window is cached at a time
+    if _SMOOTHED.get("window") != window:
+        _SMOOTHED.clear()
+        _SMOOTHED["window"] = window
+    if i not in _SMOOTHED:
+        _SMOOTHED[i] = moving_average_series(_SESSIONS[i]["angles"], window)
+    return _SMOOTHED[i]
+
+
+def _evaluate(exercise, configs):
+    indices = [i for i, s in enumerate(_SESSIONS)
+               if s["exercise"] == exercise and s["reps"] is not None]
+    results = []
+    for config in configs:
+        rules = {exercise: dict(EXERCISE_RULES[exercise],
+                                down=config["down"], up=config["up"])}
+        errors = []
+        for i in indices:
+            r = count_reps(exercise, _smoothed(i, config["window"]),
+                           _SESSIONS[i]["timestamps"], rules=rules,
+                           min_rep_interval=config["min_rep_interval"])
+            errors.append(r["reps"] - _SESSIONS[i]["reps"])
+        errors = np.abs(np.array(errors))
+        results.append(dict(
+            config,
+            mae=float(errors.mean()),
+            max_error=int(errors.max()),
+            exact=float((errors == 0).mean()),
+        ))
+    return results
+
+
+def pareto_front(results):
+    """Configs not dominated on (mae, max_error, window); lower is better."""
+    if not results:
+        return []
+    objectives = np.array([[r["mae"], r["max_error"], r["window"]]
+                           for r in results])
+    keep = np.ones(len(results), dtype=bool)
+    for start in range(0, len(results), 500):
+        block = objectives[start:start + 500, None, :]
+        dominated = ((objectives[None] <= block).all(axis=2) &
+                     (objectives[None] < block).any(axis=2)).any(axis=1)
+        keep[start:start + 500] = ~dominated
+    front = [r for r, k in zip(results, keep) if k]
+    return sorted(front, key=lambda r: (r["mae"], r["max_error"], r["window"]))
+
+
+def tune(session_paths, exercises=None, n_random=None, workers=None,
+         windows=DEFAULT_WINDOWS, intervals=DEFAULT_INTERVALS, seed=0):
+    """Scores every config over the labeled sessions and returns the Pareto front per exercise."""
+    labeled = {}
+    for p in session_paths:
+        s = load_session(p)
+        if s["reps"] is not None:
+            labeled.setdefault(s["exercise"], 0)
+            labeled[s["exercise"]] += 1
+    exercises = [e for e in (exercises or labeled) if labeled.get(e)]
+
+    fronts = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(list(session_paths),)) as pool:
+        for exercise in exercises:
+            configs = build_configs(exercise, windows, intervals, n_random, seed)
+            # Group by window so each worker smooths a session only once per window
+            configs.sort(key=lambda c: c["window"])
+            chunks = [configs[i:i + CHUNK_SIZE]
+                      for i in range(0, len(configs), CHUNK_SIZE)]
+            results = []
+            for part in pool.map(_evaluate, [exercise] * len(chunks), chunks):
+                results.extend(part)
+            fronts[exercise] = {
+                "sessions": labeled[exercise],
+                "configs_evaluated": len(results),
+                "pareto": pareto_front(results),
+            }
+    return fronts
+
+
+def load_rules(path):
+    """Best config per exercise from a tuning report, ready for start_engine(rules=...)."""
+    with open(path) as f:
+        report = json.load(f)
+    rules = {}
+    for exercise, entry in report["exercises"].items():
+        if entry["pareto"]:
+            best = entry["pareto"][0]
+            rules[exercise] = {k: best[k] for k in
+                               ("down", "up", "min_rep_interval", "window")}
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rep counter threshold tuner")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ex = sub.add_parser("extract", help="run pose inference once and store angles")
+    ex.add_argument("video")
+    ex.add_argument("--exercise", required=True, choices=list(EXERCISE_RULES))
+    ex.add_argument("--reps", type=int, help="true rep count (label)")
+    ex.add_argument("--out", default=SESSION_DIR)
+
+    tn = sub.add_parser("tune", help="sweep thresholds over stored sessions")
+    tn.add_argument("sessions", help="folder with .npz sessions")
+    tn.add_argument("--exercise", action="append", choices=list(EXERCISE_RULES))
+    tn.add_argument("--random", type=int, help="random search with N configs")
+    tn.add_argument("--windows", default=",".join(map(str, DEFAULT_WINDOWS)))
+    tn.add_argument("--intervals", default=",".join(map(str, DEFAULT_INTERVALS)))
+    tn.add_argument("--workers", type=int)
+    tn.add_argument("--seed", type=int, default=0)
+    tn.add_argument("--top", type=int, default=5)
+
+    args = parser.parse_args()
+
+    if args.command == "extract":
+        path = extract_session(args.video, args.exercise, args.reps, args.out)
+        print(f"✅ Saved session: {path}")
+        return
+
+    paths = sorted(glob.glob(os.path.join(args.sessions, "*.npz")))
+    if not paths:
+        print(f"❌ No sessions found in: {args.sessions}")
+        return
+
+    start = time.time()
+    fronts = tune(
+        paths,
+        exercises=args.exercise,
+        n_random=args.random,
+        workers=args.workers,
+        windows=[int(w) for w in args.windows.split(",")],
+        intervals=[float(i) for i in args.intervals.split(",")],
+        seed=args.seed,
+    )
+    elapsed = time.time() - start
+
+    for exercise, entry in fronts.items():
+        print(f"\n{exercise}: {entry['configs_evaluated']} configs over "
+              f"{entry['sessions']} sessions")
+        for r in entry["pareto"][:args.top]:
+            print(f"  down={r['down']:.0f} up={r['up']:.0f} "
+                  f"interval={r['min_rep_interval']:.2f} window={r['window']}"
+                  f"  mae={r['mae']:.2f} max={r['max_error']} "
+                  f"exact={r['exact'] * 100:.0f}%")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    report_path = os.path.join(REPORT_DIR, f"tuning_{timestamp}.json")
+    with open(report_path, "w") as f:
+        json.dump({"elapsed_s": round(elapsed, 2), "exercises": fronts}, f,
+                  indent=2)
+    print(f"\n✅ Done in {elapsed:.1f}s. Report: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,26 @@
 import time
-from collections import deque
-from body_part_angle import BodyPartAngle
+import numpy as np
+from body_part_angle import BodyPartAngle, landmark_angle_series
+from utils import landmarks_to_array
+from filters import make_filter
 
 def _safe(a):
     return None if a is None else float(a)
 
+# Rep rules per exercise, shared by the streaming state machine below and the
+# batch counter. A rep counts on the "down" -> "up" transition. With
+# invert=True the joint angle gets smaller on the way "up" (pull-up).
+EXERCISE_RULES = {
+    "push-up": {"key": "push", "joints": ("left_elbow", "right_elbow"),
+                "down": 100.0, "up": 150.0, "invert": False},
+    "pull-up": {"key": "pull", "joints": ("left_elbow", "right_elbow"),
+                "down": 145.0, "up": 95.0, "invert": True},
+    "squat": {"key": "squat", "joints": ("left_knee", "right_knee"),
+              "down": 100.0, "up": 150.0, "invert": False},
+    "sit-up": {"key": "sit", "joints": ("abdomen",),
+               "down": 80.0, "up": 100.0, "invert": False},
+}
+
 class TypeOfExercise(BodyPartAngle):
     """
     HIGH SENSITIVITY MODE:
@@ -17,56 +33,81 @@ class TypeOfExercise(BodyPartAngle):
     STABLE_FRAMES_REQUIRED = 1  # INSTANT TRIGGER (Changed from 3)
     MIN_REP_INTERVAL = 0.15     # Allows very fast reps
 
-    def __init__(self, landmarks=None):
+    # Order of the angle vector fed to the smoothing filter
+    ANGLE_KEYS = (
+        "left_elbow",
+        "right_elbow",
+        "left_knee",
+        "right_knee",
+        "abdomen",
+        "neck",
+    )
+
+    # Smoothing filter per exercise: (name, params) for filters.make_filter.
+    # Noisy cameras can use a larger window at no extra cost per frame.
+    DEFAULT_FILTER = ("moving_average", {"window": SMOOTH_WINDOW})
+    EXERCISE_FILTERS = {
+        "push-up": ("moving_average", {"window": SMOOTH_WINDOW}),
+        "pull-up": ("moving_average", {"window": SMOOTH_WINDOW}),
+        "squat": ("moving_average", {"window": SMOOTH_WINDOW}),
+        "sit-up": ("moving_average", {"window": SMOOTH_WINDOW}),
+    }
+
+    def __init__(self, landmarks=None, exercise_type=None, smoothing=None,
+                 rules=None):
         super().__init__(landmarks)
         self.landmarks = landmarks
-        self._buffers = {
-            "left_elbow": deque(maxlen=self.SMOOTH_WINDOW),
-            "right_elbow": deque(maxlen=self.SMOOTH_WINDOW),
-            "left_knee": deque(maxlen=self.SMOOTH_WINDOW),
-            "right_knee": deque(maxlen=self.SMOOTH_WINDOW),
-            "abdomen": deque(maxlen=self.SMOOTH_WINDOW),
-            "neck": deque(maxlen=self.SMOOTH_WINDOW),
+
+        # `rules` overrides EXERCISE_RULES per exercise (e.g. tuner output):
+        # {"squat": {"down": 95, "up": 155, "min_rep_interval": 0.2, "window": 5}}
+        self.rules = EXERCISE_RULES
+        if rules:
+            self.rules = {
+                et: dict(r, **rules.get(et, {}))
+                for et, r in EXERCISE_RULES.items()
+            }
+        self._min_rep_interval = {
+            r["key"]: r.get("min_rep_interval", self.MIN_REP_INTERVAL)
+            for r in self.rules.values()
         }
+
+        et = (exercise_type or "").lower()
+        if smoothing is None and "window" in self.rules.get(et, {}):
+            smoothing = ("moving_average", {"window": self.rules[et]["window"]})
+        if smoothing is None:
+            smoothing = self.EXERCISE_FILTERS.get(et, self.DEFAULT_FILTER)
+        self.filter_spec = smoothing
+        name, params = smoothing
+        self._filter = make_filter(name, len(self.ANGLE_KEYS), **params)
         self._smoothed = {}
+        self._vector = np.full(len(self.ANGLE_KEYS), np.nan)
         self._last_rep_time = {"push": 0.0, "squat": 0.0, "sit": 0.0, "pull": 0.0}
 
-    def update_landmarks(self, landmarks):
-        self.landmarks = landmarks
-        try:
-            a = self.angle_of_the_left_arm(); 
-            if a is not None: self._buffers["left_elbow"].append(a)
-        except: pass
-        try:
-            a = self.angle_of_the_right_arm(); 
-            if a is not None: self._buffers["right_elbow"].append(a)
-        except: pass
-        try:
-            a = self.angle_of_the_left_leg(); 
-            if a is not None: self._buffers["left_knee"].append(a)
-        except: pass
-        try:
-            a = self.angle_of_the_right_leg(); 
-            if a is not None: self._buffers["right_knee"].append(a)
-        except: pass
-        try:
-            a = self.angle_of_the_abdomen(); 
-            if a is not None: self._buffers["abdomen"].append(a)
-        except: pass
-        try:
-            a = self.angle_of_the_neck();
-            if a is not None: self._buffers["neck"].append(a)
-        except: pass
-
-        for k, dq in self._buffers.items():
-            self._smoothed[k] = (sum(dq) / len(dq)) if len(dq) > 0 else None
+    def update_landmarks(self, landmarks, timestamp=None):
+        # Accepts a MediaPipe landmark list or a backend's (33, 4) array;
+        # all six angles come out of one vectorized step.
+        self.landmarks = landmarks_to_array(landmarks)
+        raw = landmark_angle_series(self.landmarks[None])[0]
+
+        smoothed = self._filter.update(raw, timestamp)
+        self._vector = np.asarray(smoothed, dtype=float)
+        self._smoothed = {
+            k: (None if np.isnan(v) else float(v))
+            for k, v in zip(self.ANGLE_KEYS, smoothed)
+        }
 
     def get_smoothed_angles(self):
         return dict(self._smoothed)
 
-    def _can_count_rep(self, key):
-        now = time.time()
-        if now - self._last_rep_time.get(key, 0.0) >= self.MIN_REP_INTERVAL:
+    def get_smoothed_vector(self):
+        # ANGLE_KEYS order, NaN for unknown angles (see multi_exercise.py)
+        return self._vector
+
+    def _can_count_rep(self, key, now=None):
+        if now is None:
+            now = time.time()
+        min_interval = self._min_rep_interval.get(key, self.MIN_REP_INTERVAL)
+        if now - self._last_rep_time.get(key, 0.0) >= min_interval:
             self._last_rep_time[key] = now
             return True
         return False
@@ -118,16 +159,17 @@ class TypeOfExercise(BodyPartAngle):
     # -------------------------
     # Exercise implementations
     # -------------------------
-    def push_up(self, counter, stage):
+    def push_up(self, counter, stage, timestamp=None):
         le = self._smoothed.get("left_elbow")
         re = self._smoothed.get("right_elbow")
         if le is None and re is None: return [counter, stage, False, 0.0]
         avg = le if re is None else (re if le is None else (le + re) / 2.0)
 
         # Relaxed Thresholds: Easier to count
-        DOWN_THRESH = 100.0 
-        UP_THRESH = 150.0
-        key = "push"
+        rule = self.rules["push-up"]
+        DOWN_THRESH = rule["down"]
+        UP_THRESH = rule["up"]
+        key = rule["key"]
 
         if stage is None:
             stage = "up" if avg > UP_THRESH else "down"
@@ -138,7 +180,7 @@ class TypeOfExercise(BodyPartAngle):
         else: # stage is down
             if avg > UP_THRESH:
                 # ALWAYS COUNT
-                if self._can_count_rep(key):
+                if self._can_count_rep(key, timestamp):
                     counter += 1
                 stage = "up"
 
@@ -146,16 +188,17 @@ class TypeOfExercise(BodyPartAngle):
         progress = self._progress_from_angle(avg, DOWN_THRESH, UP_THRESH, invert=False)
         return [counter, stage, posture_bool, progress]
 
-    def pull_up(self, counter, stage):
+    def pull_up(self, counter, stage, timestamp=None):
         le = self._smoothed.get("left_elbow")
         re = self._smoothed.get("right_elbow")
         if le is None and re is None: return [counter, stage, False, 0.0]
         avg = le if re is None else (re if le is None else (le + re) / 2.0)
 
         # Relaxed Thresholds
-        DOWN_THRESH = 145.0
-        UP_THRESH = 95.0
-        key = "pull"
+        rule = self.rules["pull-up"]
+        DOWN_THRESH = rule["down"]
+        UP_THRESH = rule["up"]
+        key = rule["key"]
 
         if stage is None:
             stage = "down" if avg > DOWN_THRESH else "up"
@@ -163,7 +206,7 @@ class TypeOfExercise(BodyPartAngle):
         if stage == "down":
             if avg < UP_THRESH:
                 # ALWAYS COUNT
-                if self._can_count_rep(key):
+                if self._can_count_rep(key, timestamp):
                     counter += 1
                 stage = "up"
         else: # stage is up
@@ -174,16 +217,17 @@ class TypeOfExercise(BodyPartAngle):
         progress = self._progress_from_angle(avg, DOWN_THRESH, UP_THRESH, invert=True)
         return [counter, stage, posture_bool, progress]
 
-    def squat(self, counter, stage):
+    def squat(self, counter, stage, timestamp=None):
         lk = self._smoothed.get("left_knee")
         rk = self._smoothed.get("right_knee")
         if lk is None and rk is None: return [counter, stage, False, 0.0]
         avg = lk if rk is None else (rk if lk is None else (lk + rk) / 2.0)
 
         # Relaxed Thresholds: Half squats will now count
-        DOWN_THRESH = 100.0  
-        UP_THRESH = 150.0    
-        key = "squat"
+        rule = self.rules["squat"]
+        DOWN_THRESH = rule["down"]
+        UP_THRESH = rule["up"]
+        key = rule["key"]
 
         if stage is None:
             stage = "up" if avg > UP_THRESH else "down"
@@ -194,7 +238,7 @@ class TypeOfExercise(BodyPartAngle):
         else: # stage is down
             if avg > UP_THRESH:
                 # ALWAYS COUNT
-                if self._can_count_rep(key):
+                if self._can_count_rep(key, timestamp):
                     counter += 1
                 stage = "up"
 
@@ -202,14 +246,15 @@ class TypeOfExercise(BodyPartAngle):
         progress = self._progress_from_angle(avg, DOWN_THRESH, UP_THRESH, invert=False)
         return [counter, stage, posture_bool, progress]
 
-    def sit_up(self, counter, stage):
+    def sit_up(self, counter, stage, timestamp=None):
         a = self._smoothed.get("abdomen")
         if a is None: return [counter, stage, False, 0.0]
 
         # Relaxed Thresholds: Partial crunches will count
-        DOWN_THRESH = 80.0
-        UP_THRESH = 100.0
-        key = "sit"
+        rule = self.rules["sit-up"]
+        DOWN_THRESH = rule["down"]
+        UP_THRESH = rule["up"]
+        key = rule["key"]
 
         if stage is None:
             stage = "up" if a > UP_THRESH else "down"
@@ -220,7 +265,7 @@ class TypeOfExercise(BodyPartAngle):
         else: # stage is down
             if a > UP_THRESH:
                 # ALWAYS COUNT
-                if self._can_count_rep(key):
+                if self._can_count_rep(key, timestamp):
                     counter += 1
                 stage = "up"
 
@@ -228,15 +273,16 @@ class TypeOfExercise(BodyPartAngle):
         progress = self._progress_from_angle(a, DOWN_THRESH, UP_THRESH, invert=False)
         return [counter, stage, posture_bool, progress]
 
-    def calculate_exercise(self, exercise_type, counter, stage):
+    def calculate_exercise(self, exercise_type, counter, stage, timestamp=None):
+        # `timestamp` is the frame time used for MIN_REP_INTERVAL; wall clock if None
         et = exercise_type.lower()
         if et == "push-up":
-            return self.push_up(counter, stage)
+            return self.push_up(counter, stage, timestamp)
         elif et == "pull-up":
-            return self.pull_up(counter, stage)
+            return self.pull_up(counter, stage, timestamp)
         elif et == "squat":
-            return self.squat(counter, stage)
+            return self.squat(counter, stage, timestamp)
         elif et == "sit-up":
-            return self.sit_up(counter, stage)
+            return self.sit_up(counter, stage, timestamp)
         else:
             return [counter, stage, True, 0.0]
\ No newline at end of file
@@ -21,8 +21,31 @@ def calculate_angle(a, b, c):
     return angle
 
 
+def calculate_angles(a, b, c):
+    """Vectorized calculate_angle: points are arrays whose last axis is (x, y)."""
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    c = np.asarray(c, dtype=float)
+
+    radians = np.arctan2(c[..., 1] - b[..., 1], c[..., 0] - b[..., 0]) -\
+              np.arctan2(a[..., 1] - b[..., 1], a[..., 0] - b[..., 0])
+    angle = np.abs(radians * 180.0 / np.pi)
+
+    return np.where(angle > 180.0, 360 - angle, angle)
+
+
+def landmarks_to_array(landmarks):
+    """MediaPipe landmark list -> (33, 4) array of x, y, z, visibility."""
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    return np.array([(p.x, p.y, p.z, p.visibility) for p in landmarks],
+                    dtype=np.float32)
+
 
 def detection_body_part(landmarks, body_part_name):
+    if isinstance(landmarks, np.ndarray):
+        row = landmarks[mp_pose.PoseLandmark[body_part_name].value]
+        return [row[0], row[1], row[3]]
     return [
         landmarks[mp_pose.PoseLandmark[body_part_name].value].x,
         landmarks[mp_pose.PoseLandmark[body_part_name].value].y,
@@ -50,4 +73,46 @@ def score_table(exercise, frame , counter, status):
     cv2.putText(frame, "Status : " + str(status), (10, 135),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
     return frame
-    
+
+
+POSE_CONNECTIONS = tuple(sorted(mp_pose.POSE_CONNECTIONS))
+
+
+def draw_skeleton(frame, landmarks, line_color, point_color=(255, 255, 255),
+                  visibility_threshold=0.5):
+    """
+    Draws a (33, 4) landmark array the way mp_drawing.draw_landmarks does:
+    connections first, then the joints, skipping landmarks that are not
+    visible or fall outside the frame.
+    """
+    h, w = frame.shape[:2]
+    x, y, vis = landmarks[:, 0], landmarks[:, 1], landmarks[:, 3]
+    shown = (vis >= visibility_threshold) & (x >= 0) & (x <= 1) & (y >= 0) & (y <= 1)
+    px = np.minimum((x * w).astype(int), w - 1).tolist()
+    py = np.minimum((y * h).astype(int), h - 1).tolist()
+
+    for a, b in POSE_CONNECTIONS:
+        if shown[a] and shown[b]:
+            cv2.line(frame, (px[a], py[a]), (px[b], py[b]), line_color, 3)
+    for i in np.flatnonzero(shown):
+        cv2.circle(frame, (px[i], py[i]), 3, (224, 224, 224), 2)
+        cv2.circle(frame, (px[i], py[i]), 2, point_color, 2)
+    return frame
+
+
+def draw_progress_bar(frame, progress, posture):
+    """The CLI's vertical rep progress bar on the left edge (green/red by posture)."""
+    bar_w, bar_h, margin = 24, 220, 12
+    x0 = margin
+    y0 = int((frame.shape[0] - bar_h) / 2)
+    x1, y1 = x0 + bar_w, y0 + bar_h
+
+    cv2.rectangle(frame, (x0, y0), (x1, y1), (200, 200, 200), 2)
+    fill_h = int(bar_h * progress)
+    if fill_h > 0:
+        fill_color = (0, 255, 0) if posture else (0, 0, 255)
+        cv2.rectangle(frame, (x0 + 2, y1 - fill_h), (x1 - 2, y1 - 2),
+                      fill_color, -1)
+    cv2.putText(frame, f"{int(progress * 100)}%", (x1 + 8, y1 - 4),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 1)
+    return frame